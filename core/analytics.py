@@ -0,0 +1,151 @@
+from django.db.models import Sum
+import plotly.graph_objects as go
+
+from .anomalies import user_anomalies
+from .instrumentation import timed, timed_function
+from .ledger import trend_rows
+from .model_registry import get_model
+from .models import InventoryItem, StockRollup, TrainedModel
+
+
+# -----------------------
+# Chart Specs
+# -----------------------
+TREND_DAYS = 30
+INSIGHTS_TREND_DAYS = 7
+
+# Mirrors CHART_SPECS in static/js/charts.js, which renders the compact series client-side
+CHART_SPECS = {
+    'stock': {'type': 'scatter', 'title': 'Stock Levels Over Time'},
+    'location': {'type': 'pie', 'title': 'Stock by Location'},
+    'supplier': {'type': 'bar', 'title': 'Supplier Performance'},
+    'forecast': {'type': 'scatter', 'title': 'Demand Forecast', 'xaxis': 'Date & Time', 'yaxis': 'Quantity'},
+    'anomalies': {'type': 'bar', 'title': 'Anomalies Detected', 'empty': 'No Anomalies Detected'},
+    'stock_trend': {'type': 'scatter', 'title': 'Stock Trends'},
+}
+# Compact series key -> Plotly figure key in the full payload
+FIGURE_KEYS = {
+    'stock': 'stock_chart_data',
+    'location': 'location_chart_data',
+    'supplier': 'supplier_chart_data',
+    'forecast': 'forecast_chart_data',
+    'anomalies': 'anomalies_chart_data',
+    'stock_trend': 'stock_trend_data',
+}
+
+
+# -----------------------
+# Compact Series
+# -----------------------
+def category_series(rows):
+    labels, values = [], []
+    for label, value in rows:
+        labels.append(label)
+        values.append(int(value or 0))
+    return {'labels': labels, 'values': values}
+
+
+def trend_series(rows):
+    # Rows arrive sorted by bucket; items sharing a name are summed per bucket
+    buckets, points = {}, {}
+    for bucket, name, closing_quantity, _outbound in rows:
+        index = buckets.setdefault(bucket, len(buckets))
+        item = points.setdefault(name, {})
+        item[index] = item.get(index, 0) + closing_quantity
+    return {
+        'labels': [bucket.isoformat() for bucket in buckets],
+        'series': [{'name': name, 'values': [item.get(i) for i in range(len(buckets))]}
+                   for name, item in points.items()],
+    }
+
+
+def anomaly_series(anomalies):
+    return {
+        'labels': [a['name'] for a in anomalies],
+        'values': [a['quantity'] for a in anomalies],
+        'groups': [a['group'] for a in anomalies],
+        'scores': [a['score'] for a in anomalies],
+    }
+
+
+def stock_rows(items, order):
+    return items.values('name').annotate(total=Sum('quantity')).order_by(order).values_list('name', 'total')
+
+
+def dashboard_series_queries(user, location_filter, items):
+    # The independent reads behind the dashboard charts, run in turn or side by side
+    return {
+        'stock': lambda: category_series(stock_rows(items, 'name')),
+        # Daily closing stock per item from the movement rollups
+        'forecast': lambda: trend_series(trend_rows(user, StockRollup.DAY, TREND_DAYS, location_filter)),
+        # Grouped statistical outliers across every location
+        'anomalies': lambda: anomaly_series(user_anomalies(user)),
+    }
+
+
+def assemble_dashboard_series(parts, totals):
+    return {
+        'stock': parts['stock'],
+        'location': category_series((r['location__name'], r['total']) for r in totals['location_data']),
+        'supplier': category_series((r['supplier__name'], r['total']) for r in totals['supplier_data']),
+        'forecast': parts['forecast'],
+        'anomalies': parts['anomalies'],
+    }
+
+
+@timed_function('series')
+def build_insights_series(user, items):
+    return {
+        # Hourly closing stock per item from the movement rollups
+        'forecast': trend_series(trend_rows(user, StockRollup.HOUR, INSIGHTS_TREND_DAYS)),
+        'anomalies': anomaly_series(user_anomalies(user)),
+        'stock_trend': category_series(stock_rows(items, '-total')),
+    }
+
+
+# -----------------------
+# Plotly Figures
+# -----------------------
+def series_figure(key, data):
+    spec = CHART_SPECS[key]
+    fig = go.Figure()
+    if spec['type'] == 'pie':
+        fig.add_trace(go.Pie(labels=data['labels'], values=data['values']))
+    elif 'series' in data:
+        for line in data['series']:
+            fig.add_trace(go.Scatter(x=data['labels'], y=line['values'], mode='lines+markers', name=line['name']))
+    elif data['labels']:
+        trace = go.Bar if spec['type'] == 'bar' else go.Scatter
+        extra = {} if spec['type'] == 'bar' else {'mode': 'lines+markers'}
+        fig.add_trace(trace(x=data['labels'], y=data['values'], **extra))
+
+    has_data = bool(data['labels'])
+    title = spec['title'] if has_data else spec.get('empty', f"{spec['title']} (No Data)")
+    fig.update_layout(title=title, xaxis_title=spec.get('xaxis'), yaxis_title=spec.get('yaxis'))
+    if key == 'anomalies' and has_data:
+        fig.update_traces(
+            customdata=[[group or 'N/A', score] for group, score in zip(data['groups'], data['scores'])],
+            hovertemplate='%{x}: %{y} units<br>Group: %{customdata[0]}<br>Score: %{customdata[1]}<extra></extra>',
+        )
+    return fig
+
+
+@timed_function('figures')
+def series_figures(series):
+    return {FIGURE_KEYS[key]: series_figure(key, data).to_json() for key, data in series.items()}
+
+
+# -----------------------
+# Background Insights
+# -----------------------
+def compute_insights(user):
+    items = InventoryItem.objects.filter(user=user)
+    # Only the compact series are stored; the page renders them with the client-side chart specs
+    payload = {'series': build_insights_series(user, items)}
+
+    from . import ml_models  # numpy is only needed here
+    with timed('forecast'):
+        model, _ = get_model(user, TrainedModel.DEMAND)
+        predictions = ml_models.predict_demand(model, user)
+    payload['demand_predictions'] = {name: round(float(value), 2) for name, value in predictions.items()}
+    return payload
@@ -0,0 +1,114 @@
+import numpy as np
+from django.conf import settings
+
+from .instrumentation import timed_function
+from .models import InventoryItem
+
+# Item attribute each group_by option partitions on
+GROUP_FIELDS = {
+    None: None,
+    'location': 'location__name',
+    'supplier': 'supplier__name',
+    'name': 'name',
+}
+METHODS = ('zscore', 'robust')
+DEFAULT_THRESHOLDS = {'zscore': 2.0, 'robust': 3.5}
+MIN_GROUP_SIZE = 3
+# Scales MAD to the standard deviation of a normal distribution (Iglewicz & Hoaglin)
+MAD_SCALE = 0.6745
+
+
+# -----------------------
+# Vectorized Group Statistics
+# -----------------------
+def _group_medians(values, codes, counts, starts):
+    order = np.lexsort((values, codes))
+    ordered = values[order]
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    return (ordered[lo] + ordered[hi]) / 2.0
+
+
+def group_statistics(values, codes):
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.asarray(codes, dtype=np.int64)
+    n_groups = int(codes.max()) + 1 if codes.size else 0
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    mean = np.divide(sums, counts, out=np.zeros(n_groups), where=counts > 0)
+    sq = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+    std = np.sqrt(np.divide(sq, counts, out=np.zeros(n_groups), where=counts > 0))
+
+    median = _group_medians(values, codes, counts, starts)
+    mad = _group_medians(np.abs(values - median[codes]), codes, counts, starts)
+    return {'count': counts, 'mean': mean, 'std': std, 'median': median, 'mad': mad}
+
+
+def anomaly_scores(values, codes, method='zscore'):
+    if method not in METHODS:
+        raise ValueError(f"Unknown anomaly method: {method}")
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.asarray(codes, dtype=np.int64)
+    if not values.size:
+        return np.zeros(0)
+    stats = group_statistics(values, codes)
+    if method == 'zscore':
+        center, spread = stats['mean'][codes], stats['std'][codes]
+    else:
+        center, spread = stats['median'][codes], stats['mad'][codes] / MAD_SCALE
+    scores = np.divide(values - center, spread, out=np.zeros_like(values), where=spread > 0)
+    # Too few points in a group to call anything unusual
+    scores[stats['count'][codes] < MIN_GROUP_SIZE] = 0.0
+    return scores
+
+
+# -----------------------
+# Item Anomalies
+# -----------------------
+@timed_function('anomalies')
+def find_anomalies(items, group_by=None, method='zscore', threshold=None):
+    if group_by not in GROUP_FIELDS:
+        raise ValueError(f"Unknown anomaly grouping: {group_by}")
+    if method not in METHODS:
+        raise ValueError(f"Unknown anomaly method: {method}")
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+    group_field = GROUP_FIELDS[group_by]
+
+    columns = ['id', 'name', 'quantity'] + ([group_field] if group_field and group_field != 'name' else [])
+    rows = items.order_by().values_list(*columns)
+    if not rows:
+        return []
+
+    # Transpose once in C, then everything below is whole-array NumPy
+    columns = list(zip(*rows))
+    ids, names = columns[0], columns[1]
+    quantities = np.asarray(columns[2], dtype=np.float64)
+    groups = None
+    if group_field:
+        groups = np.asarray(columns[1] if group_field == 'name' else columns[3], dtype=object)
+        groups[np.equal(groups, None)] = ''
+        _, codes = np.unique(groups.astype(str), return_inverse=True)
+    else:
+        codes = np.zeros(len(ids), dtype=np.int64)
+
+    scores = anomaly_scores(quantities, codes, method)
+    flagged = np.flatnonzero(np.abs(scores) > threshold)
+    flagged = flagged[np.argsort(-np.abs(scores[flagged]), kind='stable')]
+    return [{
+        'id': ids[i],
+        'name': names[i],
+        'quantity': int(quantities[i]),
+        'group': groups[i] if groups is not None else None,
+        'score': round(float(scores[i]), 3),
+    } for i in flagged]
+
+
+def user_anomalies(user, location=''):
+    # Site-wide defaults from settings.ANOMALY_* drive every view
+    items = InventoryItem.objects.filter(user=user)
+    if location:
+        items = items.filter(location__name=location)
+    return find_anomalies(items, settings.ANOMALY_GROUP_BY or None, settings.ANOMALY_METHOD,
+                          settings.ANOMALY_THRESHOLD)
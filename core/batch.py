@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import ledger
+from .changes import record_changes
+from .importers import FIELD_PARSERS, resolve_names
+from .models import ChangeLog, InventoryItem, Location, Supplier
+from .signals import bulk_write, inventory_bulk_changed
+
+MAX_BATCH_OPERATIONS = 1000
+ITEM_FIELDS = ('name', 'quantity', 'price', 'supplier', 'location')
+# Creates fall back to the model defaults when these are left out
+STOCK_LEVEL_FIELDS = ('reorder_point', 'target_level')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def _parse_fields(op, partial):
+    # Same validation as the CSV importer; updates only check the fields they send
+    fields = [f for f in ITEM_FIELDS if f in op] if partial else list(ITEM_FIELDS)
+    fields += [f for f in STOCK_LEVEL_FIELDS if f in op]
+    return {f: FIELD_PARSERS[f](op.get(f)) for f in fields}
+
+
+def _parse_id(op):
+    try:
+        return int(op['id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('id is required')
+
+
+def apply_batch(user, operations):
+    if not isinstance(operations, list):
+        raise BatchError('operations must be a list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise BatchError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+
+    results = [None] * len(operations)
+    creates, updates, deletes = [], [], []
+    seen_ids = set()
+
+    for index, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        try:
+            if kind == 'create':
+                creates.append((index, _parse_fields(op, partial=False)))
+            elif kind in ('update', 'delete'):
+                item_id = _parse_id(op)
+                if item_id in seen_ids:
+                    raise ValueError('item appears more than once in this batch')
+                seen_ids.add(item_id)
+                if kind == 'update':
+                    updates.append((index, item_id, _parse_fields(op, partial=True)))
+                else:
+                    deletes.append((index, item_id))
+            else:
+                raise ValueError("op must be one of 'create', 'update', 'delete'")
+        except ValueError as e:
+            results[index] = {'index': index, 'op': kind, 'status': 'error', 'message': str(e)}
+
+    existing = InventoryItem.objects.filter(user=user, id__in=seen_ids).in_bulk()
+    for index, item_id, *_ in updates + deletes:
+        if item_id not in existing:
+            results[index] = {'index': index, 'op': operations[index]['op'], 'id': item_id,
+                              'status': 'error', 'message': 'Item not found'}
+    updates = [u for u in updates if results[u[0]] is None]
+    deletes = [d for d in deletes if results[d[0]] is None]
+
+    with transaction.atomic(), bulk_write():
+        changes = [fields for _, fields in creates] + [fields for _, _, fields in updates]
+        suppliers = resolve_names(Supplier, user, (c.get('supplier') for c in changes))
+        locations = resolve_names(Location, user, (c.get('location') for c in changes))
+
+        new_items = []
+        for index, fields in creates:
+            new_items.append(InventoryItem(
+                user=user, name=fields['name'], quantity=fields['quantity'], price=fields['price'],
+                supplier_id=suppliers.get(fields['supplier']), location_id=locations.get(fields['location']),
+                **{f: fields[f] for f in STOCK_LEVEL_FIELDS if f in fields},
+            ))
+        InventoryItem.objects.bulk_create(new_items, batch_size=1000)
+        for (index, _), item in zip(creates, new_items):
+            results[index] = {'index': index, 'op': 'create', 'id': item.pk, 'status': 'success'}
+
+        movements = [ledger.movement_for(item, item.quantity, item.quantity) for item in new_items]
+        changed_fields = {'last_updated'}
+        stamp = timezone.now()
+        for index, item_id, fields in updates:
+            item = existing[item_id]
+            old_quantity = item.quantity
+            for name, value in fields.items():
+                if name == 'supplier':
+                    item.supplier_id = suppliers.get(value)
+                elif name == 'location':
+                    item.location_id = locations.get(value)
+                else:
+                    setattr(item, name, value)
+                changed_fields.add(name)
+            item.last_updated = stamp
+            movements.append(ledger.movement_for(item, item.quantity - old_quantity, item.quantity))
+            results[index] = {'index': index, 'op': 'update', 'id': item_id, 'status': 'success'}
+        if updates:
+            InventoryItem.objects.bulk_update(
+                [existing[item_id] for _, item_id, _ in updates], sorted(changed_fields), batch_size=1000
+            )
+
+        if deletes:
+            InventoryItem.objects.filter(user=user, id__in=[item_id for _, item_id in deletes]).delete()
+            for index, item_id in deletes:
+                movements.append(ledger.movement_for(existing[item_id], -existing[item_id].quantity, 0))
+                results[index] = {'index': index, 'op': 'delete', 'id': item_id, 'status': 'success'}
+
+        ledger.record_movements(movements)
+        record_changes(user.id, ChangeLog.ITEM,
+                       [item.pk for item in new_items] + [item_id for _, item_id, _ in updates])
+        record_changes(user.id, ChangeLog.ITEM, [item_id for _, item_id in deletes], ChangeLog.DELETE)
+        if new_items or updates or deletes:
+            inventory_bulk_changed.send(sender=InventoryItem, user_id=user.id)
+
+    failed = sum(1 for r in results if r['status'] == 'error')
+    return {
+        'status': 'success' if not failed else 'partial',
+        'applied': len(results) - failed,
+        'failed': failed,
+        'results': results,
+    }
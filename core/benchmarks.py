@@ -0,0 +1,242 @@
+import json
+import math
+import platform
+import re
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.utils import timezone
+
+from .models import InventoryItem, Location, StockMovement, Supplier
+
+# Items created by the write benchmarks, removed again once the run finishes
+MARKER = '~benchmark~'
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class BenchmarkError(ValueError):
+    pass
+
+
+# -----------------------
+# Endpoints
+# -----------------------
+# Each builder runs outside the timer and returns (method, path, JSON body or None)
+def _sample_item(user):
+    return InventoryItem.objects.filter(user=user).exclude(name__startswith=MARKER).order_by('id').first()
+
+
+def _reference_name(model, user):
+    reference = model.objects.filter(user=user).order_by('id').first()
+    return reference.name if reference else 'Benchmark'
+
+
+def _item_body(user, name, quantity):
+    return {
+        'name': name, 'quantity': quantity, 'price': 1,
+        'supplier': _reference_name(Supplier, user), 'location': _reference_name(Location, user),
+    }
+
+
+def _typo(name):
+    return name[1] + name[0] + name[2:] if len(name) > 1 else name
+
+
+def _edit_request(user, i):
+    item = _sample_item(user)
+    return 'post', reverse('edit_item_api'), {'id': item.id, **_item_body(user, item.name, 10 + i % 2)}
+
+
+def _throwaway_item(user, i):
+    return InventoryItem.objects.create(user=user, name=f"{MARKER} delete {i}", quantity=1, price=1)
+
+
+ENDPOINTS = {
+    'dashboard': lambda user, i: ('get', reverse('dashboard'), None),
+    'dashboard_data': lambda user, i: ('get', reverse('get_dashboard_data'), None),
+    'dashboard_series': lambda user, i: ('get', reverse('get_dashboard_data') + '?format=series', None),
+    'dashboard_location': lambda user, i: (
+        'get', reverse('get_dashboard_data') + '?' + urlencode({
+            'format': 'series', 'location': _reference_name(Location, user),
+        }), None
+    ),
+    'items_page': lambda user, i: ('get', reverse('items_api') + '?limit=50', None),
+    'items_by_quantity': lambda user, i: ('get', reverse('items_api') + '?order=-quantity&limit=50', None),
+    'search_prefix': lambda user, i: (
+        'get', reverse('search_items_api') + '?' + urlencode({'q': _sample_item(user).name[:4]}), None
+    ),
+    # The sample name with its first two letters swapped: a typo the trigram match must absorb
+    'search_fuzzy': lambda user, i: (
+        'get', reverse('search_items_api') + '?' + urlencode({'q': _typo(_sample_item(user).name)}), None
+    ),
+    'locations': lambda user, i: ('get', reverse('locations'), None),
+    'suppliers': lambda user, i: ('get', reverse('suppliers'), None),
+    'insights': lambda user, i: ('get', reverse('insights'), None),
+    'export_csv': lambda user, i: ('get', reverse('export_inventory'), None),
+    'changes': lambda user, i: ('get', reverse('changes_api') + '?cursor=0&limit=200', None),
+    'get_item': lambda user, i: ('get', reverse('get_item_api', args=[_sample_item(user).id]), None),
+    'add_item': lambda user, i: ('post', reverse('add_item'), _item_body(user, f"{MARKER} add {i}", 5)),
+    'edit_item': _edit_request,
+    'delete_item': lambda user, i: ('post', reverse('delete_item_api'), {'id': _throwaway_item(user, i).id}),
+}
+# Reads first: the writes bump the data version and empty the figure cache
+WRITE_ENDPOINTS = ('add_item', 'edit_item', 'delete_item')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+# -----------------------
+# Measuring
+# -----------------------
+def _send(client, method, path, body):
+    streamed = []
+
+    def count(execute, sql, params, many, context):
+        streamed.append(sql)
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    if body is None:
+        response = getattr(client, method)(path)
+    else:
+        response = getattr(client, method)(path, json.dumps(body), content_type='application/json')
+    # Streamed responses (exports) do their work while the body is consumed
+    with connection.execute_wrapper(count):
+        payload = b''.join(response.streaming_content) if response.streaming else response.content
+    elapsed = time.perf_counter() - started
+    # Server-Timing counts every query the view ran, async views' pool connections included
+    queries = int(SERVER_TIMING_QUERIES.search(response['Server-Timing']).group(1)) + len(streamed)
+    return response.status_code, elapsed, queries, len(payload)
+
+
+def measure_endpoint(client, user, name, requests=20, warmup=2):
+    build = ENDPOINTS[name]
+    for i in range(warmup):
+        _send(client, *build(user, i))
+
+    latencies, query_counts, statuses, payload = [], [], set(), 0
+    for i in range(warmup, warmup + requests):
+        status, elapsed, queries, payload = _send(client, *build(user, i))
+        statuses.add(status)
+        latencies.append(elapsed * 1000)
+        query_counts.append(queries)
+
+    # One extra request under tracemalloc: it slows Python down, so it is not timed
+    request = build(user, warmup + requests)
+    tracemalloc.start()
+    try:
+        _send(client, *request)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'payload_bytes': payload,
+        'status': sorted(statuses),
+    }
+
+
+def cleanup(user):
+    InventoryItem.objects.filter(user=user, name__startswith=MARKER).delete()
+
+
+def describe_environment(user):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'database_version': '.'.join(map(str, connection.Database.sqlite_version_info))
+        if connection.vendor == 'sqlite' else str(getattr(connection, 'pg_version', '')),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'dataset': {
+            'user': user.username,
+            'items': InventoryItem.objects.filter(user=user).count(),
+            'locations': Location.objects.filter(user=user).count(),
+            'suppliers': Supplier.objects.filter(user=user).count(),
+            'movements': StockMovement.objects.filter(user=user).count(),
+            'total_items': InventoryItem.objects.count(),
+            'users': User.objects.count(),
+        },
+    }
+
+
+def run_benchmarks(user, endpoints=None, requests=20, warmup=2, progress=None):
+    names = list(endpoints or ENDPOINTS)
+    unknown = [n for n in names if n not in ENDPOINTS]
+    if unknown:
+        raise BenchmarkError(f"Unknown endpoint(s): {', '.join(unknown)}")
+    if _sample_item(user) is None:
+        raise BenchmarkError(f"{user.username} has no items; run generate_dataset first")
+    names.sort(key=lambda n: n in WRITE_ENDPOINTS)
+
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(user)
+    results = {'meta': describe_environment(user), 'endpoints': {}}
+    try:
+        with override_settings(SERVER_TIMING=True):
+            for name in names:
+                results['endpoints'][name] = measure_endpoint(client, user, name, requests, warmup)
+                if progress:
+                    progress(name, results['endpoints'][name])
+    finally:
+        cleanup(user)
+    return results
+
+
+# -----------------------
+# Comparing
+# -----------------------
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb', 'payload_bytes')
+# Below this a latency change is scheduler noise, whatever the percentage
+MIN_LATENCY_DELTA_MS = 2
+
+
+def compare_results(baseline, current):
+    rows = []
+    for name, metrics in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            change = round((new - old) / old * 100, 1) if old else (0.0 if new == old else math.inf)
+            rows.append({'endpoint': name, 'metric': metric, 'baseline': old, 'current': new, 'change_pct': change})
+    return rows
+
+
+def regressions(rows, max_latency_pct):
+    # Latency is noisy, so it gets a tolerance; any extra query is a real regression
+    return [
+        row for row in rows
+        if (row['metric'] == 'p95_ms' and row['change_pct'] > max_latency_pct
+            and row['current'] - row['baseline'] > MIN_LATENCY_DELTA_MS)
+        or (row['metric'] == 'queries' and row['current'] > row['baseline'])
+    ]
@@ -0,0 +1,76 @@
+import hashlib
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .events import publish_on_commit
+from .models import DataVersion
+
+# Bump when the shape of cached figures changes so old entries and ETags die.
+FIGURE_CACHE_VERSION = 1
+
+
+# -----------------------
+# Per-user Data Version
+# -----------------------
+def get_data_version(request):
+    if not hasattr(request, '_data_version'):
+        row, _ = DataVersion.objects.get_or_create(user_id=request.user.id)
+        request._data_version = row.version
+    return request._data_version
+
+
+def bump_data_version(user_id):
+    # Update only: a missing row is created lazily on the next read, and
+    # inserting here would race with a cascading user delete.
+    DataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+    publish_on_commit(user_id, 'inventory')
+
+
+# -----------------------
+# Figure Cache & ETags
+# -----------------------
+def _params_digest(params):
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def figure_cache_key(request, name, **params):
+    return f"fig:{FIGURE_CACHE_VERSION}:{name}:{request.user.id}:{get_data_version(request)}:{_params_digest(params)}"
+
+
+def data_etag(name, *param_names, html=False):
+    def etag_func(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return None
+        params = {p: request.GET.get(p, '') for p in param_names}
+        params.update(kwargs)
+        if html:
+            # Rendered pages embed a CSRF token, so a new CSRF cookie must miss.
+            params['csrf'] = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+        return f"{name}-{FIGURE_CACHE_VERSION}-{request.user.id}-{get_data_version(request)}-{_params_digest(params)}"
+    return etag_func
+
+
+def async_condition(etag_func):
+    # Django's @condition calls etag_func on the event loop, but ours read the data version
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            # auser() and the lazy request.user cache separately; share one lookup
+            request.user = await request.auser()
+            etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if etag and request.method in ('GET', 'HEAD'):
+                response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,153 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import ChangeLog, InventoryItem, Location, Supplier
+
+DEFAULT_FEED_LIMIT = 200
+MAX_FEED_LIMIT = 1000
+# Current state shipped with each upsert, same public names as the items API
+KIND_FIELDS = {
+    ChangeLog.ITEM: (InventoryItem, {
+        'id': 'id',
+        'name': 'name',
+        'quantity': 'quantity',
+        'price': 'price',
+        'supplier': 'supplier__name',
+        'location': 'location__name',
+        'last_updated': 'last_updated',
+    }),
+    ChangeLog.LOCATION: (Location, {'id': 'id', 'name': 'name'}),
+    ChangeLog.SUPPLIER: (Supplier, {'id': 'id', 'name': 'name'}),
+}
+MODEL_KINDS = {InventoryItem: ChangeLog.ITEM, Location: ChangeLog.LOCATION, Supplier: ChangeLog.SUPPLIER}
+
+
+class ChangeFeedError(ValueError):
+    pass
+
+
+class CursorExpired(ChangeFeedError):
+    pass
+
+
+# -----------------------
+# Recording
+# -----------------------
+def record_changes(user_id, kind, object_ids, action=ChangeLog.UPSERT):
+    ChangeLog.objects.bulk_create([
+        ChangeLog(user_id=user_id, kind=kind, object_id=object_id, action=action) for object_id in object_ids
+    ], batch_size=1000)
+
+
+def record_instance_change(instance, action=ChangeLog.UPSERT):
+    record_changes(instance.user_id, MODEL_KINDS[type(instance)], [instance.pk], action)
+
+
+# -----------------------
+# Reading
+# -----------------------
+def _settled():
+    # created_at is taken when a row is written, not when it commits, so the window must be
+    # longer than the longest write transaction (an import chunk included)
+    return ChangeLog.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=settings.CHANGE_FEED_SETTLE_SECONDS)
+    )
+
+
+def latest_cursor():
+    return _settled().aggregate(last=Max('id'))['last'] or 0
+
+
+def parse_cursor(cursor):
+    try:
+        cursor = int(cursor)
+    except (TypeError, ValueError):
+        raise ChangeFeedError('Invalid cursor')
+    if cursor < 0:
+        raise ChangeFeedError('Invalid cursor')
+    # Anything at or after the oldest retained change is complete
+    oldest = ChangeLog.objects.aggregate(first=Min('id'))['first']
+    if oldest is not None and cursor < oldest - 1:
+        raise CursorExpired('Cursor is older than the change feed retention; resync from the items API')
+    return cursor
+
+
+def parse_feed_limit(limit):
+    try:
+        limit = int(limit or DEFAULT_FEED_LIMIT)
+    except ValueError:
+        raise ChangeFeedError('limit must be an integer')
+    return max(1, min(limit, MAX_FEED_LIMIT))
+
+
+def _current_state(user, kind, ids):
+    model, fields = KIND_FIELDS[kind]
+    names = list(fields)
+    rows = model.objects.filter(user=user, pk__in=ids).values_list(*fields.values())
+    state = {}
+    for row in rows:
+        record = dict(zip(names, row))
+        if 'price' in record:
+            record['price'] = float(record['price'])
+        if record.get('last_updated'):
+            record['last_updated'] = record['last_updated'].isoformat()
+        state[record['id']] = record
+    return state
+
+
+def read_changes(user, cursor, limit=DEFAULT_FEED_LIMIT):
+    rows = list(_settled().filter(user=user, id__gt=cursor).order_by('id').values_list(
+        'id', 'kind', 'object_id', 'action'
+    )[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Collapse repeats within the page: only the latest action per object matters
+    latest = {}
+    for _change_id, kind, object_id, action in rows:
+        latest.pop((kind, object_id), None)
+        latest[(kind, object_id)] = action
+
+    upserts = {}
+    for (kind, object_id), action in latest.items():
+        if action == ChangeLog.UPSERT:
+            upserts.setdefault(kind, []).append(object_id)
+    state = {kind: _current_state(user, kind, ids) for kind, ids in upserts.items()}
+
+    changes = []
+    for (kind, object_id), action in latest.items():
+        record = state.get(kind, {}).get(object_id) if action == ChangeLog.UPSERT else None
+        if record is None:
+            # Deleted, or deleted again after this page was written
+            changes.append({'type': kind, 'id': object_id, 'action': ChangeLog.DELETE})
+        else:
+            changes.append({'type': kind, 'id': object_id, 'action': ChangeLog.UPSERT, 'data': record})
+
+    if rows:
+        next_cursor = rows[-1][0]
+    else:
+        # Nothing settled for this user: jump towards the global head so idle cursors never
+        # expire, stopping short of any of their changes that are still settling
+        next_cursor = latest_cursor()
+        pending = ChangeLog.objects.filter(user=user, id__gt=cursor).aggregate(first=Min('id'))['first']
+        if pending is not None:
+            next_cursor = min(next_cursor, pending - 1)
+        next_cursor = max(cursor, next_cursor)
+    return {'changes': changes, 'cursor': str(next_cursor), 'has_more': has_more}
+
+
+# -----------------------
+# Retention
+# -----------------------
+def prune_changes(now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.CHANGE_FEED_RETENTION_DAYS)
+    newest = ChangeLog.objects.aggregate(last=Max('id'))['last']
+    if newest is None:
+        return 0
+    # The newest row always survives so the oldest id keeps marking where history starts
+    removed, _ = ChangeLog.objects.filter(created_at__lt=cutoff, id__lt=newest).delete()
+    return removed
@@ -0,0 +1,124 @@
+import random
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes, ledger
+from .models import ChangeLog, InventoryItem, Location, Supplier
+from .signals import inventory_bulk_changed
+
+DEFAULT_CHUNK_SIZE = 2000
+
+ADJECTIVES = ('Premium', 'Basic', 'Organic', 'Bulk', 'Fresh', 'Dried', 'Industrial', 'Compact', 'Heavy', 'Mini')
+PRODUCTS = (
+    'Maize Flour', 'Sugar', 'Rice', 'Cooking Oil', 'Wheat Flour', 'Beans', 'Salt', 'Tea Leaves', 'Coffee',
+    'Milk Powder', 'Soap', 'Detergent', 'Bolt', 'Nut', 'Washer', 'Cable', 'Battery', 'Paint', 'Nails', 'Tape',
+)
+PLACES = ('Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Malindi', 'Kitale', 'Garissa', 'Nyeri')
+VENDORS = ('AgriCorp', 'SweetDeal', 'GrainHub', 'OilMart', 'FreshFarm', 'BuildPro', 'PowerCell', 'HomeCare')
+
+
+class DatasetError(ValueError):
+    pass
+
+
+def username(prefix, index):
+    return f"{prefix}{index:05}"
+
+
+def reference_names(words, count):
+    # Cycle the vocabulary, numbering repeats so names stay unique per tenant
+    return [words[i % len(words)] + (f" {i // len(words) + 1}" if i >= len(words) else '') for i in range(count)]
+
+
+def item_rows(rng, count, suppliers, locations):
+    for n in range(count):
+        quantity = int(rng.lognormvariate(3.5, 0.9))
+        if rng.random() < 0.01:
+            quantity *= 10  # the odd overstock the anomaly engine should catch
+        elif rng.random() < 0.05:
+            quantity = 0
+        yield (
+            f"{rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)} {n:06}",
+            quantity,
+            Decimal(rng.randint(50, 50000)) / 100,
+            rng.choice(suppliers) if suppliers else None,
+            rng.choice(locations) if locations else None,
+        )
+
+
+def item_history(rng, item, movements, start, span):
+    # Receipt first, then adjustments; the last movement leaves the item at its current quantity
+    moments = sorted(start + timedelta(seconds=rng.randrange(span)) for _ in range(movements))
+    steps = [rng.randint(-15, 20) for _ in range(movements - 1)]
+    quantity = item.quantity
+    afters = [quantity]
+    for step in reversed(steps):
+        quantity = max(quantity - step, 0)
+        afters.append(quantity)
+    afters.reverse()
+    history, previous = [], 0
+    for when, after in zip(moments, afters):
+        history.append(ledger.movement_for(item, after - previous, after, when=when))
+        previous = after
+    return history
+
+
+def generate_user(user, rng, history_rng, items, suppliers, locations, history_days, movements, chunk_size, now):
+    with transaction.atomic():
+        supplier_ids = [s.pk for s in Supplier.objects.bulk_create(
+            [Supplier(user=user, name=name) for name in reference_names(VENDORS, suppliers)]
+        )]
+        location_ids = [loc.pk for loc in Location.objects.bulk_create(
+            [Location(user=user, name=name) for name in reference_names(PLACES, locations)]
+        )]
+        changes.record_changes(user.id, ChangeLog.SUPPLIER, supplier_ids)
+        changes.record_changes(user.id, ChangeLog.LOCATION, location_ids)
+
+    start = now - timedelta(days=history_days)
+    span = max(int((now - start).total_seconds()), 1)
+    rows = item_rows(rng, items, supplier_ids, location_ids)
+    while chunk := [row for _, row in zip(range(chunk_size), rows)]:
+        with transaction.atomic():
+            created = InventoryItem.objects.bulk_create([
+                InventoryItem(user=user, name=name, quantity=quantity, price=price,
+                              supplier_id=supplier_id, location_id=location_id)
+                for name, quantity, price, supplier_id, location_id in chunk
+            ], batch_size=1000)
+            if movements:
+                ledger.record_movements([
+                    movement for item in created for movement in item_history(history_rng, item, movements, start, span)
+                ])
+            changes.record_changes(user.id, ChangeLog.ITEM, [item.pk for item in created])
+    inventory_bulk_changed.send(sender=InventoryItem, user_id=user.id)
+
+
+def generate_dataset(users=1, items=1000, suppliers=8, locations=5, history_days=30, movements=4,
+                     seed=0, prefix='bench', password='bench', chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    # Same arguments, same catalogue: every tenant draws from its own seeded generators, so
+    # chunk size does not matter. History ends at the current hour so trends are always recent.
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    hashed = make_password(password)
+    names = [username(prefix, i) for i in range(users)]
+    if User.objects.filter(username__in=names).exists():
+        raise DatasetError(f"Users named {prefix}NNNNN already exist; flush them first")
+    User.objects.bulk_create([User(username=name, password=hashed) for name in names], batch_size=1000)
+
+    tenants = User.objects.filter(username__in=names).order_by('username')
+    for index, user in enumerate(tenants.iterator()):
+        rng, history_rng = random.Random(f"{seed}:{index}"), random.Random(f"{seed}:{index}:history")
+        generate_user(user, rng, history_rng, items, suppliers, locations, history_days, movements, chunk_size, now)
+        if progress:
+            progress(index + 1, users)
+    return {'users': users, 'items': users * items, 'suppliers': users * suppliers, 'locations': users * locations}
+
+
+def flush_dataset(prefix='bench'):
+    # Cascades to everything the tenants own
+    deleted, _ = User.objects.filter(username__regex=rf'^{re.escape(prefix)}\d{{5}}$').delete()
+    return deleted
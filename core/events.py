@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Subscribers only need to know *that* something changed, so a full queue drops the oldest
+QUEUE_SIZE = 16
+# A burst of writes (imports, batches) reaches each tab as one notification
+COALESCE_SECONDS = 0.25
+
+
+def _channel(user_id):
+    return f"inventory-events:{user_id}"
+
+
+# -----------------------
+# In-process Broker
+# -----------------------
+class LocalSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    # Single process only: fine for one ASGI worker, runserver and tests
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            # Publishers run in sync view threads; hand over to each subscriber's event loop
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                pass  # loop already closed; the subscription is on its way out
+
+    async def subscribe(self, user_id):
+        subscription = LocalSubscription(self, user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.user_id, None)
+
+
+# -----------------------
+# Redis Broker
+# -----------------------
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    # Fans out across web workers and hosts, and reaches tabs from Celery workers too
+    def __init__(self, url):
+        import redis
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def publish(self, user_id, event):
+        self.client.publish(_channel(user_id), json.dumps(event))
+
+    async def subscribe(self, user_id):
+        from redis import asyncio as aioredis
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(_channel(user_id))
+        return RedisSubscription(client, pubsub)
+
+
+@lru_cache(maxsize=1)
+def get_broker():
+    if settings.REDIS_URL:
+        return RedisBroker(settings.REDIS_URL)
+    return LocalBroker()
+
+
+# -----------------------
+# Publishing
+# -----------------------
+def publish(user_id, event_type, **data):
+    # Notifications are best effort: a broker outage must not fail the write that triggered it
+    try:
+        get_broker().publish(user_id, {'type': event_type, **data})
+    except Exception:
+        logger.exception("Could not publish %s event for user %s", event_type, user_id)
+
+
+def publish_on_commit(user_id, event_type, **data):
+    # Tabs refetch as soon as they hear about it, so wait until the write is visible
+    transaction.on_commit(lambda: publish(user_id, event_type, **data))
+
+
+# -----------------------
+# Event Stream
+# -----------------------
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def event_stream(user_id):
+    heartbeat = settings.EVENTS_HEARTBEAT_SECONDS
+    subscription = await get_broker().subscribe(user_id)
+    try:
+        # Reconnect quickly after a deploy or dropped connection
+        yield "retry: 3000\n: connected\n\n"
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is None:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            pending = {event['type']: event}
+            deadline = asyncio.get_running_loop().time() + COALESCE_SECONDS
+            while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+                more = await subscription.get(remaining)
+                if more is None:
+                    break
+                pending[more['type']] = more
+            for event in pending.values():
+                yield format_event(event)
+    finally:
+        # Client went away (the server closes the generator) or the worker is shutting down
+        await subscription.close()
@@ -0,0 +1,111 @@
+import csv
+import json
+import zlib
+
+from .selectors import user_items
+
+# Public column name -> (CSV header, ORM lookup)
+EXPORT_COLUMNS = {
+    'id': ('ID', 'id'),
+    'name': ('Name', 'name'),
+    'quantity': ('Quantity', 'quantity'),
+    'price': ('Price', 'price'),
+    'supplier': ('Supplier', 'supplier__name'),
+    'location': ('Location', 'location__name'),
+    'reorder_point': ('Reorder Point', 'reorder_point'),
+    'target_level': ('Target Level', 'target_level'),
+    'last_updated': ('Last Updated', 'last_updated'),
+    'created_at': ('Created At', 'created_at'),
+}
+DEFAULT_EXPORT_COLUMNS = ['name', 'quantity', 'price', 'supplier', 'location']
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+
+class ExportError(ValueError):
+    pass
+
+
+class Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def parse_columns(columns):
+    if not columns:
+        return list(DEFAULT_EXPORT_COLUMNS)
+    names = [c.strip() for c in columns.split(',') if c.strip()]
+    unknown = [c for c in names if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ExportError(f"Unknown column(s): {', '.join(unknown)}")
+    return names
+
+
+def export_rows(user, columns, location='', supplier=''):
+    items = user_items(user, location, supplier)
+    lookups = [EXPORT_COLUMNS[c][1] for c in columns]
+    # Joined, chunked iterator: a server-side cursor on PostgreSQL, never the full result set
+    return items.order_by('id').values_list(*lookups).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_stream(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow([EXPORT_COLUMNS[c][0] for c in columns])
+    yield from _batched(
+        writer.writerow(['' if value is None else value for value in row]) for row in rows
+    )
+
+
+def ndjson_stream(rows, columns):
+    def encode(row):
+        record = {}
+        for column, value in zip(columns, row):
+            if column == 'price':
+                value = float(value)
+            elif hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            record[column] = value
+        return json.dumps(record) + '\n'
+
+    yield from _batched(encode(row) for row in rows)
+
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(user, fmt='csv', columns=None, location='', supplier='', compress=''):
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Unsupported format: {fmt}")
+    if compress not in ('', 'gzip'):
+        raise ExportError(f"Unsupported compression: {compress}")
+
+    columns = columns or list(DEFAULT_EXPORT_COLUMNS)
+    rows = export_rows(user, columns, location, supplier)
+    chunks = csv_stream(rows, columns) if fmt == 'csv' else ndjson_stream(rows, columns)
+    content_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"inventory.{extension}"
+    if compress:
+        return gzip_stream(chunks), 'application/gzip', filename + '.gz'
+    return chunks, content_type, filename
@@ -0,0 +1,189 @@
+import logging
+import time
+
+import numpy as np
+
+# Daily demand has a weekly rhythm
+SEASON = 7
+# Smoothing parameters tried for every series at once; each series keeps its best pair
+ALPHAS = (0.1, 0.3, 0.6)
+BETAS = (0.0, 0.1)
+DAMPING = 0.9
+# auto: per series, whichever of the smoothing fits and seasonal naive did best on the holdout
+BACKENDS = ('auto', 'smoothing', 'seasonal')
+
+
+# -----------------------
+# Vectorized Methods
+# -----------------------
+# Each takes an items x days matrix and returns items x horizon daily forecasts
+def damped_trend(matrix, alpha, beta, horizon, phi=DAMPING):
+    # Holt's linear method with a damped trend; alpha and beta may be per-row arrays
+    level = matrix[:, :SEASON].mean(axis=1)
+    trend = np.zeros(len(matrix))
+    for t in range(matrix.shape[1]):
+        previous = level
+        level = alpha * matrix[:, t] + (1 - alpha) * (level + phi * trend)
+        trend = beta * (level - previous) + (1 - beta) * phi * trend
+    steps = np.cumsum(phi ** np.arange(1, horizon + 1))
+    return level[:, None] + trend[:, None] * steps[None, :]
+
+
+def seasonal_drift(matrix, horizon):
+    # Last week repeated, shifted by the week-on-week change spread over the days ahead
+    days = np.arange(horizon)
+    last = matrix[:, -SEASON:]
+    drift = np.zeros(len(matrix))
+    if matrix.shape[1] >= 2 * SEASON:
+        drift = (last.mean(axis=1) - matrix[:, -2 * SEASON:-SEASON].mean(axis=1)) / SEASON
+    return last[:, days % SEASON] + drift[:, None] * (days + 1)
+
+
+def candidates(backend):
+    # (label, alpha, beta); alpha None is seasonal naive
+    smoothing = [('smoothing', alpha, beta) for alpha in ALPHAS for beta in BETAS]
+    seasonal = [('seasonal', None, None)]
+    return {'auto': smoothing + seasonal, 'smoothing': smoothing, 'seasonal': seasonal}[backend]
+
+
+def candidate_forecasts(matrix, horizon, grid):
+    # grid x items x horizon. The smoothing grid runs as one pass over a stacked copy per
+    # parameter pair, so the Python loop is over days, never over items or parameters.
+    n = len(matrix)
+    smoothing = [(alpha, beta) for label, alpha, beta in grid if label == 'smoothing']
+    forecasts = []
+    if smoothing:
+        alpha = np.repeat([a for a, _ in smoothing], n)
+        beta = np.repeat([b for _, b in smoothing], n)
+        stacked = damped_trend(np.tile(matrix, (len(smoothing), 1)), alpha, beta, horizon)
+        forecasts += list(stacked.reshape(len(smoothing), n, horizon))
+    if any(label == 'seasonal' for label, _, _ in grid):
+        forecasts.append(seasonal_drift(matrix, horizon))
+    return np.clip(np.array(forecasts), 0, None)
+
+
+# -----------------------
+# Prophet (opt-in)
+# -----------------------
+def prophet_fit(series, start):
+    import pandas as pd
+    from prophet import Prophet  # seconds to import and per fit, so only for chosen items
+
+    # cmdstanpy installs its own INFO handler, logging every fit, unless one is already there
+    cmdstan = logging.getLogger('cmdstanpy')
+    if not cmdstan.handlers:
+        cmdstan.addHandler(logging.NullHandler())
+    cmdstan.setLevel(logging.WARNING)
+    frame = pd.DataFrame({'ds': pd.date_range(start, periods=len(series), freq='D'), 'y': series})
+    return Prophet(yearly_seasonality=False, weekly_seasonality=True, daily_seasonality=False).fit(frame)
+
+
+def prophet_forecast(model, horizon):
+    future = model.make_future_dataframe(periods=horizon, include_history=False)
+    return np.clip(model.predict(future)['yhat'].to_numpy(), 0, None)
+
+
+# -----------------------
+# Fitted Engine
+# -----------------------
+class SeriesForecaster:
+    # Per item id, which candidate won on the holdout (or a fitted Prophet model); items
+    # added since the fit use the candidate that did best overall
+    def __init__(self, grid, horizon, choices, default, prophet=None):
+        self.grid = grid
+        self.horizon = horizon
+        self.choices = choices
+        self.default = default
+        self.prophet = prophet or {}
+
+    def predict(self, item_ids, matrix):
+        chosen = np.array([self.choices.get(item_id, self.default) for item_id in item_ids], dtype=np.int64)
+        forecasts = candidate_forecasts(matrix, self.horizon, self.grid)
+        result = forecasts[chosen, np.arange(len(item_ids))] if len(item_ids) else np.zeros((0, self.horizon))
+        for i, item_id in enumerate(item_ids):
+            if item_id in self.prophet:
+                result[i] = prophet_forecast(self.prophet[item_id], self.horizon)
+        return result
+
+
+def fit_forecaster(item_ids, matrix, horizon, backend='auto', prophet_ids=(), start=None):
+    # Scores every candidate on the last `horizon` days, then keeps each series' best.
+    # Returns the forecaster and holdout metrics; Prophet series are fitted on all days.
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown forecast backend: {backend}")
+    grid = candidates(backend)
+    train, test = matrix[:, :-horizon], matrix[:, -horizon:]
+    errors = np.abs(candidate_forecasts(train, horizon, grid) - test[None]).mean(axis=2)
+    best = errors.argmin(axis=0)
+    default = int(errors.mean(axis=1).argmin()) if len(item_ids) else 0
+
+    prophet = {}
+    for i, item_id in enumerate(item_ids):
+        if item_id in prophet_ids:
+            prophet[item_id] = prophet_fit(matrix[i], start)
+
+    labels = [grid[c][0] for c in best]
+    pace = train[:, -SEASON:].mean(axis=1)[:, None] if train.shape[1] else np.zeros((len(matrix), 1))
+    metrics = {
+        'mae': round(float(errors[best, np.arange(len(item_ids))].mean()), 3) if len(item_ids) else 0.0,
+        # Naive baseline: last week's daily pace carried forward
+        'baseline_mae': round(float(np.abs(pace - test).mean()), 3) if len(item_ids) else 0.0,
+        'backend': backend,
+        'methods': {label: labels.count(label) for label in sorted(set(labels))},
+        'prophet_items': len(prophet),
+        'horizon_days': horizon,
+    }
+    forecaster = SeriesForecaster(grid, horizon, dict(zip(item_ids, best.tolist())), default, prophet)
+    return forecaster, metrics
+
+
+# -----------------------
+# Benchmarks
+# -----------------------
+def generate_history(rng, items, days):
+    # Poisson daily demand around a per-series level, weekly pattern and gentle trend
+    level = rng.lognormal(1.0, 1.0, size=(items, 1))
+    phase = rng.integers(0, SEASON, size=(items, 1))
+    weekly = 1 + rng.uniform(0, 0.6, size=(items, 1)) * np.sin(2 * np.pi * (np.arange(days) + phase) / SEASON)
+    trend = 1 + rng.normal(0, 0.004, size=(items, 1)) * np.arange(days)
+    return rng.poisson(np.clip(level * weekly * trend, 0, None)).astype(np.float64)
+
+
+def benchmark_backends(items=2000, days=120, horizon=7, prophet_items=10, seed=0):
+    # Fits each backend on generated history minus the last `horizon` days and scores that
+    # holdout. Prophet runs on the first prophet_items series only; every backend is also
+    # scored on that subset ('sample_mae') for a like-for-like comparison.
+    rng = np.random.default_rng(seed)
+    history = generate_history(rng, items, days)
+    ids = list(range(items))
+    seen, future = history[:, :-horizon], history[:, -horizon:]
+    sample = slice(0, min(prophet_items, items))
+    start = np.datetime64('2026-01-01')
+
+    def scored(name, fit_and_forecast, rows):
+        started = time.perf_counter()
+        forecast = fit_and_forecast()
+        seconds = time.perf_counter() - started
+        errors = np.abs(forecast - future[rows]).mean(axis=1)
+        # No sample with --prophet-items 0; the mean of nothing is NaN, which is not JSON
+        sampled = errors[sample]
+        return {
+            'backend': name,
+            'series': len(errors),
+            'seconds': round(seconds, 4),
+            'series_per_second': round(len(errors) / seconds, 1) if seconds else None,
+            'mae': round(float(errors.mean()), 3),
+            'sample_mae': round(float(sampled.mean()), 3) if sampled.size else None,
+        }
+
+    results = []
+    for backend in BACKENDS:
+        def run(backend=backend):
+            forecaster, _ = fit_forecaster(ids, seen, horizon, backend)
+            return forecaster.predict(ids, seen)
+        results.append(scored(backend, run, slice(None)))
+    if prophet_items:
+        results.append(scored('prophet', lambda: np.array([
+            prophet_forecast(prophet_fit(series, start), horizon) for series in seen[sample]
+        ]), sample))
+    return {'items': items, 'days': days, 'horizon_days': horizon, 'results': results}
@@ -0,0 +1,215 @@
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import changes, ledger, references
+from .models import ChangeLog, InventoryItem, Location, Supplier
+from .signals import inventory_bulk_changed
+
+REQUIRED_COLUMNS = ('name', 'quantity', 'price', 'supplier', 'location')
+DEFAULT_CHUNK_SIZE = 5000
+MAX_REPORTED_REJECTS = 100
+MAX_PRICE = Decimal('99999999.99')
+# IntegerField is 32-bit in PostgreSQL; a larger value would abort the whole chunk
+MAX_QUANTITY = 2 ** 31 - 1
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+def _text(value, label):
+    # CSV cells are always strings, but batch operations are JSON and may hold anything
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{label} must be a string")
+    return (value or '').strip()
+
+
+def parse_name(value):
+    name = _text(value, 'name')
+    if not name:
+        raise ValueError('name is required')
+    if len(name) > 100:
+        raise ValueError('name is longer than 100 characters')
+    return name
+
+
+def parse_quantity(value):
+    try:
+        quantity = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"invalid quantity {value!r}")
+    if quantity < 0:
+        raise ValueError('quantity cannot be negative')
+    if quantity > MAX_QUANTITY:
+        raise ValueError(f"invalid quantity {value!r}")
+    return quantity
+
+
+def parse_price(value):
+    try:
+        price = Decimal(str(value).strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"invalid price {value!r}")
+    if not price.is_finite() or abs(price) > MAX_PRICE:
+        raise ValueError(f"invalid price {value!r}")
+    return price
+
+
+def parse_level(value, label):
+    try:
+        level = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"invalid {label} {value!r}")
+    if level < 0:
+        raise ValueError(f"{label} cannot be negative")
+    if level > MAX_QUANTITY:
+        raise ValueError(f"invalid {label} {value!r}")
+    return level
+
+
+def parse_reference(value, label):
+    name = _text(value, label) or None
+    if name and len(name) > 100:
+        raise ValueError(f"{label} is longer than 100 characters")
+    return name
+
+
+FIELD_PARSERS = {
+    'name': parse_name,
+    'quantity': parse_quantity,
+    'price': parse_price,
+    'supplier': lambda value: parse_reference(value, 'supplier'),
+    'location': lambda value: parse_reference(value, 'location'),
+    'reorder_point': lambda value: parse_level(value, 'reorder_point'),
+    'target_level': lambda value: parse_level(value, 'target_level'),
+}
+
+
+def parse_row(row):
+    return tuple(FIELD_PARSERS[column](row.get(column)) for column in REQUIRED_COLUMNS)
+
+
+def resolve_names(model, user, names):
+    # Cached names first, then one lookup per chunk and one bulk insert for names we have not seen yet
+    names = {n for n in names if n}
+    generation = references.generations(user.id)[references.KINDS[model]]
+    ids = references.cached_ids(model, user.id, names, generation)
+    found = dict(model.objects.filter(user=user, name__in=names - ids.keys()).values_list('name', 'id'))
+    missing = names - ids.keys() - found.keys()
+    if missing:
+        # A concurrent import may create the same name first; the unique constraint keeps one
+        model.objects.bulk_create([model(user=user, name=name) for name in sorted(missing)], ignore_conflicts=True)
+        created = dict(model.objects.filter(user=user, name__in=missing).values_list('name', 'id'))
+        changes.record_changes(user.id, changes.MODEL_KINDS[model], created.values())
+        found.update(created)
+    if found:
+        references.remember(model, user.id, found, generation)
+    ids.update(found)
+    return ids
+
+
+def copy_items(user, rows):
+    # COPY into a temporary staging table, then move the rows across with one
+    # INSERT ... SELECT ... RETURNING: the new ids come from the insert itself, so rows another
+    # writer adds for the same user meanwhile are never taken for this import's
+    table = InventoryItem._meta.db_table
+    columns = [InventoryItem._meta.get_field(f).column for f in
+               ('user', 'name', 'quantity', 'price', 'supplier', 'location', 'last_updated', 'created_at')]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for name, quantity, price, supplier_id, location_id in rows:
+        writer.writerow([name, quantity, price,
+                         '' if supplier_id is None else supplier_id,
+                         '' if location_id is None else location_id])
+    buffer.seek(0)
+    stamp = timezone.now()
+    with connection.cursor() as cursor:
+        # Dropped at commit; emptied first in case an outer transaction keeps it across chunks
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS core_import_staging (name varchar(100), quantity integer, "
+            "price numeric(10, 2), supplier_id bigint, location_id bigint) ON COMMIT DROP"
+        )
+        cursor.execute("TRUNCATE core_import_staging")
+        cursor.cursor.copy_expert(
+            "COPY core_import_staging (name, quantity, price, supplier_id, location_id) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            "SELECT %s, name, quantity, price, supplier_id, location_id, %s, %s FROM core_import_staging "
+            "RETURNING id, name, quantity, price, supplier_id, location_id",
+            [user.id, stamp, stamp],
+        )
+        return [
+            InventoryItem(id=pk, user=user, name=name, quantity=quantity, price=price,
+                          supplier_id=supplier_id, location_id=location_id)
+            for pk, name, quantity, price, supplier_id, location_id in cursor.fetchall()
+        ]
+
+
+def insert_items(user, rows, use_copy):
+    if use_copy:
+        return copy_items(user, rows)
+    return InventoryItem.objects.bulk_create([
+        InventoryItem(user=user, name=name, quantity=quantity, price=price,
+                      supplier_id=supplier_id, location_id=location_id)
+        for name, quantity, price, supplier_id, location_id in rows
+    ], batch_size=1000)
+
+
+def import_inventory_csv(user, fileobj, chunk_size=DEFAULT_CHUNK_SIZE, use_copy=False):
+    reader = csv.DictReader(fileobj)
+    header = [c.strip().lower() for c in reader.fieldnames or []]
+    missing = [c for c in REQUIRED_COLUMNS if c not in header]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+    reader.fieldnames = header
+
+    use_copy = use_copy and connection.vendor == 'postgresql'
+    started = time.perf_counter()
+    stats = {'rows': 0, 'imported': 0, 'rejected': 0, 'rejects': [],
+             'method': 'copy' if use_copy else 'bulk_create'}
+    line = 1  # header
+
+    try:
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+
+            parsed = []
+            for row in chunk:
+                line += 1
+                try:
+                    parsed.append(parse_row(row))
+                except ValueError as e:
+                    stats['rejected'] += 1
+                    if len(stats['rejects']) < MAX_REPORTED_REJECTS:
+                        stats['rejects'].append({'line': line, 'error': str(e)})
+            stats['rows'] += len(chunk)
+            if not parsed:
+                continue
+
+            with transaction.atomic():
+                suppliers = resolve_names(Supplier, user, (p[3] for p in parsed))
+                locations = resolve_names(Location, user, (p[4] for p in parsed))
+                items = insert_items(user, [
+                    (name, quantity, price, suppliers.get(supplier), locations.get(location))
+                    for name, quantity, price, supplier, location in parsed
+                ], use_copy)
+                ledger.record_movements([ledger.movement_for(item, item.quantity, item.quantity) for item in items])
+                changes.record_changes(user.id, ChangeLog.ITEM, [item.pk for item in items])
+            stats['imported'] += len(parsed)
+    finally:
+        if stats['imported']:
+            inventory_bulk_changed.send(sender=InventoryItem, user_id=user.id)
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    stats['rows_per_sec'] = round(stats['rows'] / stats['seconds']) if stats['seconds'] else stats['rows']
+    return stats
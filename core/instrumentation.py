@@ -0,0 +1,199 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.utils import timezone
+
+# Seconds; upper bounds of the latency histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# -----------------------
+# Request Timings
+# -----------------------
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        # Async views run queries from several pool threads at once
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def record_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.sql_count += 1
+                self.sql_seconds += elapsed
+
+    def server_timing(self, total):
+        metrics = [f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.sql_count} queries"']
+        metrics += [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ', '.join(metrics)
+
+
+_current = ContextVar('request_timings', default=None)
+
+
+def begin_request():
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def timed(phase):
+    # Cheap enough to leave in hot paths: outside a request it only reads a ContextVar
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+def timed_function(phase):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# -----------------------
+# Latency Histograms
+# -----------------------
+class LatencyHistograms:
+    # Per process: each worker exposes its own series, as Prometheus client libraries do
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, status, seconds, queries, sql_seconds):
+        key = (view, method, str(status))
+        with self._lock:
+            series = self._series.setdefault(key, {
+                'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0, 'queries': 0, 'sql_sum': 0.0,
+            })
+            series['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            series['sum'] += seconds
+            series['count'] += 1
+            series['queries'] += queries
+            series['sql_sum'] += sql_seconds
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: {**s, 'buckets': list(s['buckets'])} for key, s in self._series.items()}
+        lines = [
+            '# HELP http_request_duration_seconds Time spent handling requests, by view.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (view, method, status), series in sorted(snapshot.items()):
+            labels = f'view="{_escape(view)}",method="{method}",status="{status}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['buckets']):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {series["sum"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {series["count"]}')
+        lines += [
+            '# HELP http_request_db_queries_total Database queries run while handling requests.',
+            '# TYPE http_request_db_queries_total counter',
+        ]
+        lines += [
+            f'http_request_db_queries_total{{view="{_escape(view)}",method="{method}",status="{status}"}} '
+            f'{series["queries"]}'
+            for (view, method, status), series in sorted(snapshot.items())
+        ]
+        lines += [
+            '# HELP http_request_db_seconds_total Time spent in database queries while handling requests.',
+            '# TYPE http_request_db_seconds_total counter',
+        ]
+        lines += [
+            f'http_request_db_seconds_total{{view="{_escape(view)}",method="{method}",status="{status}"}} '
+            f'{series["sql_sum"]:.6f}'
+            for (view, method, status), series in sorted(snapshot.items())
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+histograms = LatencyHistograms()
+
+
+# -----------------------
+# Sampling Profiler
+# -----------------------
+class StackSampler:
+    # Samples one thread's Python stack on a timer; cheap enough to run only on opted-in
+    # deployments, and results are only kept for requests over the slow threshold
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='stack-sampler')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, directory, label):
+        # Folded stacks, one "frame;frame;frame count" line each: the input flamegraph.pl and speedscope take
+        os.makedirs(directory, exist_ok=True)
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+        path = os.path.join(directory, f"{stamp}-{label}.folded")
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
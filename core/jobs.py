@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .caching import get_data_version
+from .models import AnalyticsResult
+
+
+# -----------------------
+# Analytics Jobs
+# -----------------------
+def latest_result(request, kind, refresh=False):
+    key = f'_latest_{kind}'
+    if refresh or not hasattr(request, key):
+        setattr(request, key, AnalyticsResult.objects.filter(
+            user=request.user, kind=kind, status=AnalyticsResult.DONE
+        ).order_by('-data_version').first())
+    return getattr(request, key)
+
+
+def result_tag(result):
+    # For ETags: changes with every stored result, a nightly rerun at the same version included
+    return f"{result.data_version}.{result.finished_at.timestamp():.0f}" if result and result.finished_at else 'none'
+
+
+def _in_flight(job):
+    # A job the worker lost (crash, redeploy) is retried after the timeout
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYTICS_JOB_TIMEOUT)
+    return job.status in (AnalyticsResult.PENDING, AnalyticsResult.RUNNING) and job.requested_at > cutoff
+
+
+def _backing_off(job):
+    # A failed job is not queued again by every page load and poll: a deterministic
+    # failure would loop forever. It waits for a forced rerun or ANALYTICS_RETRY_AFTER.
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYTICS_RETRY_AFTER)
+    return job.status == AnalyticsResult.FAILED and job.finished_at is not None and job.finished_at > cutoff
+
+
+def request_job(request, kind, force=False):
+    from .tasks import compute_analytics
+
+    version = get_data_version(request)
+    job = AnalyticsResult.objects.filter(user=request.user, kind=kind, data_version=version).first()
+    if job is not None and _in_flight(job):
+        return job
+    if job is not None and not force and (job.status == AnalyticsResult.DONE or _backing_off(job)):
+        return job
+
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = AnalyticsResult.objects.create(user=request.user, kind=kind, data_version=version)
+        except IntegrityError:
+            # Another request queued the same version first
+            return AnalyticsResult.objects.get(user=request.user, kind=kind, data_version=version)
+    else:
+        job.status = AnalyticsResult.PENDING
+        job.error = ''
+        job.requested_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'requested_at'])
+
+    transaction.on_commit(lambda: compute_analytics.delay(job.pk))
+    return job
+
+
+def job_status(request, kind, job):
+    latest = latest_result(request, kind, refresh=True)
+    return {
+        'status': job.status,
+        'data_version': job.data_version,
+        'result_version': latest.data_version if latest else None,
+        'fresh': latest is not None and latest.data_version == job.data_version,
+        'error': job.error,
+    }
@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import StockMovement, StockRollup
+
+MAX_TREND_ROWS = 5000
+
+
+# -----------------------
+# Buckets
+# -----------------------
+def bucket_start(moment, granularity):
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == StockRollup.DAY:
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def movement_for(item, change, quantity_after, when=None):
+    return StockMovement(
+        user_id=item.user_id,
+        item_id=item.pk,
+        item_name=item.name,
+        location_id=item.location_id,
+        supplier_id=item.supplier_id,
+        change=change,
+        quantity_after=quantity_after,
+        created_at=when or timezone.now(),
+    )
+
+
+# -----------------------
+# Recording
+# -----------------------
+def record_movements(movements):
+    movements = [m for m in movements if m.change]
+    if not movements:
+        return
+    with transaction.atomic():
+        StockMovement.objects.bulk_create(movements, batch_size=1000)
+        by_user = {}
+        for movement in movements:
+            by_user.setdefault(movement.user_id, []).append(movement)
+        for user_id, user_movements in by_user.items():
+            apply_to_rollups(user_id, user_movements)
+
+
+def _merge(deltas, movements):
+    for m in movements:
+        for granularity in (StockRollup.HOUR, StockRollup.DAY):
+            key = (granularity, bucket_start(m.created_at, granularity), m.item_id)
+            delta = deltas.setdefault(key, {'inbound': 0, 'outbound': 0, 'movements': 0})
+            delta['inbound'] += max(m.change, 0)
+            delta['outbound'] += max(-m.change, 0)
+            delta['movements'] += 1
+            # Movements arrive in order, so the last one sets the closing state
+            delta.update(closing_quantity=m.quantity_after, item_name=m.item_name,
+                         location_id=m.location_id, supplier_id=m.supplier_id)
+    return deltas
+
+
+def apply_to_rollups(user_id, movements, retry=True):
+    deltas = _merge({}, movements)
+    buckets = {key[1] for key in deltas}
+    item_ids = {key[2] for key in deltas}
+    try:
+        with transaction.atomic():
+            existing = {
+                (r.granularity, r.bucket_start, r.item_id): r
+                for r in StockRollup.objects.select_for_update().filter(
+                    user_id=user_id, bucket_start__in=buckets, item_id__in=item_ids
+                )
+            }
+            changed, created = [], []
+            for key, delta in deltas.items():
+                rollup = existing.get(key)
+                if rollup is None:
+                    rollup = StockRollup(user_id=user_id, granularity=key[0], bucket_start=key[1], item_id=key[2])
+                    created.append(rollup)
+                else:
+                    changed.append(rollup)
+                rollup.inbound += delta['inbound']
+                rollup.outbound += delta['outbound']
+                rollup.movements += delta['movements']
+                rollup.closing_quantity = delta['closing_quantity']
+                rollup.item_name = delta['item_name']
+                rollup.location_id = delta['location_id']
+                rollup.supplier_id = delta['supplier_id']
+            StockRollup.objects.bulk_update(changed, [
+                'inbound', 'outbound', 'movements', 'closing_quantity', 'item_name', 'location', 'supplier'
+            ], batch_size=1000)
+            StockRollup.objects.bulk_create(created, batch_size=1000)
+    except IntegrityError:
+        # A concurrent writer created one of our buckets first; merge into it instead
+        if not retry:
+            raise
+        apply_to_rollups(user_id, movements, retry=False)
+
+
+# -----------------------
+# Rebuild & Compaction
+# -----------------------
+def rebuild_rollups(since, user_id=None, chunk_size=5000):
+    start = bucket_start(since, StockRollup.DAY)
+    rollups = StockRollup.objects.filter(bucket_start__gte=start)
+    movements = StockMovement.objects.filter(created_at__gte=start).order_by('id')
+    if user_id is not None:
+        rollups = rollups.filter(user_id=user_id)
+        movements = movements.filter(user_id=user_id)
+
+    with transaction.atomic():
+        rollups.delete()
+        by_user = {}
+        for movement in movements.iterator(chunk_size=chunk_size):
+            by_user.setdefault(movement.user_id, []).append(movement)
+            if len(by_user[movement.user_id]) >= chunk_size:
+                apply_to_rollups(movement.user_id, by_user.pop(movement.user_id))
+        for uid, pending in by_user.items():
+            apply_to_rollups(uid, pending)
+
+
+def compact_history(now=None):
+    now = now or timezone.now()
+    hourly_cutoff = bucket_start(now - timedelta(days=settings.STOCK_HOURLY_ROLLUP_RETENTION_DAYS), StockRollup.HOUR)
+    daily_cutoff = bucket_start(now - timedelta(days=settings.STOCK_DAILY_ROLLUP_RETENTION_DAYS), StockRollup.DAY)
+    movement_cutoff = now - timedelta(days=settings.STOCK_MOVEMENT_RETENTION_DAYS)
+
+    # Daily rollups already carry the totals of the hours being dropped
+    hourly, _ = StockRollup.objects.filter(granularity=StockRollup.HOUR, bucket_start__lt=hourly_cutoff).delete()
+    daily, _ = StockRollup.objects.filter(granularity=StockRollup.DAY, bucket_start__lt=daily_cutoff).delete()
+    raw, _ = StockMovement.objects.filter(created_at__lt=movement_cutoff).delete()
+    return {'hourly_rollups': hourly, 'daily_rollups': daily, 'movements': raw}
+
+
+# -----------------------
+# Chart Reads
+# -----------------------
+def trend_rows(user, granularity, days, location_name=''):
+    since = bucket_start(timezone.now() - timedelta(days=days), granularity)
+    rows = StockRollup.objects.filter(user=user, granularity=granularity, bucket_start__gte=since)
+    if location_name:
+        rows = rows.filter(location__name=location_name)
+    rows = rows.order_by('-bucket_start', 'item_name').values_list(
+        'bucket_start', 'item_name', 'closing_quantity', 'outbound'
+    )[:MAX_TREND_ROWS]
+    return sorted(rows)
@@ -0,0 +1,76 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import ENDPOINTS, BenchmarkError, compare_results, regressions, run_benchmarks
+from core.datagen import username
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main endpoints in-process against the configured database (see DATABASE_URL): "
+        "latency percentiles, queries, peak Python memory and payload size per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=username('bench', 0),
+                            help="Tenant to benchmark as (default the first generate_dataset tenant).")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', choices=sorted(ENDPOINTS),
+                            help="Endpoint to run; repeat for several (default all).")
+        parser.add_argument('--requests', type=int, default=20, help="Timed requests per endpoint (default 20).")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint first (default 2).")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+        parser.add_argument('--compare', help="Baseline results JSON to compare against.")
+        parser.add_argument('--max-regression', type=float, default=25.0,
+                            help="With --compare, fail when an endpoint's p95 grows by more than this percent "
+                                 "(default 25); any extra query always fails.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['warmup'] < 0:
+            raise CommandError("--requests must be at least 1 and --warmup cannot be negative")
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['user']} (run generate_dataset first)")
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<20} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+                f"{result['queries']:>3} queries  {result['peak_memory_kb']:>9.1f} KB peak  "
+                f"{result['payload_bytes']:>10} bytes"
+            )
+
+        try:
+            results = run_benchmarks(user, options['endpoints'], options['requests'], options['warmup'], progress)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        failed = [name for name, result in results['endpoints'].items() if result['status'][-1] >= 400]
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        problems = [f"{name} returned HTTP errors" for name in failed]
+        if baseline is not None:
+            rows = compare_results(baseline, results)
+            for row in rows:
+                self.stdout.write(
+                    f"{row['endpoint']:<20} {row['metric']:<15} {row['baseline']:>12} -> {row['current']:>12} "
+                    f"({row['change_pct']:+.1f}%)"
+                )
+            problems += [
+                f"{row['endpoint']} {row['metric']} {row['baseline']} -> {row['current']}"
+                for row in regressions(rows, options['max_regression'])
+            ]
+        if problems:
+            raise CommandError("Regressions: " + "; ".join(problems))
@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.forecasting import benchmark_backends
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the forecasting backends on generated daily demand: fit and forecast time, "
+        "series per second and holdout MAE. Touches no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=2000, help="Series to generate (default 2000).")
+        parser.add_argument('--days', type=int, default=120, help="Days of history per series (default 120).")
+        parser.add_argument('--horizon', type=int, default=7, help="Days held out and forecast (default 7).")
+        parser.add_argument('--prophet-items', type=int, default=10,
+                            help="Series to also run through Prophet, about a second each (default 10, 0 to skip).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the generated history.")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+
+    def handle(self, *args, **options):
+        if options['items'] < 1 or options['prophet_items'] < 0:
+            raise CommandError("--items must be at least 1 and --prophet-items cannot be negative")
+        if options['horizon'] < 1 or options['days'] < options['horizon'] * 3:
+            raise CommandError("--days must be at least three times --horizon")
+
+        summary = benchmark_backends(options['items'], options['days'], options['horizon'],
+                                     options['prophet_items'], options['seed'])
+        if options['json']:
+            self.stdout.write(json.dumps(summary))
+            return
+        self.stdout.write(f"{summary['items']} series, {summary['days']} days, {summary['horizon_days']}-day holdout")
+        for result in summary['results']:
+            sample = '' if result['sample_mae'] is None else f"  sample MAE {result['sample_mae']:>7.3f}"
+            self.stdout.write(
+                f"{result['backend']:<10} {result['series']:>7} series  {result['seconds']:>9.4f}s  "
+                f"{result['series_per_second']:>11} series/s  MAE {result['mae']:>7.3f}{sample}"
+            )
@@ -0,0 +1,86 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules a web worker should not pay for until an analytics endpoint needs them
+HEAVY_MODULES = ('pandas', 'numpy', 'plotly', 'prophet', 'sklearn')
+
+# What the Procfile's web process serves
+DEFAULT_APP = 'inventory_system.asgi:application'
+
+# Runs in a fresh interpreter: import the app module the way the server does (building the
+# handler and its middleware chain), then load the URLconf
+PROBE = """
+import importlib, json, os, resource, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+application = getattr(importlib.import_module({module!r}), {attribute!r})
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_modules': sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+
+def probe_startup(app=DEFAULT_APP):
+    module, _, attribute = app.partition(':')
+    code = PROBE.format(settings_module=settings.SETTINGS_MODULE, module=module, attribute=attribute or 'application',
+                        heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=settings.BASE_DIR)
+    if completed.returncode:
+        raise CommandError(f"Worker boot failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = "Measure cold worker boot time and memory, failing on budget regressions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to boot (default 5).")
+        parser.add_argument('--app', default=DEFAULT_APP,
+                            help=f"module:attribute of the application to boot (default {DEFAULT_APP}).")
+        parser.add_argument('--max-seconds', type=float, help="Fail if the median boot time exceeds this.")
+        parser.add_argument('--max-rss-mb', type=float, help="Fail if the median peak RSS exceeds this.")
+        parser.add_argument('--allow-heavy', action='store_true', help="Do not fail when analytics modules load at boot.")
+        parser.add_argument('--json', action='store_true', help="Print the summary as JSON.")
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError("--runs must be at least 1")
+
+        samples = [probe_startup(options['app']) for _ in range(options['runs'])]
+        summary = {
+            'app': options['app'],
+            'runs': len(samples),
+            'median_seconds': round(statistics.median(s['seconds'] for s in samples), 3),
+            'max_seconds': round(max(s['seconds'] for s in samples), 3),
+            'median_rss_mb': round(statistics.median(s['max_rss_kb'] for s in samples) / 1024, 1),
+            'heavy_modules': sorted({m for s in samples for m in s['heavy_modules']}),
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary))
+        else:
+            self.stdout.write(
+                f"Booted {summary['app']} in {summary['runs']} worker(s): median {summary['median_seconds']}s "
+                f"(max {summary['max_seconds']}s), median peak RSS {summary['median_rss_mb']} MB"
+            )
+            if summary['heavy_modules']:
+                self.stdout.write(f"Loaded at boot: {', '.join(summary['heavy_modules'])}")
+
+        problems = []
+        if summary['heavy_modules'] and not options['allow_heavy']:
+            problems.append(f"analytics modules imported at boot: {', '.join(summary['heavy_modules'])}")
+        if options['max_seconds'] is not None and summary['median_seconds'] > options['max_seconds']:
+            problems.append(f"median boot {summary['median_seconds']}s over {options['max_seconds']}s budget")
+        if options['max_rss_mb'] is not None and summary['median_rss_mb'] > options['max_rss_mb']:
+            problems.append(f"median RSS {summary['median_rss_mb']} MB over {options['max_rss_mb']} MB budget")
+        if problems:
+            raise CommandError("; ".join(problems))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.ledger import compact_history, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Drop stock movements and rollups past their retention period, optionally re-deriving recent rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild-days', type=int, default=0,
+                            help="Re-derive rollups for the last N days from raw movements first.")
+
+    def handle(self, *args, **options):
+        # Rollups older than the movement retention can no longer be re-derived
+        days = min(options['rebuild_days'], settings.STOCK_MOVEMENT_RETENTION_DAYS - 1)
+        if days > 0:
+            rebuild_rollups(timezone.now() - timedelta(days=days))
+            self.stdout.write(f"Rebuilt rollups for the last {days} day(s)")
+
+        removed = compact_history()
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed['movements']} movement(s), {removed['hourly_rollups']} hourly "
+            f"and {removed['daily_rollups']} daily rollup(s)"
+        ))
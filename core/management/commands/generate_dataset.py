@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.datagen import DEFAULT_CHUNK_SIZE, DatasetError, flush_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Generate a reproducible synthetic inventory of benchmark tenants (users named <prefix>00000...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help="Tenants to create (default 1).")
+        parser.add_argument('--items', type=int, default=1000, help="Items per tenant (default 1000).")
+        parser.add_argument('--suppliers', type=int, default=8, help="Suppliers per tenant (default 8).")
+        parser.add_argument('--locations', type=int, default=5, help="Locations per tenant (default 5).")
+        parser.add_argument('--history-days', type=int, default=30, help="Days of stock movement history (default 30).")
+        parser.add_argument('--movements', type=int, default=4,
+                            help="Ledger movements per item, the initial receipt included (default 4, 0 for none).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help="Username prefix (default 'bench').")
+        parser.add_argument('--password', default='bench', help="Password for every generated tenant.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--flush', action='store_true', help="Delete existing tenants with this prefix first.")
+
+    def handle(self, *args, **options):
+        for option in ('users', 'items', 'suppliers', 'locations', 'history_days', 'movements'):
+            if options[option] < 0:
+                raise CommandError(f"--{option.replace('_', '-')} cannot be negative")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        if options['flush']:
+            deleted = flush_dataset(options['prefix'])
+            self.stdout.write(f"Flushed {deleted} row(s) owned by {options['prefix']}* tenants")
+
+        def progress(done, total):
+            if done == total or done % max(total // 20, 1) == 0:
+                self.stdout.write(f"  {done}/{total} tenant(s)")
+
+        started = time.perf_counter()
+        try:
+            stats = generate_dataset(
+                users=options['users'],
+                items=options['items'],
+                suppliers=options['suppliers'],
+                locations=options['locations'],
+                history_days=options['history_days'],
+                movements=options['movements'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                password=options['password'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+            )
+        except DatasetError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {stats['users']} tenant(s), {stats['items']} item(s), {stats['suppliers']} supplier(s) "
+            f"and {stats['locations']} location(s) in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import DEFAULT_CHUNK_SIZE, ImportFileError, import_inventory_csv
+
+
+class Command(BaseCommand):
+    help = "Bulk import inventory items for one user from a CSV with name,quantity,price,supplier,location columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import.")
+        parser.add_argument('--user', required=True, help="Username that will own the imported items.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--copy', action='store_true', help="Use COPY FROM STDIN on PostgreSQL.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user: {options['user']}")
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                stats = import_inventory_csv(user, f, chunk_size=options['chunk_size'], use_copy=options['copy'])
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        for reject in stats['rejects']:
+            self.stderr.write(f"line {reject['line']}: {reject['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['imported']} of {stats['rows']} row(s) via {stats['method']} "
+            f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec), rejected {stats['rejected']}"
+        ))
@@ -0,0 +1,82 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.precompute import Checkpoint, run_precompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit demand forecasts and compute insights for every user ahead of time, so the pages "
+        "read stored results. Resumes an interrupted run from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', help="Limit to this username (repeatable).")
+        parser.add_argument('--workers', type=int, default=settings.PRECOMPUTE_WORKERS,
+                            help="Worker processes; 1 runs in this process (default PRECOMPUTE_WORKERS).")
+        parser.add_argument('--chunk-size', type=int, default=settings.PRECOMPUTE_CHUNK_SIZE,
+                            help="Users per task and per checkpoint (default PRECOMPUTE_CHUNK_SIZE).")
+        parser.add_argument('--checkpoint', default=settings.PRECOMPUTE_CHECKPOINT,
+                            help="Progress file (default PRECOMPUTE_CHECKPOINT).")
+        parser.add_argument('--restart', action='store_true', help="Ignore an unfinished run and start over.")
+        parser.add_argument('--output', help="Write the per-tenant timings as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers and --chunk-size must be at least 1")
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        checkpoint = Checkpoint(options['checkpoint'], options['usernames'])
+        resume = not options['restart'] and checkpoint.load() is not None
+        if resume and not checkpoint.same_selection():
+            selection = ', '.join(checkpoint.state.get('usernames') or ['all users'])
+            raise CommandError(f"The unfinished run started {checkpoint.state['started_at']} was for {selection}; "
+                               f"repeat its --user options to resume it, or pass --restart")
+        if resume:
+            self.stdout.write(f"Resuming the run started {checkpoint.state['started_at']}: "
+                              f"{len(checkpoint.state['pending'])} user(s) left")
+
+        def progress(row):
+            outcome = f"failed: {row['error']}" if 'error' in row else f"{row['items']} item(s)"
+            self.stdout.write(f"{row['username']:<20} {row['seconds']:>8.3f}s  {outcome}")
+
+        started = time.perf_counter()
+        tenants = run_precompute(list(users.values_list('id', flat=True)), checkpoint, options['workers'],
+                                 options['chunk_size'], resume, progress)
+        elapsed = time.perf_counter() - started
+
+        seconds = sorted(row['seconds'] for row in tenants)
+        summary = {
+            'tenants': len(tenants),
+            'failed': sum('error' in row for row in tenants),
+            'workers': options['workers'],
+            'wall_seconds': round(elapsed, 3),
+            'tenant_seconds': {
+                'total': round(sum(seconds), 3),
+                'p50': round(statistics.median(seconds), 3) if seconds else 0,
+                'p95': round(seconds[int(0.95 * (len(seconds) - 1))], 3) if seconds else 0,
+                'max': seconds[-1] if seconds else 0,
+            },
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({**summary, 'per_tenant': tenants}, f, indent=2)
+            self.stdout.write(f"Timings written to {options['output']}")
+
+        times = summary['tenant_seconds']
+        self.stdout.write(self.style.SUCCESS(
+            f"Precomputed {summary['tenants']} tenant(s) in {summary['wall_seconds']}s with {summary['workers']} "
+            f"worker(s); per tenant p50 {times['p50']}s, p95 {times['p95']}s, max {times['max']}s"
+        ))
+        if summary['failed']:
+            raise CommandError(f"{summary['failed']} tenant(s) failed; see the log")
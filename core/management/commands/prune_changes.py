@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Drop change feed entries past CHANGE_FEED_RETENTION_DAYS; older cursors must resync."
+
+    def handle(self, *args, **options):
+        removed = prune_changes()
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed} change(s) older than {settings.CHANGE_FEED_RETENTION_DAYS} day(s)"
+        ))
@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core.summaries import rebuild_user_summaries, verify_user_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the per-user inventory summaries behind the dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', help="Limit to this username (repeatable).")
+        parser.add_argument('--verify', action='store_true', help="Only report drift, do not rewrite summaries.")
+        parser.add_argument('--repair', action='store_true', help="With --verify, rebuild users that drifted.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        drifted = 0
+        for user_id, username in users.values_list('id', 'username'):
+            if not options['verify']:
+                groups = rebuild_user_summaries(user_id)
+                self.stdout.write(f"{username}: rebuilt {groups} group(s)")
+                continue
+
+            problems = verify_user_summaries(user_id)
+            if not problems:
+                continue
+            drifted += 1
+            for key, expected, stored in problems:
+                self.stdout.write(f"{username}: location/supplier {key} expected {expected}, stored {stored}")
+            if options['repair']:
+                rebuild_user_summaries(user_id)
+                self.stdout.write(f"{username}: repaired")
+
+        if options['verify']:
+            if drifted and not options['repair']:
+                raise CommandError(f"{drifted} user(s) have drifted summaries")
+            self.stdout.write(self.style.SUCCESS(f"Verified summaries, {drifted} user(s) drifted"))
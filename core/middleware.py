@@ -0,0 +1,55 @@
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .instrumentation import StackSampler, begin_request, end_request, histograms
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    # Outermost middleware: times the whole request, counts SQL on every connection, adds a
+    # Server-Timing header, feeds the latency histograms and, if enabled, profiles slow requests.
+    # Sync only on purpose: Django's connections are thread-local, so the SQL wrappers only
+    # see queries run in the thread that installed them. WhiteNoise is sync-only anyway, so
+    # under ASGI Django runs the whole chain in one worker thread; an async view then runs
+    # via async_to_sync, and its thread-sensitive sync_to_async calls come back to this thread.
+    # The pool threads of core.parallel wrap their own connections with this request's timings.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings, token = begin_request()
+        sampler = None
+        if settings.PROFILE_SLOW_REQUESTS_MS is not None:
+            sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000).start()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timings.record_sql))
+                response = self.get_response(request)
+        finally:
+            if sampler:
+                sampler.stop()
+            end_request(token)
+
+        total = time.perf_counter() - timings.started
+        view = self.view_name(request)
+        histograms.observe(view, request.method, response.status_code, total, timings.sql_count, timings.sql_seconds)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timings.server_timing(total)
+        if sampler and total * 1000 >= settings.PROFILE_SLOW_REQUESTS_MS:
+            path = sampler.dump(settings.PROFILE_DIR, re.sub(r'\W+', '-', view))
+            logger.warning("%s %s took %.0fms; profile written to %s", request.method, request.path, total * 1000, path)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        # Route names, not paths, keep the label set small
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unmatched'
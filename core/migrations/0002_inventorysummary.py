@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_summaries(apps, schema_editor):
+    InventoryItem = apps.get_model('core', 'InventoryItem')
+    InventorySummary = apps.get_model('core', 'InventorySummary')
+    rows = (
+        InventoryItem.objects.values('user_id', 'location_id', 'supplier_id')
+        .annotate(item_count=Count('id'), total_quantity=Sum('quantity'), total_value=Sum('price'))
+        .order_by()
+    )
+    InventorySummary.objects.bulk_create([InventorySummary(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_count', models.IntegerField(default=0)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('location', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.location')),
+                ('supplier', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.supplier')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-18 13:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_opening_balances(apps, schema_editor):
+    # One opening movement per existing item so trend charts start with today's stock
+    InventoryItem = apps.get_model('core', 'InventoryItem')
+    StockMovement = apps.get_model('core', 'StockMovement')
+    StockRollup = apps.get_model('core', 'StockRollup')
+    movements, rollups = [], []
+    for item in InventoryItem.objects.exclude(quantity=0).iterator(chunk_size=2000):
+        fields = dict(user_id=item.user_id, item_id=item.pk, item_name=item.name,
+                      location_id=item.location_id, supplier_id=item.supplier_id)
+        movements.append(StockMovement(change=item.quantity, quantity_after=item.quantity,
+                                       created_at=item.created_at, **fields))
+        hour = item.created_at.replace(minute=0, second=0, microsecond=0)
+        for granularity, start in (('hour', hour), ('day', hour.replace(hour=0))):
+            rollups.append(StockRollup(
+                granularity=granularity, bucket_start=start, movements=1, closing_quantity=item.quantity,
+                inbound=max(item.quantity, 0), outbound=max(-item.quantity, 0), **fields
+            ))
+        if len(movements) >= 2000:
+            StockMovement.objects.bulk_create(movements)
+            StockRollup.objects.bulk_create(rollups)
+            movements, rollups = [], []
+    StockMovement.objects.bulk_create(movements)
+    StockRollup.objects.bulk_create(rollups)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.BigIntegerField()),
+                ('item_name', models.CharField(max_length=100)),
+                ('change', models.IntegerField()),
+                ('quantity_after', models.IntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('location', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.location')),
+                ('supplier', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.supplier')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='core_stockm_user_id_fb54cb_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('item_id', models.BigIntegerField()),
+                ('item_name', models.CharField(max_length=100)),
+                ('inbound', models.BigIntegerField(default=0)),
+                ('outbound', models.BigIntegerField(default=0)),
+                ('movements', models.IntegerField(default=0)),
+                ('closing_quantity', models.IntegerField(default=0)),
+                ('location', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.location')),
+                ('supplier', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.supplier')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'granularity', 'bucket_start', 'item_id'), name='unique_stock_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+from django.db.models import Count, F, Min, Sum
+
+
+def _merge_duplicates(apps, model_name, field):
+    Model = apps.get_model('core', model_name)
+    InventoryItem = apps.get_model('core', 'InventoryItem')
+    StockMovement = apps.get_model('core', 'StockMovement')
+    StockRollup = apps.get_model('core', 'StockRollup')
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+
+    users = set()
+    groups = (
+        Model.objects.values('user_id', 'name').annotate(keep=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1).order_by()
+    )
+    for group in groups:
+        duplicates = list(Model.objects.filter(user_id=group['user_id'], name=group['name'])
+                          .exclude(id=group['keep']).values_list('id', flat=True))
+        moved = list(InventoryItem.objects.filter(**{f'{field}_id__in': duplicates}).values_list('id', flat=True))
+        # Re-point everything at the oldest copy, then drop the rest
+        for related in (InventoryItem, StockMovement, StockRollup):
+            related.objects.filter(**{f'{field}_id__in': duplicates}).update(**{f'{field}_id': group['keep']})
+        Model.objects.filter(id__in=duplicates).delete()
+
+        # Synced clients hold the removed copies; tell them through the change feed
+        ChangeLog.objects.bulk_create(
+            [ChangeLog(user_id=group['user_id'], kind=field, object_id=pk, action='delete') for pk in duplicates]
+            + [ChangeLog(user_id=group['user_id'], kind='item', object_id=pk, action='upsert') for pk in moved],
+            batch_size=1000,
+        )
+        users.add(group['user_id'])
+    return users
+
+
+def dedupe_reference_names(apps, schema_editor):
+    users = _merge_duplicates(apps, 'Location', 'location') | _merge_duplicates(apps, 'Supplier', 'supplier')
+    if not users:
+        return
+
+    # Summaries of the merged groups are rebuilt from the items, as in 0002
+    InventoryItem = apps.get_model('core', 'InventoryItem')
+    InventorySummary = apps.get_model('core', 'InventorySummary')
+    DataVersion = apps.get_model('core', 'DataVersion')
+    for user_id in users:
+        InventorySummary.objects.filter(user_id=user_id).delete()
+        rows = (
+            InventoryItem.objects.filter(user_id=user_id).values('user_id', 'location_id', 'supplier_id')
+            .annotate(item_count=Count('id'), total_quantity=Sum('quantity'), total_value=Sum('price'))
+            .order_by()
+        )
+        InventorySummary.objects.bulk_create([InventorySummary(**row) for row in rows], batch_size=1000)
+        DataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_changelog'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_reference_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# The DDL is spelled out here rather than imported from core.search, so later changes to the
+# live index (see 0017) cannot change what this migration did.
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_itemsearch USING fts5(user_id UNINDEXED, name, tokenize='trigram')",
+    """CREATE TRIGGER IF NOT EXISTS core_itemsearch_insert AFTER INSERT ON core_inventoryitem BEGIN
+        INSERT INTO core_itemsearch (rowid, user_id, name) VALUES (new.id, new.user_id, ' ' || new.name || ' ');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_itemsearch_update AFTER UPDATE OF name ON core_inventoryitem BEGIN
+        UPDATE core_itemsearch SET name = ' ' || new.name || ' ' WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS core_itemsearch_delete AFTER DELETE ON core_inventoryitem BEGIN
+        DELETE FROM core_itemsearch WHERE rowid = old.id;
+    END""",
+    'DELETE FROM core_itemsearch',
+    "INSERT INTO core_itemsearch (rowid, user_id, name) SELECT id, user_id, ' ' || name || ' ' FROM core_inventoryitem",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS core_itemsearch_insert',
+    'DROP TRIGGER IF EXISTS core_itemsearch_update',
+    'DROP TRIGGER IF EXISTS core_itemsearch_delete',
+    'DROP TABLE IF EXISTS core_itemsearch',
+]
+
+POSTGRES_INDEX = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS item_name_trgm_idx ON core_inventoryitem USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS item_upper_name_trgm_idx ON core_inventoryitem USING gin (UPPER(name::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS supplier_name_trgm_idx ON core_supplier USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS location_name_trgm_idx ON core_location USING gin (name gin_trgm_ops)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS item_name_trgm_idx',
+    'DROP INDEX IF EXISTS item_upper_name_trgm_idx',
+    'DROP INDEX IF EXISTS supplier_name_trgm_idx',
+    'DROP INDEX IF EXISTS location_name_trgm_idx',
+]
+
+
+def _run(schema_editor, statements):
+    statements = statements.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    # Dropped first: after unapplying this, the post_migrate hook may have built the live index
+    _run(schema_editor, {'postgresql': POSTGRES_INDEX, 'sqlite': SQLITE_DROP + SQLITE_INDEX})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP})
+
+
+class Migration(migrations.Migration):
+    # Backend-specific search indexes the model layer cannot describe: pg_trgm GIN indexes on
+    # PostgreSQL, an FTS5 trigram table kept in sync by triggers on SQLite. Creating the
+    # pg_trgm extension needs a role allowed to (PostgreSQL 13+: database owner suffices).
+
+    dependencies = [
+        ('core', '0008_reference_name_constraints_item_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 14:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_item_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='reorder_point',
+            field=models.PositiveIntegerField(db_default=10, default=10),
+        ),
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='target_level',
+            field=models.PositiveIntegerField(db_default=100, default=100),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(condition=models.Q(('quantity__lt', models.F('reorder_point'))), fields=['user', 'quantity', 'id'], name='item_user_low_stock_idx'),
+        ),
+    ]
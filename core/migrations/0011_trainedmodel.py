@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 14:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_item_stock_levels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainedModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('demand', 'Demand forecast'), ('anomaly', 'Anomaly detector')], max_length=10)),
+                ('data_version', models.BigIntegerField()),
+                ('change_cursor', models.BigIntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('metrics', models.JSONField(default=dict)),
+                ('artifact', models.BinaryField(blank=True, null=True)),
+                ('artifact_path', models.CharField(blank=True, max_length=255)),
+                ('trained_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'kind'), name='unique_trained_model_kind')],
+            },
+        ),
+    ]
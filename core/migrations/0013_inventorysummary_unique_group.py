@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicate_groups(apps, schema_editor):
+    # Concurrent writers could each create a row for the same group; fold the copies
+    # into the oldest row so the constraint can be added
+    InventorySummary = apps.get_model('core', 'InventorySummary')
+    groups = (
+        InventorySummary.objects.values('user_id', 'location_id', 'supplier_id')
+        .annotate(keep=Min('id'), copies=Count('id'), item_count=Sum('item_count'),
+                  total_quantity=Sum('total_quantity'), total_value=Sum('total_value'))
+        .filter(copies__gt=1).order_by()
+    )
+    for group in groups:
+        rows = InventorySummary.objects.filter(
+            user_id=group['user_id'], location_id=group['location_id'], supplier_id=group['supplier_id'],
+        )
+        rows.exclude(id=group['keep']).delete()
+        rows.filter(id=group['keep']).update(
+            item_count=group['item_count'], total_quantity=group['total_quantity'], total_value=group['total_value'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_inventoryreport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_groups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventorysummary',
+            constraint=models.UniqueConstraint(models.F('user'), Coalesce('location', 0), Coalesce('supplier', 0),
+                                               name='unique_inventory_summary_group'),
+        ),
+    ]
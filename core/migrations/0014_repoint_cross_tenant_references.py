@@ -0,0 +1,62 @@
+from django.db import migrations
+from django.db.models import Count, F, Sum
+
+
+def _repoint(apps, model_name, field):
+    # The baseline's unscoped get_or_create let an item reference a same-named location or
+    # supplier owned by another user. Point each at its own user's copy, creating it if needed.
+    Model = apps.get_model('core', model_name)
+    InventoryItem = apps.get_model('core', 'InventoryItem')
+    StockMovement = apps.get_model('core', 'StockMovement')
+    StockRollup = apps.get_model('core', 'StockRollup')
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+
+    users = set()
+    for related in (InventoryItem, StockMovement, StockRollup):
+        foreign = (
+            related.objects.filter(**{f'{field}__isnull': False}).exclude(**{f'{field}__user_id': F('user_id')})
+            .values_list('user_id', f'{field}_id', f'{field}__name').distinct().order_by()
+        )
+        for user_id, foreign_id, name in list(foreign):
+            own, created = Model.objects.get_or_create(user_id=user_id, name=name)
+            rows = related.objects.filter(user_id=user_id, **{f'{field}_id': foreign_id})
+            log = []
+            if created:
+                log.append(ChangeLog(user_id=user_id, kind=field, object_id=own.id, action='upsert'))
+            if related is InventoryItem:
+                # Synced clients hold the old reference; tell them through the change feed
+                log += [ChangeLog(user_id=user_id, kind='item', object_id=pk, action='upsert')
+                        for pk in rows.values_list('id', flat=True)]
+                users.add(user_id)
+            rows.update(**{f'{field}_id': own.id})
+            ChangeLog.objects.bulk_create(log, batch_size=1000)
+    return users
+
+
+def repoint_cross_tenant_references(apps, schema_editor):
+    users = _repoint(apps, 'Location', 'location') | _repoint(apps, 'Supplier', 'supplier')
+
+    # Summaries of the moved items are rebuilt from the items, as in 0007
+    InventoryItem = apps.get_model('core', 'InventoryItem')
+    InventorySummary = apps.get_model('core', 'InventorySummary')
+    DataVersion = apps.get_model('core', 'DataVersion')
+    for user_id in users:
+        InventorySummary.objects.filter(user_id=user_id).delete()
+        rows = (
+            InventoryItem.objects.filter(user_id=user_id).values('user_id', 'location_id', 'supplier_id')
+            .annotate(item_count=Count('id'), total_quantity=Sum('quantity'), total_value=Sum('price'))
+            .order_by()
+        )
+        InventorySummary.objects.bulk_create([InventorySummary(**row) for row in rows], batch_size=1000)
+        DataVersion.objects.filter(user_id=user_id).update(version=F('version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_inventorysummary_unique_group'),
+    ]
+
+    operations = [
+        migrations.RunPython(repoint_cross_tenant_references, migrations.RunPython.noop),
+    ]
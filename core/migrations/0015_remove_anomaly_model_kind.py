@@ -0,0 +1,31 @@
+import os
+
+from django.db import migrations, models
+
+
+def drop_anomaly_models(apps, schema_editor):
+    # Anomalies are scored by the grouped statistics in core.anomalies, which have nothing to train
+    TrainedModel = apps.get_model('core', 'TrainedModel')
+    fits = TrainedModel.objects.filter(kind='anomaly')
+    for path in fits.exclude(artifact_path='').values_list('artifact_path', flat=True):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    fits.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_repoint_cross_tenant_references'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_anomaly_models, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='trainedmodel',
+            name='kind',
+            field=models.CharField(choices=[('demand', 'Demand forecast')], max_length=10),
+        ),
+    ]
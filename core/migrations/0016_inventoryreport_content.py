@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_remove_anomaly_model_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryreport',
+            name='content',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
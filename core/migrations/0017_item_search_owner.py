@@ -0,0 +1,66 @@
+from django.db import migrations
+
+# SQLite only: the FTS5 table gets an indexed owner token (" u<user id> ") in place of the
+# UNINDEXED user_id, so a search matches within one tenant instead of filtering every
+# tenant's matches. Spelled out here for the same reason as in 0009.
+DROP = [
+    'DROP TRIGGER IF EXISTS core_itemsearch_insert',
+    'DROP TRIGGER IF EXISTS core_itemsearch_update',
+    'DROP TRIGGER IF EXISTS core_itemsearch_delete',
+    'DROP TABLE IF EXISTS core_itemsearch',
+]
+
+OWNER_INDEX = [
+    "CREATE VIRTUAL TABLE core_itemsearch USING fts5(owner, name, tokenize='trigram')",
+    """CREATE TRIGGER core_itemsearch_insert AFTER INSERT ON core_inventoryitem BEGIN
+        INSERT INTO core_itemsearch (rowid, owner, name) VALUES (new.id, ' u' || new.user_id || ' ', ' ' || new.name || ' ');
+    END""",
+    """CREATE TRIGGER core_itemsearch_update AFTER UPDATE OF name ON core_inventoryitem BEGIN
+        UPDATE core_itemsearch SET name = ' ' || new.name || ' ' WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER core_itemsearch_delete AFTER DELETE ON core_inventoryitem BEGIN
+        DELETE FROM core_itemsearch WHERE rowid = old.id;
+    END""",
+    "INSERT INTO core_itemsearch (rowid, owner, name) SELECT id, ' u' || user_id || ' ', ' ' || name || ' ' FROM core_inventoryitem",
+]
+
+USER_ID_INDEX = [
+    "CREATE VIRTUAL TABLE core_itemsearch USING fts5(user_id UNINDEXED, name, tokenize='trigram')",
+    """CREATE TRIGGER core_itemsearch_insert AFTER INSERT ON core_inventoryitem BEGIN
+        INSERT INTO core_itemsearch (rowid, user_id, name) VALUES (new.id, new.user_id, ' ' || new.name || ' ');
+    END""",
+    """CREATE TRIGGER core_itemsearch_update AFTER UPDATE OF name ON core_inventoryitem BEGIN
+        UPDATE core_itemsearch SET name = ' ' || new.name || ' ' WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER core_itemsearch_delete AFTER DELETE ON core_inventoryitem BEGIN
+        DELETE FROM core_itemsearch WHERE rowid = old.id;
+    END""",
+    "INSERT INTO core_itemsearch (rowid, user_id, name) SELECT id, user_id, ' ' || name || ' ' FROM core_inventoryitem",
+]
+
+
+def _rebuild(schema_editor, statements):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP + statements:
+            cursor.execute(statement)
+
+
+def index_owner(apps, schema_editor):
+    _rebuild(schema_editor, OWNER_INDEX)
+
+
+def unindex_owner(apps, schema_editor):
+    _rebuild(schema_editor, USER_ID_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_inventoryreport_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_owner, unindex_owner),
+    ]
@@ -1,35 +1,74 @@
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import IsolationForest
-import pandas as pd
-from core.models import InventoryItem
-
-def train_demand_forecast(items):
-    # Simulate historical data (in a real app, you'd have timestamps)
-    df = pd.DataFrame(list(items.values('name', 'quantity')))
-    if df.empty:
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .forecasting import fit_forecaster
+from .ledger import bucket_start
+from .models import InventoryItem, StockRollup, TrainedModel
+
+# Days of daily rollups the demand forecast learns from, and how far ahead it forecasts
+HISTORY_DAYS = 56
+HORIZON_DAYS = 7
+
+
+# -----------------------
+# Demand History
+# -----------------------
+def daily_outbound(user, days=HISTORY_DAYS, now=None):
+    # Every current item as (id, name, stock value), with units out per complete day up to
+    # today (oldest first; quiet days are zero). Today is still filling up, so it would read
+    # as a slump. Also returns the first day's date.
+    today = bucket_start(now or timezone.now(), StockRollup.DAY)
+    start = today - timedelta(days=days)
+    items = list(InventoryItem.objects.filter(user=user).order_by('id').annotate(
+        value=F('quantity') * F('price'),
+    ).values_list('id', 'name', 'value'))
+    rows = {item[0]: i for i, item in enumerate(items)}
+    matrix = np.zeros((len(items), days))
+    for item_id, bucket, outbound in StockRollup.objects.filter(
+        user=user, granularity=StockRollup.DAY, bucket_start__gte=start, bucket_start__lt=today
+    ).values_list('item_id', 'bucket_start', 'outbound'):
+        if item_id in rows:
+            matrix[rows[item_id], (bucket - start).days] = outbound
+    return items, matrix, start.date()
+
+
+def prophet_items(items, matrix, count):
+    # The highest stock-value items that have any history to fit
+    active = [item for item, total in zip(items, matrix.sum(axis=1)) if total > 0]
+    return {item[0] for item in sorted(active, key=lambda item: -(item[2] or 0))[:count]}
+
+
+# -----------------------
+# Models
+# -----------------------
+def train_demand_forecast(user, now=None):
+    # Every item series at once through core.forecasting; Prophet only for the
+    # FORECAST_PROPHET_ITEMS most valuable items
+    items, matrix, start = daily_outbound(user, now=now)
+    if not items:
         return None
-    
-    # Group by item to predict future quantity
-    df_grouped = df.groupby('name').agg({'quantity': 'mean'}).reset_index()
-    X = [[i] for i in range(len(df_grouped))]  # Simple feature (index)
-    y = df_grouped['quantity'].values
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    return model, df_grouped['name'].tolist()
-
-def predict_demand(model, names):
-    if model is None:
+    model, metrics = fit_forecaster(
+        [item[0] for item in items], matrix, HORIZON_DAYS, settings.FORECAST_BACKEND,
+        prophet_items(items, matrix, settings.FORECAST_PROPHET_ITEMS), start,
+    )
+    return model, metrics, len(items)
+
+
+def predict_demand(model, user, now=None):
+    # {item name: units expected out over the next HORIZON_DAYS}; same-named items are summed
+    items, matrix, _ = daily_outbound(user, now=now)
+    if model is None or not items:
         return {}
-    predictions = model.predict([[i] for i in range(len(names))])
-    return dict(zip(names, predictions))
-
-def detect_anomalies(items):
-    df = pd.DataFrame(list(items.values('quantity', 'price')))
-    if df.empty:
-        return []
-    
-    model = IsolationForest(contamination=0.1, random_state=42)
-    df['anomaly'] = model.fit_predict(df)
-    anomalies = df[df['anomaly'] == -1].index.tolist()
-    return [items[i] for i in anomalies]
\ No newline at end of file
+    demand = {}
+    for (_, name, _), forecast in zip(items, model.predict([item[0] for item in items], matrix)):
+        demand[name] = demand.get(name, 0.0) + float(forecast.sum())
+    return demand
+
+
+TRAINERS = {
+    TrainedModel.DEMAND: train_demand_forecast,
+}
@@ -0,0 +1,165 @@
+import io
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+
+import joblib
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .instrumentation import timed
+from .models import ChangeLog, DataVersion, TrainedModel
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Process-local Tier
+# -----------------------
+class LocalModels:
+    # Bounded LRU of (user, kind) -> (record id, trained_at, fitted model), so scoring skips
+    # unpickling as long as the stored fit has not been replaced
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, record):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[:2] != (record.pk, record.trained_at):
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def set(self, key, record, model):
+        with self._lock:
+            self._entries[key] = (record.pk, record.trained_at, model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_models = LocalModels(settings.MODEL_CACHE_ENTRIES)
+
+
+# -----------------------
+# Artifacts
+# -----------------------
+def _dump(model):
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer, compress=3)
+    return buffer.getvalue()
+
+
+def _write_artifact(user_id, kind, data):
+    # A new file per fit, written aside and moved into place, so readers never see half of one
+    directory = os.path.join(settings.MODEL_REGISTRY_DIR, str(user_id))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}-{uuid.uuid4().hex}.joblib")
+    with open(f"{path}.tmp", 'wb') as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def _remove_artifact(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _discard_artifact(path):
+    if path:
+        transaction.on_commit(lambda: _remove_artifact(path))
+
+
+def _load(record):
+    if record.artifact_path:
+        return joblib.load(record.artifact_path)
+    artifact = TrainedModel.objects.filter(pk=record.pk).values_list('artifact', flat=True).first()
+    return joblib.load(io.BytesIO(artifact)) if artifact is not None else None
+
+
+# -----------------------
+# Staleness
+# -----------------------
+def is_stale(record, now=None):
+    # Retrain once the fit is older than MODEL_MAX_AGE, or once more than
+    # MODEL_RETRAIN_FRACTION of the items it saw have changed since
+    now = now or timezone.now()
+    if record.trained_at <= now - timedelta(seconds=settings.MODEL_MAX_AGE):
+        return True
+    limit = max(1, int(record.item_count * settings.MODEL_RETRAIN_FRACTION)) + 1
+    changed = ChangeLog.objects.filter(
+        user_id=record.user_id, kind=ChangeLog.ITEM, id__gt=record.change_cursor
+    ).values_list('object_id', flat=True).distinct()[:limit]
+    return len(changed) >= limit
+
+
+# -----------------------
+# Registry
+# -----------------------
+def train(user, kind, now=None):
+    # Fits and stores a new model, replacing the user's previous one of this kind
+    from .ml_models import TRAINERS  # numpy (and Prophet, if enabled) is only needed here
+
+    # Read first: changes made while training must count towards the next retrain
+    cursor = ChangeLog.objects.filter(user=user).aggregate(last=Max('id'))['last'] or 0
+    version = DataVersion.objects.filter(user=user).values_list('version', flat=True).first() or 0
+    previous = TrainedModel.objects.filter(user=user, kind=kind).values_list('artifact_path', flat=True).first()
+    with timed('train'):
+        trained = TRAINERS[kind](user, now=now)
+    if trained is None:
+        TrainedModel.objects.filter(user=user, kind=kind).delete()
+        _discard_artifact(previous)
+        return None, None
+    model, metrics, item_count = trained
+
+    data = _dump(model)
+    path = _write_artifact(user.id, kind, data) if settings.MODEL_REGISTRY_DIR else ''
+    record, _ = TrainedModel.objects.update_or_create(user=user, kind=kind, defaults={
+        'data_version': version,
+        'change_cursor': cursor,
+        'item_count': item_count,
+        'metrics': metrics,
+        'artifact': None if path else data,
+        'artifact_path': path,
+        'trained_at': timezone.now(),
+    })
+    # Only once nothing points at it: the previous fit keeps serving until the new one is saved
+    if previous != path:
+        _discard_artifact(previous)
+    local_models.set((user.id, kind), record, model)
+    logger.info("Trained %s model for user %s on %s items: %s", kind, user.id, item_count, metrics)
+    return model, record
+
+
+def get_model(user, kind, retrain=True):
+    # (fitted model, TrainedModel), trained on first use and again once is_stale says so;
+    # (None, None) when the user has no items to learn from. With retrain=False a stale fit
+    # is still served, for callers that leave retraining to a background job.
+    record = TrainedModel.objects.defer('artifact').filter(user=user, kind=kind).first()
+    if record is None or (retrain and is_stale(record)):
+        return train(user, kind)
+    model = local_models.get((user.id, kind), record)
+    if model is None:
+        try:
+            model = _load(record)
+        except (OSError, EOFError, ValueError):
+            model = None
+        if model is None:
+            logger.warning("Unreadable %s model for user %s; retraining", kind, user.id)
+            return train(user, kind)
+        local_models.set((user.id, kind), record, model)
+    return model, record
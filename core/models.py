@@ -1,10 +1,16 @@
 from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 class Supplier(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
 
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'name'], name='unique_supplier_name_per_user')]
+
     def __str__(self):
         return self.name
 
@@ -12,6 +18,9 @@ class Location(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
 
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['user', 'name'], name='unique_location_name_per_user')]
+
     def __str__(self):
         return self.name
 
@@ -22,8 +31,199 @@ class InventoryItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True)
     location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True)
+    # Below its reorder point an item is low on stock; restocking tops it up to the target level.
+    # Database defaults too, so COPY imports that leave them out still get them.
+    reorder_point = models.PositiveIntegerField(default=10, db_default=10)
+    target_level = models.PositiveIntegerField(default=100, db_default=100)
     last_updated = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Keyset pagination walks (user, ordering, id) without sorting the tenant's rows
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'], name='item_user_name_idx'),
+            models.Index(fields=['user', 'quantity', 'id'], name='item_user_quantity_idx'),
+            models.Index(fields=['user', 'last_updated', 'id'], name='item_user_updated_idx'),
+            # Partial: holds only the items below their reorder point, so low-stock pages stay
+            # small however large the catalogue (backends without partial indexes skip it)
+            models.Index(fields=['user', 'quantity', 'id'], condition=Q(quantity__lt=F('reorder_point')),
+                         name='item_user_low_stock_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+class InventorySummary(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, null=True)
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, null=True)
+    item_count = models.IntegerField(default=0)
+    total_quantity = models.BigIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        # One row per group; the groups without a location or supplier are unique too,
+        # which a plain constraint would not enforce since NULLs never compare equal
+        constraints = [
+            models.UniqueConstraint(F('user'), Coalesce('location', 0), Coalesce('supplier', 0),
+                                    name='unique_inventory_summary_group'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} / {self.location} / {self.supplier}"
+
+class DataVersion(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} v{self.version}"
+
+class StockMovement(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Plain id, not a FK: the ledger outlives deleted items
+    item_id = models.BigIntegerField()
+    item_name = models.CharField(max_length=100)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True)
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True)
+    change = models.IntegerField()
+    quantity_after = models.IntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.item_name} {self.change:+d}"
+
+class StockRollup(models.Model):
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [(HOUR, 'Hourly'), (DAY, 'Daily')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    item_id = models.BigIntegerField()
+    item_name = models.CharField(max_length=100)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True)
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True)
+    inbound = models.BigIntegerField(default=0)
+    outbound = models.BigIntegerField(default=0)
+    movements = models.IntegerField(default=0)
+    closing_quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'granularity', 'bucket_start', 'item_id'],
+                                    name='unique_stock_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_name} {self.granularity} {self.bucket_start:%Y-%m-%d %H:00}"
+
+class AnalyticsResult(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=30)
+    data_version = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    payload = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    requested_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'data_version'], name='unique_analytics_result_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind} v{self.data_version} ({self.status})"
+
+class ChangeLog(models.Model):
+    ITEM = 'item'
+    LOCATION = 'location'
+    SUPPLIER = 'supplier'
+    KIND_CHOICES = [(ITEM, 'Item'), (LOCATION, 'Location'), (SUPPLIER, 'Supplier')]
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [(UPSERT, 'Created or updated'), (DELETE, 'Deleted')]
+
+    # The auto-increment id is the feed cursor
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'id'])]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.object_id} {self.action}"
+
+class TrainedModel(models.Model):
+    DEMAND = 'demand'
+    KIND_CHOICES = [(DEMAND, 'Demand forecast')]
+
+    # The latest fit per user and kind; the artifact is joblib bytes, kept here or, with
+    # MODEL_REGISTRY_DIR set, in a file named by artifact_path
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data_version = models.BigIntegerField()
+    # Last ChangeLog id seen before training; later item changes count towards a retrain
+    change_cursor = models.BigIntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    metrics = models.JSONField(default=dict)
+    artifact = models.BinaryField(null=True, blank=True)
+    artifact_path = models.CharField(max_length=255, blank=True)
+    trained_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind'], name='unique_trained_model_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.kind} v{self.data_version} ({self.trained_at:%Y-%m-%d %H:%M})"
+
+class InventoryReport(models.Model):
+    VALUATION = 'valuation'
+    LOW_STOCK = 'low_stock'
+    KIND_CHOICES = [(VALUATION, 'Valuation'), (LOW_STOCK, 'Low stock')]
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    # One generated PDF per (user, kind, location filter, data version); a finished file is
+    # served as-is until the user's data changes. The PDF is kept in content or, with
+    # REPORT_DIR set, in the file named by path.
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    location = models.CharField(max_length=100, blank=True)
+    data_version = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    path = models.CharField(max_length=255, blank=True)
+    content = models.BinaryField(null=True, blank=True)
+    size = models.BigIntegerField(default=0)
+    rows = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'kind', 'location', 'data_version'],
+                                    name='unique_inventory_report_version'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.user} {self.kind} {self.location or 'all'} v{self.data_version} ({self.status})"
@@ -0,0 +1,140 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils.dateparse import parse_datetime
+
+from .selectors import below_reorder_point, user_items
+
+# Public field name -> ORM lookup; supplier/location are joined, never lazy-loaded.
+ITEM_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'quantity': 'quantity',
+    'price': 'price',
+    'supplier': 'supplier__name',
+    'location': 'location__name',
+    'reorder_point': 'reorder_point',
+    'target_level': 'target_level',
+    # Annotated only when asked for: what a restock would add to reach the target level
+    'suggested_quantity': 'suggested_quantity',
+    'last_updated': 'last_updated',
+    'created_at': 'created_at',
+}
+DEFAULT_ITEM_FIELDS = ['id', 'name', 'quantity', 'price', 'supplier', 'location']
+ITEM_ORDERINGS = ('name', 'quantity', 'last_updated')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order_field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    # A cursor is client input: a value of the wrong type would fail in the query instead
+    if not _is_int(pk):
+        raise PaginationError('Invalid cursor')
+    if order_field == 'last_updated':
+        try:
+            value = parse_datetime(value) if isinstance(value, str) else None
+        except ValueError:
+            value = None
+        if value is None:
+            raise PaginationError('Invalid cursor')
+    elif order_field == 'quantity' and not _is_int(value):
+        raise PaginationError('Invalid cursor')
+    elif order_field == 'name' and not isinstance(value, str):
+        raise PaginationError('Invalid cursor')
+    return value, pk
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_fields(fields):
+    if not fields:
+        return list(DEFAULT_ITEM_FIELDS)
+    names = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in names if f not in ITEM_FIELDS]
+    if unknown:
+        raise PaginationError(f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def parse_order(order):
+    order = order or 'name'
+    descending = order.startswith('-')
+    field = order.lstrip('-')
+    if field not in ITEM_ORDERINGS:
+        raise PaginationError(f"Unsupported ordering: {order}")
+    return field, descending
+
+
+def parse_limit(limit, default=DEFAULT_PAGE_SIZE):
+    try:
+        limit = int(limit or default)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def annotate_fields(items, fields):
+    # The computed ITEM_FIELDS, added only when a caller asks for them
+    if 'suggested_quantity' in fields:
+        items = items.annotate(suggested_quantity=Greatest(F('target_level') - F('quantity'), 0))
+    return items
+
+
+def paginate_items(user, fields=None, order='name', cursor=None, limit=DEFAULT_PAGE_SIZE, location='', supplier='',
+                   low_stock=False):
+    # One joined values_list query per page, ordered by (order, id)
+    fields = list(fields or DEFAULT_ITEM_FIELDS)
+    order_field, descending = parse_order(order)
+
+    items = below_reorder_point(user, location, supplier) if low_stock else user_items(user, location, supplier)
+    items = annotate_fields(items, fields)
+
+    if cursor:
+        value, pk = decode_cursor(cursor, order_field)
+        op = 'lt' if descending else 'gt'
+        items = items.filter(
+            Q(**{f'{order_field}__{op}': value}) | Q(**{order_field: value, f'id__{op}': pk})
+        )
+
+    prefix = '-' if descending else ''
+    items = items.order_by(f'{prefix}{order_field}', f'{prefix}id')
+
+    columns = list(dict.fromkeys([ITEM_FIELDS[f] for f in fields] + [order_field, 'id']))
+    rows = list(items.values_list(*columns)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    positions = [(f, columns.index(ITEM_FIELDS[f])) for f in fields]
+    page = []
+    for row in rows:
+        item = {f: row[i] for f, i in positions}
+        if 'price' in item:
+            item['price'] = float(item['price'])
+        page.append(item)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last[columns.index(order_field)], last[columns.index('id')])
+    return {'items': page, 'next_cursor': next_cursor}
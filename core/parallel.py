@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+
+from .instrumentation import current_timings
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(name, workers):
+    # Created on first use, so sync-only deployments never start the threads
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return _executors[name]
+
+
+# -----------------------
+# Concurrent Queries
+# -----------------------
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+def _run_on_own_connection(func, timings):
+    # Pool threads do not inherit the request's context, so each has its own connection
+    try:
+        with ExitStack() as stack:
+            if timings is not None:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(timings.record_sql))
+            return func()
+    finally:
+        # Keeps the connection for reuse within CONN_MAX_AGE, drops it if broken or expired
+        close_old_connections()
+
+
+async def run_queries(calls):
+    # Runs independent ORM callables side by side, each on its own connection, so the wait
+    # is the slowest query rather than the sum. {name: callable} -> {name: result}
+    workers = settings.ASYNC_QUERY_WORKERS
+    if workers < 2 or await sync_to_async(_in_transaction)():
+        # Inside a transaction only the request's own connection can see its rows
+        return {name: await sync_to_async(func)() for name, func in calls.items()}
+    loop = asyncio.get_running_loop()
+    timings = current_timings()
+    pool = _executor('db-query', workers)
+    results = await asyncio.gather(*(
+        loop.run_in_executor(pool, _run_on_own_connection, func, timings) for func in calls.values()
+    ))
+    return dict(zip(calls, results))
+
+
+# -----------------------
+# CPU-bound Work
+# -----------------------
+async def run_cpu_bound(func, *args):
+    # Keeps the event loop responsive and caps how many figure builds run at once; they
+    # still share the GIL, so this bounds load rather than adding cores
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor('cpu', settings.ASYNC_CPU_WORKERS), func, *args)
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import AnalyticsResult, DataVersion, TrainedModel
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Per-tenant Work
+# -----------------------
+def precompute_user(user):
+    # A fresh demand fit and the insights payload, stored as the finished result for the
+    # user's current data version: insights and the dashboard then read it without a job
+    from .analytics import compute_insights  # plotly and numpy load in the workers only
+    from .model_registry import train
+
+    version = DataVersion.objects.get_or_create(user=user)[0].version
+    _, record = train(user, TrainedModel.DEMAND)
+    payload = compute_insights(user)
+    AnalyticsResult.objects.update_or_create(user=user, kind='insights', data_version=version, defaults={
+        'status': AnalyticsResult.DONE,
+        'payload': payload,
+        'error': '',
+        'finished_at': timezone.now(),
+    })
+    return record.item_count if record else 0
+
+
+def precompute_chunk(user_ids):
+    # One row per tenant, failures included, so one bad tenant neither stops its chunk
+    # nor goes unreported
+    from django.contrib.auth.models import User
+
+    rows = []
+    for user in User.objects.filter(pk__in=user_ids).order_by('id'):
+        started = time.perf_counter()
+        row = {'user_id': user.pk, 'username': user.username}
+        try:
+            row['items'] = precompute_user(user)
+        except Exception as e:
+            logger.exception("Forecast precompute failed for user %s", user.pk)
+            row['error'] = str(e)
+        row['seconds'] = round(time.perf_counter() - started, 3)
+        rows.append(row)
+    return user_ids, rows
+
+
+def _pool_chunk(user_ids):
+    # Pool processes are reused across chunks; close the connection after each
+    try:
+        return precompute_chunk(user_ids)
+    finally:
+        connections.close_all()
+
+
+# -----------------------
+# Checkpoints
+# -----------------------
+class Checkpoint:
+    # The users a run still owes, in a JSON file rewritten after every chunk: an
+    # interrupted run picks up where it stopped instead of starting over. usernames is the
+    # --user selection the run was started for (None for everyone).
+    def __init__(self, path, usernames=None):
+        self.path = path
+        self.usernames = sorted(usernames) if usernames else None
+        self.state = None
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.state = json.load(f)
+        except FileNotFoundError:
+            self.state = None
+        return self.state
+
+    def start(self, user_ids):
+        self.state = {'started_at': timezone.now().isoformat(), 'usernames': self.usernames,
+                      'pending': list(user_ids), 'tenants': []}
+        self.save()
+
+    def same_selection(self):
+        return self.state.get('usernames') == self.usernames
+
+    def done(self, user_ids, rows):
+        # By chunk: a user deleted since the run started has no row but is done too
+        finished = set(user_ids)
+        self.state['pending'] = [uid for uid in self.state['pending'] if uid not in finished]
+        self.state['tenants'] += rows
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(f"{self.path}.tmp", 'w') as f:
+            json.dump(self.state, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------
+# Runs
+# -----------------------
+def chunked(user_ids, size):
+    return [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+
+
+def run_precompute(user_ids, checkpoint, workers=1, chunk_size=25, resume=True, progress=None):
+    # Returns every tenant's row for the run, including those a resumed run finished earlier.
+    # workers=1 stays in this process; more fans the chunks out to a process pool.
+    state = checkpoint.load() if resume else None
+    if state is None:
+        checkpoint.start(user_ids)
+    pending = checkpoint.state['pending']
+    chunks = chunked(pending, chunk_size)
+
+    def finished(user_ids, rows):
+        checkpoint.done(user_ids, rows)
+        for row in rows:
+            if progress:
+                progress(row)
+
+    if workers <= 1:
+        for chunk in chunks:
+            finished(*precompute_chunk(chunk))
+    elif chunks:
+        # Forked workers must not inherit open database sockets; each opens its own
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(_pool_chunk, chunk) for chunk in chunks]):
+                finished(*future.result())
+
+    tenants = checkpoint.state['tenants']
+    checkpoint.clear()
+    return tenants
@@ -0,0 +1,62 @@
+import json
+import re
+
+from django.apps import apps
+from django.db import connection
+
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+SQLITE_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def tenant_tables():
+    # Every core table carrying a user FK is partitioned by tenant
+    return {
+        model._meta.db_table for model in apps.get_app_config('core').get_models()
+        if any(field.name == 'user' for field in model._meta.fields)
+    }
+
+
+def is_tenant_scoped(sql):
+    return sql.lstrip().upper().startswith('SELECT') and '"user_id" =' in sql
+
+
+def is_paginated(sql):
+    return re.search(r'\bLIMIT \d+', sql) is not None
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make scans and sorts look cheap; ask whether an index *could* serve it
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            return json.loads(plan) if isinstance(plan, str) else plan
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _pg_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _pg_nodes(child)
+
+
+def plan_problems(sql, tables=None):
+    # Tenant tables read end to end instead of sought by index, plus full sorts under a LIMIT:
+    # a paginated query that sorts every tenant row before returning a page
+    tables = tenant_tables() if tables is None else tables
+    plan = explain(sql)
+    if connection.vendor == 'postgresql':
+        nodes = list(_pg_nodes(plan[0]['Plan']))
+        scanned = {n.get('Relation Name') for n in nodes if n['Node Type'] == 'Seq Scan'}
+        sorted_rows = any(n['Node Type'] == 'Sort' for n in nodes)
+    else:
+        scanned = {m.group(1) for m in map(SQLITE_SCAN.match, plan) if m}
+        sorted_rows = any(detail.startswith(SQLITE_SORT) for detail in plan)
+
+    problems = [f"sequential scan on {table}" for table in sorted(scanned & tables)]
+    if sorted_rows and is_paginated(sql):
+        problems.append("sort without a usable index")
+    return problems
@@ -0,0 +1,140 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Location, Supplier
+
+KINDS = {Location: 'location', Supplier: 'supplier'}
+
+
+# -----------------------
+# Process-local Tier
+# -----------------------
+class LocalReferences:
+    # Bounded LRU of (kind, user, generation, name) -> id in front of the shared cache
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_references = LocalReferences(settings.REFERENCE_CACHE_LOCAL_ENTRIES)
+
+
+# -----------------------
+# Generations
+# -----------------------
+# Renames and deletes replace the generation token, orphaning every cached name of that
+# kind for the user in both tiers. A token rather than a counter, so an evicted
+# generation can never come back as one that still has stale entries.
+def _generation_key(kind, user_id):
+    return f"refgen:{kind}:{user_id}"
+
+
+def generations(user_id):
+    if not settings.REFERENCE_CACHE_ENABLED:
+        return dict.fromkeys(KINDS.values())
+    keys = {kind: _generation_key(kind, user_id) for kind in KINDS.values()}
+    found = cache.get_many(keys.values())
+    result = {}
+    for kind, key in keys.items():
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+        result[kind] = found[key]
+    return result
+
+
+def forget(model, user_id):
+    if not settings.REFERENCE_CACHE_ENABLED:
+        return
+
+    def replace():
+        cache.set(_generation_key(KINDS[model], user_id), uuid.uuid4().hex, None)
+    replace()
+    # Again once committed: a reader may have cached the old name while we were uncommitted
+    transaction.on_commit(replace)
+
+
+# -----------------------
+# Lookups
+# -----------------------
+def _entry_key(kind, user_id, generation, name):
+    digest = hashlib.sha1(name.encode()).hexdigest()[:20]
+    return f"ref:{kind}:{user_id}:{generation}:{digest}"
+
+
+def cached_ids(model, user_id, names, generation=None):
+    if not settings.REFERENCE_CACHE_ENABLED:
+        return {}
+    kind = KINDS[model]
+    generation = generation or generations(user_id)[kind]
+    ids, missing = {}, {}
+    for name in names:
+        key = _entry_key(kind, user_id, generation, name)
+        value = local_references.get(key)
+        if value is None:
+            missing[key] = name
+        else:
+            ids[name] = value
+    if missing:
+        for key, value in cache.get_many(missing.keys()).items():
+            local_references.set(key, value)
+            ids[missing[key]] = value
+    return ids
+
+
+def remember(model, user_id, ids, generation):
+    # Stored under the generation read before the lookup, so a rename that lands in between
+    # orphans these entries too. Only once committed: a rolled-back insert must not leave a
+    # dangling id behind.
+    if not settings.REFERENCE_CACHE_ENABLED:
+        return
+
+    def store():
+        kind = KINDS[model]
+        entries = {_entry_key(kind, user_id, generation, name): pk for name, pk in ids.items()}
+        cache.set_many(entries, settings.REFERENCE_CACHE_TIMEOUT)
+        for key, pk in entries.items():
+            local_references.set(key, pk)
+    transaction.on_commit(store)
+
+
+def resolve_references(user, location, supplier):
+    # Write endpoints: (location_id, supplier_id), usually without touching the database
+    current = generations(user.id)
+    resolved = []
+    for model, name in ((Location, location), (Supplier, supplier)):
+        cached = cached_ids(model, user.id, [name], current[KINDS[model]])
+        if name in cached:
+            resolved.append(cached[name])
+            continue
+        # Race-safe under concurrent writers: the (user, name) unique constraint keeps one row
+        # and get_or_create falls back to reading the winner's
+        instance, _ = model.objects.get_or_create(user=user, name=name)
+        remember(model, user.id, {name: instance.pk}, current[KINDS[model]])
+        resolved.append(instance.pk)
+    return tuple(resolved)
@@ -0,0 +1,293 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from .caching import get_data_version
+from .models import InventoryReport
+from .selectors import below_reorder_point, user_items, user_locations
+
+CHUNK_SIZE = 2000
+NO_LOCATION = 'No location'
+
+
+class ReportError(ValueError):
+    pass
+
+
+# -----------------------
+# PDF Layout
+# -----------------------
+class PdfTable:
+    # Draws rows straight onto a reportlab canvas and starts a new page when one fills up,
+    # so a report never holds more than the current page's rows (no platypus story/Table)
+    MARGIN = 40
+    ROW_HEIGHT = 13
+    FONT_SIZE = 8
+
+    def __init__(self, path, title, subtitle, columns):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas  # only the report worker loads reportlab
+
+        self.canvas = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        self.width, self.height = A4
+        self.title, self.subtitle = title, subtitle
+        # (header, width, right-aligned)
+        self.columns = columns
+        self.page = 0
+        self.y = 0
+        self.new_page()
+
+    def new_page(self):
+        if self.page:
+            self.canvas.showPage()
+        self.page += 1
+        c = self.canvas
+        top = self.height - self.MARGIN
+        c.setFont('Helvetica-Bold', 13)
+        c.drawString(self.MARGIN, top, self.title)
+        c.setFont('Helvetica', 8)
+        c.drawString(self.MARGIN, top - 14, self.subtitle)
+        c.drawRightString(self.width - self.MARGIN, self.MARGIN / 2, f"Page {self.page}")
+        self.y = top - 36
+        self._draw([header for header, _, _ in self.columns], 'Helvetica-Bold')
+        c.line(self.MARGIN, self.y + self.ROW_HEIGHT - 3, self.width - self.MARGIN, self.y + self.ROW_HEIGHT - 3)
+
+    def _draw(self, values, font):
+        c = self.canvas
+        c.setFont(font, self.FONT_SIZE)
+        x = self.MARGIN
+        for value, (_, width, right) in zip(values, self.columns):
+            text = '' if value is None else str(value)
+            # Roughly half an em per character in Helvetica; cheaper than measuring every cell
+            limit = int(width / (self.FONT_SIZE * 0.5))
+            if len(text) > limit:
+                text = text[:limit - 1] + '…'
+            if right:
+                c.drawRightString(x + width - 4, self.y, text)
+            else:
+                c.drawString(x, self.y, text)
+            x += width
+        self.y -= self.ROW_HEIGHT
+
+    def row(self, values, bold=False):
+        if self.y < self.MARGIN + self.ROW_HEIGHT:
+            self.new_page()
+        self._draw(values, 'Helvetica-Bold' if bold else 'Helvetica')
+
+    def heading(self, text):
+        # Keeps a group heading off the bottom line of a page
+        if self.y < self.MARGIN + 3 * self.ROW_HEIGHT:
+            self.new_page()
+        self.y -= 4
+        self._draw([text], 'Helvetica-Bold')
+
+    def close(self):
+        self.canvas.save()
+
+
+def money(value):
+    return f"{value:,.2f}"
+
+
+# -----------------------
+# Reports
+# -----------------------
+# Rows come off a chunked iterator (a server-side cursor on PostgreSQL), ordered by
+# location so subtotals are running sums; each writer returns the rows it drew
+def write_valuation(table, user, location):
+    rows = user_items(user, location).order_by('location__name', 'name', 'id').values_list(
+        'location__name', 'name', 'supplier__name', 'quantity', 'price',
+    ).iterator(chunk_size=CHUNK_SIZE)
+    count, total, group, subtotal = 0, Decimal(0), None, Decimal(0)
+    for place, name, supplier, quantity, price in rows:
+        place = place or NO_LOCATION
+        if place != group:
+            if group is not None:
+                table.row(['Subtotal', '', '', '', money(subtotal)], bold=True)
+            table.heading(place)
+            group, subtotal = place, Decimal(0)
+        value = quantity * price
+        table.row([name, supplier or 'N/A', quantity, money(price), money(value)])
+        subtotal += value
+        total += value
+        count += 1
+    if group is not None:
+        table.row(['Subtotal', '', '', '', money(subtotal)], bold=True)
+    table.row([f"Total ({count} items)", '', '', '', money(total)], bold=True)
+    return count
+
+
+def write_low_stock(table, user, location):
+    rows = below_reorder_point(user, location).order_by('location__name', 'quantity', 'id').values_list(
+        'location__name', 'name', 'supplier__name', 'quantity', 'reorder_point', 'target_level',
+    ).iterator(chunk_size=CHUNK_SIZE)
+    count, to_order, group = 0, 0, None
+    for place, name, supplier, quantity, reorder_point, target_level in rows:
+        place = place or NO_LOCATION
+        if place != group:
+            table.heading(place)
+            group = place
+        suggested = max(target_level - quantity, 0)
+        table.row([name, supplier or 'N/A', quantity, reorder_point, target_level, suggested])
+        to_order += suggested
+        count += 1
+    table.row([f"Total ({count} items below reorder point)", '', '', '', '', to_order], bold=True)
+    return count
+
+
+REPORTS = {
+    InventoryReport.VALUATION: ('Inventory Valuation', [
+        ('Item', 205, False), ('Supplier', 120, False), ('Quantity', 55, True), ('Price', 60, True),
+        ('Value', 75, True),
+    ], write_valuation),
+    InventoryReport.LOW_STOCK: ('Low Stock', [
+        ('Item', 195, False), ('Supplier', 110, False), ('Quantity', 50, True), ('Reorder At', 50, True),
+        ('Target', 50, True), ('Order', 60, True),
+    ], write_low_stock),
+}
+
+
+def render_report(report, path):
+    title, columns, write = REPORTS[report.kind]
+    subtitle = (f"{report.location or 'All locations'} · data version {report.data_version} · "
+                f"generated {timezone.now():%Y-%m-%d %H:%M} UTC")
+    table = PdfTable(path, title, subtitle, columns)
+    rows = write(table, report.user, report.location)
+    table.close()
+    return rows
+
+
+def build_report(report):
+    # (path, content, rows). The web process serves what the worker built, so the PDF goes
+    # where both can read it: the database, or REPORT_DIR when that is a shared volume.
+    if not settings.REPORT_DIR:
+        # Rows still go to disk page by page; only the finished PDF is read back
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.pdf')
+            rows = render_report(report, path)
+            with open(path, 'rb') as f:
+                return '', f.read(), rows
+
+    # Written aside and moved into place, so a download never sees half a file
+    directory = os.path.join(settings.REPORT_DIR, str(report.user_id))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{report.kind}-{report.pk}.pdf")
+    rows = render_report(report, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return path, None, rows
+
+
+def discard_older(report):
+    # Earlier versions of the same report can never be served again
+    older = InventoryReport.objects.filter(
+        user_id=report.user_id, kind=report.kind, location=report.location, data_version__lt=report.data_version,
+        status__in=[InventoryReport.DONE, InventoryReport.FAILED],
+    )
+    for path in older.exclude(path='').values_list('path', flat=True):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    older.delete()
+
+
+# -----------------------
+# Requests
+# -----------------------
+def parse_kind(kind):
+    if kind not in REPORTS:
+        raise ReportError(f"Unknown report: {kind}")
+    return kind
+
+
+def parse_location(user, location):
+    # '' is every location; anything else must be one of the user's, before a row is stored
+    # or a build queued for it
+    if location and not user_locations(user).filter(name=location).exists():
+        raise ReportError(f"Unknown location: {location[:100]}")
+    return location
+
+
+def _in_flight(report):
+    # A report the worker lost (crash, redeploy) is retried after the timeout
+    cutoff = timezone.now() - timedelta(seconds=settings.ANALYTICS_JOB_TIMEOUT)
+    return report.status in (InventoryReport.PENDING, InventoryReport.RUNNING) and report.requested_at > cutoff
+
+
+def _ready(report):
+    # Stored in the database, or a file this process can read: a REPORT_DIR that is not
+    # shared with the worker, or was cleaned up, leaves a finished report unreadable
+    return report.status == InventoryReport.DONE and (not report.path or os.path.exists(report.path))
+
+
+def current_report(request, kind, location='', content=False):
+    reports = InventoryReport.objects.filter(
+        user=request.user, kind=kind, location=location, data_version=get_data_version(request),
+    )
+    return (reports if content else reports.defer('content')).first()
+
+
+def request_report(request, kind, location='', retry=False):
+    # The finished report for the current data version, or the job building it. A failed or
+    # unreadable build is only queued again with retry, so polling one does not loop.
+    from .tasks import generate_report
+
+    report = current_report(request, kind, location)
+    if report is not None and (_ready(report) or _in_flight(report)):
+        return report
+    if report is not None and report.status in (InventoryReport.DONE, InventoryReport.FAILED) and not retry:
+        return report
+
+    if report is None:
+        try:
+            with transaction.atomic():
+                report = InventoryReport.objects.create(
+                    user=request.user, kind=kind, location=location, data_version=get_data_version(request),
+                )
+        except IntegrityError:
+            # Another request queued the same report first
+            return current_report(request, kind, location)
+    else:
+        report.status = InventoryReport.PENDING
+        report.error = ''
+        report.requested_at = timezone.now()
+        report.save(update_fields=['status', 'error', 'requested_at'])
+
+    transaction.on_commit(lambda: generate_report.delay(report.pk))
+    return report
+
+
+def report_status(report):
+    status = {
+        'status': report.status,
+        'kind': report.kind,
+        'location': report.location,
+        'data_version': report.data_version,
+        'error': report.error,
+    }
+    if report.status == InventoryReport.DONE and not _ready(report):
+        # Reported as failed so pollers stop; requesting it again rebuilds it
+        status.update(status=InventoryReport.FAILED,
+                      error='The report file is not readable here; REPORT_DIR must be shared with the worker')
+    elif _ready(report):
+        query = f"?{urlencode({'location': report.location})}" if report.location else ''
+        status.update(rows=report.rows, size=report.size,
+                      download_url=reverse('download_report', args=[report.kind]) + query)
+    return status
+
+
+def ready_report(request, kind, location=''):
+    report = current_report(request, kind, location, content=True)
+    return report if report is not None and _ready(report) else None
+
+
+def open_report(report):
+    return open(report.path, 'rb') if report.path else io.BytesIO(bytes(report.content))
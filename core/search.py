@@ -0,0 +1,288 @@
+import base64
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .pagination import DEFAULT_ITEM_FIELDS, ITEM_FIELDS, PaginationError, annotate_fields
+from .selectors import user_items
+
+MAX_QUERY_LENGTH = 100
+# Ranked search returns the best matches, not every match: pages walk this many at most
+MAX_SEARCH_CANDIDATES = 200
+# pg_trgm's default similarity threshold; weaker fuzzy matches are dropped
+SIMILARITY_THRESHOLD = 0.3
+# A query word found in the supplier or location counts for less than one in the item name
+REFERENCE_WEIGHT = 0.8
+
+WORD = re.compile(r'[^\W_]+')
+
+
+class SearchError(ValueError):
+    pass
+
+
+# -----------------------
+# Scoring
+# -----------------------
+def normalize(text):
+    return ' '.join(WORD.findall((text or '').lower()))
+
+
+def trigrams(text):
+    # pg_trgm's trigrams: each word padded with two spaces in front and one behind
+    grams = set()
+    for word in WORD.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    a, b = trigrams(a), trigrams(b)
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+@lru_cache(maxsize=65536)
+def term_match(term, word):
+    # Words repeat across a catalogue, so most pairs are scored once per process
+    if word == term:
+        return 1.0
+    if word.startswith(term):
+        return 0.9
+    if term in word:
+        return 0.7
+    return similarity(term, word)
+
+
+def match_score(query, name, supplier, location):
+    # Whole-name tiers first (exact, prefix, word prefix), then how well each query word
+    # matches some word of the name, supplier or location; a typo still scores its trigrams
+    name = normalize(name)
+    if name == query:
+        tier = 3
+    elif name.startswith(query):
+        tier = 2
+    elif f' {query}' in f' {name}':
+        tier = 1
+    else:
+        tier = 0
+    words = [(word, 1.0) for word in name.split()] + [
+        (word, REFERENCE_WEIGHT) for ref in (supplier, location) if ref for word in normalize(ref).split()
+    ]
+    terms = query.split()
+    relevance = sum(max((weight * term_match(term, word) for word, weight in words), default=0.0)
+                    for term in terms) / len(terms)
+    if not tier and relevance < SIMILARITY_THRESHOLD:
+        return None
+    return tier + relevance
+
+
+# -----------------------
+# Candidates
+# -----------------------
+# Each backend narrows the tenant's items to at most MAX_SEARCH_CANDIDATES through its own
+# index; match_score then ranks them the same way everywhere.
+def _prefix_candidates(items, query):
+    # One or two characters are too short for trigrams: names and words starting with them
+    return items.filter(
+        Q(name__istartswith=query) | Q(name__icontains=f' {query}')
+        | Q(supplier__name__istartswith=query) | Q(location__name__istartswith=query)
+    ).order_by('name', 'id')
+
+
+def _postgres_candidates(items, user, query):
+    # GIN trigram indexes (migration 0009): "%>" for fuzzy words, UPPER(name) for substrings
+    from .models import Location, Supplier
+
+    references = {
+        'supplier__in': Supplier.objects.filter(user=user, name__trigram_word_similar=query).values('id'),
+        'location__in': Location.objects.filter(user=user, name__trigram_word_similar=query).values('id'),
+    }
+    matches = Q(name__trigram_word_similar=query) | Q(name__icontains=query)
+    for lookup, ids in references.items():
+        matches |= Q(**{lookup: ids})
+    return items.filter(matches).annotate(
+        similarity=TrigramWordSimilarity(query, 'name'),
+    ).order_by('-similarity', 'id')
+
+
+def _sqlite_candidates(items, user, query, scoped=False):
+    # Item names from the FTS5 trigram table kept by triggers (see ensure_search_index): any
+    # shared trigram within the user's owner token is a candidate, best bm25 on the name
+    # first, which covers substrings and most typos. With a location or supplier filter the
+    # filtered items are matched before the LIMIT, so the cap cannot crowd them out.
+    # A tenant's suppliers and locations are few, so their names are matched as substrings.
+    from .selectors import user_locations, user_suppliers
+
+    names = ' OR '.join(_phrase(gram) for gram in sorted(_padded_trigrams(query)))
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    params = [f'owner : {_phrase(owner_token(user.id))} AND name : ({names})']
+    if scoped:
+        scope, scope_params = items.values('id').query.sql_with_params()
+        sql += f' AND rowid IN ({scope})'
+        params += scope_params
+    # rank as bm25 over the name alone, still sorted inside FTS5 rather than by SQLite
+    matched = RawSQL(f"{sql} AND rank MATCH 'bm25(0.0, 1.0)' ORDER BY rank LIMIT %s", (*params, MAX_SEARCH_CANDIDATES))
+    references = Q(pk__in=[])
+    for word in query.split():
+        if len(word) >= 3:
+            references |= Q(name__icontains=word)
+    return items.filter(
+        Q(id__in=matched)
+        | Q(supplier__in=user_suppliers(user).filter(references).values('id'))
+        | Q(location__in=user_locations(user).filter(references).values('id'))
+    )
+
+
+def _phrase(text):
+    return '"{}"'.format(text.replace('"', '""'))
+
+
+def _padded_trigrams(query):
+    # The index stores names padded with single spaces, so " sc" marks a word starting "sc"
+    grams = set()
+    for word in query.split():
+        padded = f' {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# -----------------------
+# Search
+# -----------------------
+def parse_query(query):
+    query = normalize(query)
+    if not query:
+        raise SearchError('q is required')
+    if len(query) > MAX_QUERY_LENGTH:
+        raise SearchError(f'q is limited to {MAX_QUERY_LENGTH} characters')
+    return query
+
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip('=')
+
+
+def decode_offset(cursor):
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+    if not 0 <= offset < MAX_SEARCH_CANDIDATES:
+        raise PaginationError('Invalid cursor')
+    return offset
+
+
+def search_items(user, query, fields=None, cursor=None, limit=20, location='', supplier=''):
+    # Ranked item search over name, supplier and location; one query per page
+    query = parse_query(query)
+    fields = list(fields or DEFAULT_ITEM_FIELDS)
+    offset = decode_offset(cursor) if cursor else 0
+
+    items = user_items(user, location, supplier)
+    if len(query) < 3:
+        candidates = _prefix_candidates(items, query)
+    elif connection.vendor == 'postgresql':
+        candidates = _postgres_candidates(items, user, query)
+    else:
+        candidates = _sqlite_candidates(items, user, query, scoped=bool(location or supplier))
+    candidates = annotate_fields(candidates, fields)
+
+    columns = list(dict.fromkeys(['id', 'name', 'supplier__name', 'location__name'] + [ITEM_FIELDS[f] for f in fields]))
+    ranked = []
+    for row in candidates.values_list(*columns)[:MAX_SEARCH_CANDIDATES]:
+        score = match_score(query, row[1], row[2], row[3])
+        if score is not None:
+            ranked.append((score, row))
+    ranked.sort(key=lambda match: (-match[0], match[1][1].lower(), match[1][0]))
+
+    positions = [(f, columns.index(ITEM_FIELDS[f])) for f in fields]
+    page = []
+    for score, row in ranked[offset:offset + limit]:
+        item = {f: row[i] for f, i in positions}
+        if 'price' in item:
+            item['price'] = float(item['price'])
+        item['score'] = round(score, 3)
+        page.append(item)
+
+    more = offset + limit < len(ranked)
+    return {'items': page, 'next_cursor': encode_offset(offset + limit) if more else None}
+
+
+# -----------------------
+# Index Maintenance
+# -----------------------
+FTS_TABLE = 'core_itemsearch'
+FTS_TRIGGERS = ('core_itemsearch_insert', 'core_itemsearch_update', 'core_itemsearch_delete')
+
+# Item names, padded so word starts and ends have trigrams (see _padded_trigrams), under an
+# indexed owner token so matching stays within one tenant (see owner_token). The triggers
+# must not read other tables: SQLite refuses to rename a rebuilt table while another table's
+# trigger names it, and migrations rebuild tables to alter them.
+SQLITE_INDEX = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(owner, name, tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS core_itemsearch_insert AFTER INSERT ON core_inventoryitem BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, owner, name) VALUES (new.id, ' u' || new.user_id || ' ', ' ' || new.name || ' ');
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS core_itemsearch_update AFTER UPDATE OF name ON core_inventoryitem BEGIN
+        UPDATE {FTS_TABLE} SET name = ' ' || new.name || ' ' WHERE rowid = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS core_itemsearch_delete AFTER DELETE ON core_inventoryitem BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+]
+
+def owner_token(user_id):
+    # Padded like the names: as a trigram phrase " u12 " cannot match inside " u112 "
+    return f' u{user_id} '
+
+
+POSTGRES_INDEX = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS item_name_trgm_idx ON core_inventoryitem USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS item_upper_name_trgm_idx ON core_inventoryitem USING gin (UPPER(name::text) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS supplier_name_trgm_idx ON core_supplier USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS location_name_trgm_idx ON core_location USING gin (name gin_trgm_ops)',
+]
+
+
+def ensure_search_index(conn):
+    # Idempotent; also run after every migrate, because SQLite drops a table's triggers
+    # along with it whenever a migration rebuilds the table. Missing triggers mean the copy
+    # may have drifted, so it is refilled from the items.
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for statement in POSTGRES_INDEX:
+                cursor.execute(statement)
+            return
+        if conn.vendor != 'sqlite':
+            return
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ({})".format(', '.join(['%s'] * (len(FTS_TRIGGERS) + 1))),
+            (FTS_TABLE, *FTS_TRIGGERS),
+        )
+        if len(cursor.fetchall()) == len(FTS_TRIGGERS) + 1:
+            return
+        for statement in SQLITE_INDEX:
+            cursor.execute(statement)
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, owner, name) "
+            f"SELECT id, ' u' || user_id || ' ', ' ' || name || ' ' FROM core_inventoryitem"
+        )
+
+
+def drop_search_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for name in ('item_name_trgm_idx', 'item_upper_name_trgm_idx', 'supplier_name_trgm_idx',
+                         'location_name_trgm_idx'):
+                cursor.execute(f'DROP INDEX IF EXISTS {name}')
+        elif conn.vendor == 'sqlite':
+            for name in FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
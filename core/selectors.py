@@ -0,0 +1,110 @@
+import logging
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, Prefetch, Sum
+
+from .models import InventoryItem, Location, Supplier
+
+logger = logging.getLogger(__name__)
+
+# Alerts shown on the insights page; the rest are a page away in the items API
+STOCK_ALERT_PAGE_SIZE = 50
+
+
+# -----------------------
+# Query Budgets
+# -----------------------
+def query_budget(queries):
+    # Declares how many queries one request to the view runs, session and user lookups
+    # included, however much data the user has. QueryBudgetTests holds every view to it
+    # exactly; under DEBUG overruns are also logged (streamed bodies query after this returns).
+    def decorator(view):
+        if iscoroutinefunction(view):
+            # Async views spread their queries over pool threads, out of reach of a per-connection
+            # counter; the tests still hold them to the budget
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                return await view(request, *args, **kwargs)
+            async_wrapper.query_budget = queries
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.DEBUG:
+                return view(request, *args, **kwargs)
+            executed = []
+            with connection.execute_wrapper(lambda execute, sql, *a: executed.append(sql) or execute(sql, *a)):
+                response = view(request, *args, **kwargs)
+            if len(executed) > queries:
+                logger.warning("%s ran %d queries (budget %d)", view.__name__, len(executed), queries)
+            return response
+        wrapper.query_budget = queries
+        return wrapper
+    return decorator
+
+
+# -----------------------
+# Items
+# -----------------------
+def user_items(user, location='', supplier=''):
+    items = InventoryItem.objects.filter(user=user)
+    if location:
+        items = items.filter(location__name=location)
+    if supplier:
+        items = items.filter(supplier__name=supplier)
+    return items
+
+
+def user_item(user, item_id):
+    return InventoryItem.objects.select_related('location', 'supplier').get(id=item_id, user=user)
+
+
+def below_reorder_point(user, location='', supplier=''):
+    # Matches the partial index item_user_low_stock_idx condition, so only low items are read
+    return user_items(user, location, supplier).filter(quantity__lt=F('reorder_point'))
+
+
+def stock_alerts(user):
+    # Emptiest first, one page from the partial index; both lists come from the same rows
+    from .pagination import paginate_items
+
+    page = paginate_items(user, fields=['name', 'quantity', 'location', 'suggested_quantity'], order='quantity',
+                          limit=STOCK_ALERT_PAGE_SIZE, low_stock=True)
+    low_stock = [{'name': i['name'], 'quantity': i['quantity'], 'location': i['location'] or 'N/A'}
+                 for i in page['items']]
+    restock = [{'name': i['name'], 'suggested_quantity': i['suggested_quantity']}
+               for i in page['items'] if i['suggested_quantity'] > 0]
+    return low_stock, restock, page['next_cursor']
+
+
+# -----------------------
+# Locations & Suppliers
+# -----------------------
+def user_locations(user):
+    return Location.objects.filter(user=user).order_by('name')
+
+
+def user_suppliers(user):
+    return Supplier.objects.filter(user=user).order_by('name')
+
+
+def location_overview(user):
+    # Counts aggregate in SQL; every location's items arrive in one prefetch query
+    return user_locations(user).annotate(
+        item_count=Count('inventoryitem'),
+        total_stock=Sum('inventoryitem__quantity'),
+    ).prefetch_related(Prefetch(
+        'inventoryitem_set',
+        queryset=InventoryItem.objects.only('name', 'quantity', 'location_id').order_by('name', 'id'),
+        to_attr='items_list',
+    ))
+
+
+def supplier_overview(user):
+    return user_suppliers(user).annotate(
+        item_count=Count('inventoryitem'),
+        total_stock=Sum('inventoryitem__quantity'),
+    )
@@ -0,0 +1,185 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import changes, ledger, references, search, summaries
+from .caching import bump_data_version
+from .models import ChangeLog, InventoryItem, Location, Supplier
+
+# Sent after set-based writes (bulk_create, COPY, queryset update/delete) that
+# bypass per-instance model signals. Receivers get ``user_id``. Bulk writers
+# record their own stock movements through core.ledger.
+inventory_bulk_changed = Signal()
+
+_bulk_write = ContextVar('bulk_write', default=False)
+
+
+@contextmanager
+def bulk_write():
+    # Per-item receivers stand down while a set-based writer does the work itself
+    token = _bulk_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_write.reset(token)
+
+
+def account_deleted(origin):
+    # Cascading from a user, or from User.objects.filter(...).delete()
+    return isinstance(origin, User) or (isinstance(origin, QuerySet) and origin.model is User)
+
+
+# -----------------------
+# Inventory Summary Maintenance
+# -----------------------
+@receiver(pre_save, sender=InventoryItem)
+def remember_previous_item(sender, instance, raw=False, **kwargs):
+    instance._previous = None
+    if instance.pk and not raw and not _bulk_write.get():
+        instance._previous = InventoryItem.objects.filter(pk=instance.pk).only(
+            'user_id', 'location_id', 'supplier_id', 'quantity', 'price'
+        ).first()
+
+
+@receiver(post_save, sender=InventoryItem)
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or _bulk_write.get():
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None:
+        summaries.item_removed(previous)
+    summaries.item_added(instance)
+
+
+@receiver(post_delete, sender=InventoryItem)
+def update_summary_on_delete(sender, instance, **kwargs):
+    if _bulk_write.get():
+        return
+    summaries.item_removed(instance)
+
+
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Supplier)
+def rebuild_summary_on_reference_delete(sender, instance, origin=None, **kwargs):
+    if account_deleted(origin):
+        return
+    # Items fall back to NULL via an UPDATE that sends no item signals.
+    summaries.rebuild_user_summaries(instance.user_id)
+
+
+# -----------------------
+# Stock Movement Ledger
+# -----------------------
+@receiver(post_save, sender=InventoryItem)
+def record_movement_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or _bulk_write.get():
+        return
+    previous = getattr(instance, '_previous', None)
+    change = instance.quantity - (previous.quantity if previous is not None else 0)
+    ledger.record_movements([ledger.movement_for(instance, change, instance.quantity)])
+
+
+@receiver(post_delete, sender=InventoryItem)
+def record_movement_on_delete(sender, instance, origin=None, **kwargs):
+    # Nothing to keep when the whole account is being deleted
+    if account_deleted(origin) or _bulk_write.get():
+        return
+    ledger.record_movements([ledger.movement_for(instance, -instance.quantity, 0)])
+
+
+# -----------------------
+# Data Version Bumps
+# -----------------------
+@receiver(post_save, sender=InventoryItem)
+@receiver(post_delete, sender=InventoryItem)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def bump_version_on_write(sender, instance, raw=False, **kwargs):
+    if not raw and not _bulk_write.get():
+        bump_data_version(instance.user_id)
+
+
+# -----------------------
+# Change Feed
+# -----------------------
+@receiver(post_save, sender=InventoryItem)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Supplier)
+def record_change_on_save(sender, instance, raw=False, **kwargs):
+    if not raw and not _bulk_write.get():
+        changes.record_instance_change(instance)
+
+
+@receiver(post_delete, sender=InventoryItem)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Supplier)
+def record_change_on_delete(sender, instance, origin=None, **kwargs):
+    if account_deleted(origin) or _bulk_write.get():
+        return
+    changes.record_instance_change(instance, ChangeLog.DELETE)
+
+
+def _record_referencing_items(sender, instance):
+    field = 'location' if sender is Location else 'supplier'
+    # Scoped to the owner: older rows may point at another tenant's reference (see 0014)
+    item_ids = InventoryItem.objects.filter(user_id=instance.user_id, **{field: instance}).values_list('id', flat=True)
+    changes.record_changes(instance.user_id, ChangeLog.ITEM, list(item_ids))
+
+
+@receiver(pre_delete, sender=Location)
+@receiver(pre_delete, sender=Supplier)
+def record_item_changes_on_reference_delete(sender, instance, origin=None, **kwargs):
+    # Items referencing it are about to be set to NULL by an UPDATE that sends no signals
+    if not account_deleted(origin):
+        _record_referencing_items(sender, instance)
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Supplier)
+def record_item_changes_on_reference_rename(sender, instance, created, raw=False, **kwargs):
+    # Item changes carry the reference by name, so a rename changes every item using it
+    if not created and not raw and not _bulk_write.get():
+        _record_referencing_items(sender, instance)
+
+
+# -----------------------
+# Reference Name Cache
+# -----------------------
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=Supplier)
+def forget_renamed_references(sender, instance, created, raw=False, **kwargs):
+    # New names cannot make a cached one wrong; renames can
+    if not created and not raw:
+        references.forget(sender, instance.user_id)
+
+
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=Supplier)
+def forget_deleted_references(sender, instance, **kwargs):
+    references.forget(sender, instance.user_id)
+
+
+# -----------------------
+# Bulk Writes
+# -----------------------
+@receiver(inventory_bulk_changed)
+def refresh_after_bulk_change(sender, user_id, **kwargs):
+    summaries.rebuild_user_summaries(user_id)
+    bump_data_version(user_id)
+
+
+# -----------------------
+# Search Index
+# -----------------------
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    # SQLite drops triggers along with any table a migration rebuilds
+    if sender.name == 'core' and connections[using].vendor == 'sqlite':
+        search.ensure_search_index(connections[using])
@@ -0,0 +1,129 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import InventoryItem, InventorySummary
+
+
+# -----------------------
+# Incremental maintenance
+# -----------------------
+def apply_item_delta(user_id, location_id, supplier_id, count, quantity, value, retry=True):
+    rows = InventorySummary.objects.filter(
+        user_id=user_id, location_id=location_id, supplier_id=supplier_id
+    )
+    updated = rows.update(
+        item_count=F('item_count') + count,
+        total_quantity=F('total_quantity') + quantity,
+        total_value=F('total_value') + value,
+    )
+    # A removal without a matching row means the summary already drifted
+    # (or the owner is being cascaded away); rebuild_summaries repairs it.
+    if not updated and count > 0:
+        try:
+            with transaction.atomic():
+                InventorySummary.objects.create(
+                    user_id=user_id,
+                    location_id=location_id,
+                    supplier_id=supplier_id,
+                    item_count=count,
+                    total_quantity=quantity,
+                    total_value=value,
+                )
+        except IntegrityError:
+            # A concurrent writer created the group first; add to its row instead
+            if not retry:
+                raise
+            apply_item_delta(user_id, location_id, supplier_id, count, quantity, value, retry=False)
+
+
+def item_added(item):
+    apply_item_delta(item.user_id, item.location_id, item.supplier_id, 1, item.quantity, Decimal(item.price))
+
+
+def item_removed(item):
+    apply_item_delta(item.user_id, item.location_id, item.supplier_id, -1, -item.quantity, -Decimal(item.price))
+
+
+# -----------------------
+# Rebuild & Verify
+# -----------------------
+def compute_summaries(user_id):
+    rows = (
+        InventoryItem.objects.filter(user_id=user_id)
+        .values('location_id', 'supplier_id')
+        .annotate(item_count=Count('id'), total_quantity=Sum('quantity'), total_value=Sum('price'))
+        .order_by()
+    )
+    return {
+        (row['location_id'], row['supplier_id']): (
+            row['item_count'], row['total_quantity'] or 0, row['total_value'] or Decimal('0')
+        )
+        for row in rows
+    }
+
+
+def stored_summaries(user_id):
+    rows = InventorySummary.objects.filter(user_id=user_id, item_count__gt=0).values_list(
+        'location_id', 'supplier_id', 'item_count', 'total_quantity', 'total_value'
+    )
+    return {(loc, sup): (count, qty, value) for loc, sup, count, qty, value in rows}
+
+
+def rebuild_user_summaries(user_id):
+    expected = compute_summaries(user_id)
+    with transaction.atomic():
+        InventorySummary.objects.filter(user_id=user_id).delete()
+        InventorySummary.objects.bulk_create([
+            InventorySummary(
+                user_id=user_id,
+                location_id=location_id,
+                supplier_id=supplier_id,
+                item_count=count,
+                total_quantity=quantity,
+                total_value=value,
+            )
+            for (location_id, supplier_id), (count, quantity, value) in expected.items()
+        ])
+    return len(expected)
+
+
+def verify_user_summaries(user_id):
+    expected = compute_summaries(user_id)
+    stored = stored_summaries(user_id)
+    # Unassigned groups have None ids; sort them first rather than comparing None with int
+    return sorted(
+        ((key, expected.get(key), stored.get(key))
+         for key in set(expected) | set(stored)
+         if expected.get(key) != stored.get(key)),
+        key=lambda row: (row[0][0] or 0, row[0][1] or 0),
+    )
+
+
+# -----------------------
+# Dashboard Reads
+# -----------------------
+def dashboard_totals(user, location_name=''):
+    rows = InventorySummary.objects.filter(user=user, item_count__gt=0)
+    if location_name:
+        rows = rows.filter(location__name=location_name)
+
+    total_items = 0
+    total_value = Decimal('0')
+    by_location = {}
+    by_supplier = {}
+    for location, supplier, count, quantity, value in rows.values_list(
+        'location__name', 'supplier__name', 'item_count', 'total_quantity', 'total_value'
+    ):
+        total_items += count
+        total_value += value
+        by_location[location] = by_location.get(location, 0) + quantity
+        by_supplier[supplier] = by_supplier.get(supplier, 0) + quantity
+
+    return {
+        'total_items': total_items,
+        'total_value': total_value,
+        'location_data': [{'location__name': k, 'total': v} for k, v in by_location.items()],
+        'supplier_data': [{'supplier__name': k, 'total': v} for k, v in by_supplier.items()],
+    }
@@ -0,0 +1,63 @@
+import logging
+import os
+
+from celery import shared_task
+from django.utils import timezone
+
+from .events import publish
+from .models import AnalyticsResult, InventoryReport
+
+logger = logging.getLogger(__name__)
+
+
+def _compute(kind, user):
+    from . import analytics
+    if kind == 'insights':
+        return analytics.compute_insights(user)
+    raise ValueError(f"Unknown analytics kind: {kind}")
+
+
+@shared_task
+def compute_analytics(result_id):
+    updated = AnalyticsResult.objects.filter(
+        pk=result_id, status=AnalyticsResult.PENDING
+    ).update(status=AnalyticsResult.RUNNING)
+    if not updated:
+        return  # already picked up by another worker or deleted
+    result = AnalyticsResult.objects.select_related('user').get(pk=result_id)
+    try:
+        result.payload = _compute(result.kind, result.user)
+        result.status = AnalyticsResult.DONE
+    except Exception as e:
+        logger.exception("Analytics job %s failed", result_id)
+        result.status = AnalyticsResult.FAILED
+        result.error = str(e)
+    result.finished_at = timezone.now()
+    result.save(update_fields=['payload', 'status', 'error', 'finished_at'])
+    publish(result.user_id, 'analytics', kind=result.kind, status=result.status, data_version=result.data_version)
+
+
+@shared_task
+def generate_report(report_id):
+    from .reports import build_report, discard_older
+
+    updated = InventoryReport.objects.filter(
+        pk=report_id, status=InventoryReport.PENDING
+    ).update(status=InventoryReport.RUNNING)
+    if not updated:
+        return
+    report = InventoryReport.objects.select_related('user').get(pk=report_id)
+    try:
+        report.path, report.content, report.rows = build_report(report)
+        report.size = os.path.getsize(report.path) if report.path else len(report.content)
+        report.status = InventoryReport.DONE
+    except Exception as e:
+        logger.exception("Report %s failed", report_id)
+        report.status = InventoryReport.FAILED
+        report.error = str(e)
+    report.finished_at = timezone.now()
+    report.save(update_fields=['path', 'content', 'rows', 'size', 'status', 'error', 'finished_at'])
+    if report.status == InventoryReport.DONE:
+        discard_older(report)
+    publish(report.user_id, 'report', kind=report.kind, location=report.location, status=report.status,
+            data_version=report.data_version)
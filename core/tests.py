@@ -1,10 +1,57 @@
+import asyncio
+import gzip
 import json
-from django.test import TestCase, Client
-from django.urls import reverse
+import os
+import re
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.http import urlencode
 from django.contrib.auth import get_user_model
-from core.models import InventoryItem, Location, Supplier
+from asgiref.sync import sync_to_async
+from core.models import (
+    AnalyticsResult, ChangeLog, DataVersion, InventoryItem, InventorySummary, Location, StockMovement, StockRollup, Supplier,
+    InventoryReport, TrainedModel,
+)
+from core.events import publish
+from core.importers import ImportFileError, import_inventory_csv
+from core.instrumentation import histograms
+from core.ledger import bucket_start, rebuild_rollups
+from core.model_registry import get_model, local_models, train
+from core.pagination import encode_cursor, paginate_items
+from core.references import cached_ids, local_references, resolve_references
+from core.queryplans import explain, is_tenant_scoped, plan_problems
+from core.search import FTS_TABLE, ensure_search_index, owner_token
+from core.selectors import stock_alerts
+from core.summaries import apply_item_delta, dashboard_totals, verify_user_summaries
+from core.benchmarks import BenchmarkError, compare_results, regressions, run_benchmarks
+from core.datagen import DatasetError, flush_dataset, generate_dataset
+from core.anomalies import anomaly_scores, find_anomalies, group_statistics
 from core.views import detect_anomalies
 
+
+def clear_reference_cache(test):
+    # Cached name -> id entries outlive the test transaction, whose rows (and ids) roll back
+    caches['default'].clear()
+    local_references.clear()
+    test.addCleanup(local_references.clear)
+    test.addCleanup(caches['default'].clear)
+
+
 class AnomalyDetectionTests(TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(username='tester', password='pass')
@@ -28,6 +75,50 @@ class AnomalyDetectionTests(TestCase):
 
 
 
+class AnomalyEngineTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='anomalies', password='pass')
+        self.shelf = Location.objects.create(user=self.user, name='Shelf')
+        self.yard = Location.objects.create(user=self.user, name='Yard')
+        for i, qty in enumerate([5, 6, 7, 6, 60]):
+            InventoryItem.objects.create(user=self.user, name=f"S{i}", quantity=qty, price=1, location=self.shelf)
+        for i, qty in enumerate([500, 520, 480, 510, 505]):
+            InventoryItem.objects.create(user=self.user, name=f"Y{i}", quantity=qty, price=1, location=self.yard)
+
+    def test_group_statistics_match_naive(self):
+        values = [4, 1, 9, 3, 7, 7, 2, 8]
+        codes = [0, 1, 0, 1, 2, 0, 1, 2]
+        stats = group_statistics(values, codes)
+        for code in range(3):
+            group = sorted(v for v, c in zip(values, codes) if c == code)
+            mean = sum(group) / len(group)
+            middle = len(group) // 2
+            median = group[middle] if len(group) % 2 else (group[middle - 1] + group[middle]) / 2
+            self.assertAlmostEqual(stats['mean'][code], mean)
+            self.assertAlmostEqual(stats['std'][code], (sum((v - mean) ** 2 for v in group) / len(group)) ** 0.5)
+            self.assertAlmostEqual(stats['median'][code], median)
+
+    def test_small_groups_are_never_flagged(self):
+        scores = anomaly_scores([1, 1000, 5, 6, 7], [0, 0, 1, 1, 1], 'robust')
+        self.assertEqual(list(scores[:2]), [0.0, 0.0])
+
+    def test_grouping_finds_per_location_outliers(self):
+        items = InventoryItem.objects.filter(user=self.user)
+        # Globally, the yard stock dwarfs the shelf outlier
+        self.assertNotIn('S4', [a['name'] for a in find_anomalies(items, method='robust')])
+        grouped = find_anomalies(items, group_by='location', method='robust')
+        self.assertEqual([a['name'] for a in grouped], ['S4'])
+        self.assertEqual(grouped[0]['group'], 'Shelf')
+
+    def test_threshold_and_validation(self):
+        items = InventoryItem.objects.filter(user=self.user)
+        self.assertEqual(find_anomalies(items, group_by='location', method='robust', threshold=1000), [])
+        with self.assertRaises(ValueError):
+            find_anomalies(items, method='magic')
+        with self.assertRaises(ValueError):
+            find_anomalies(items, group_by='colour')
+
+
 class InventoryAPITests(TestCase):
     def setUp(self):
         self.user = get_user_model().objects.create_user(username='apiuser', password='pass')
@@ -83,3 +174,1413 @@ class PermissionsTests(TestCase):
 
         self.assertEqual(len(data['items']), 0)
 
+
+class InventorySummaryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='summaryuser', password='pass')
+        self.client.force_login(self.user)
+        self.location = Location.objects.create(name='Main', user=self.user)
+        self.supplier = Supplier.objects.create(name='ACME', user=self.user)
+
+    def test_api_writes_keep_summaries_in_sync(self):
+        self.client.post('/api/add_item/', data=json.dumps({
+            'name': 'Widget', 'quantity': 5, 'price': 10, 'supplier': 'ACME', 'location': 'Main'
+        }), content_type='application/json')
+        item = InventoryItem.objects.get(name='Widget')
+        self.client.post('/api/edit_item/', data=json.dumps({
+            'id': item.id, 'name': 'Widget', 'quantity': 8, 'price': 12, 'supplier': 'Other', 'location': 'Main'
+        }), content_type='application/json')
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price=1, location=self.location)
+
+        self.assertEqual(verify_user_summaries(self.user.id), [])
+        totals = dashboard_totals(self.user)
+        self.assertEqual(totals['total_items'], 2)
+        self.assertEqual(totals['total_value'], 13)
+        self.assertEqual(totals['location_data'], [{'location__name': 'Main', 'total': 11}])
+
+        self.client.post('/api/delete_item/', data=json.dumps({'id': item.id}), content_type='application/json')
+        self.assertEqual(verify_user_summaries(self.user.id), [])
+        self.assertEqual(dashboard_totals(self.user)['total_items'], 1)
+
+    def test_deleting_location_moves_totals_to_unassigned(self):
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price=1, location=self.location)
+        self.location.delete()
+        self.assertEqual(verify_user_summaries(self.user.id), [])
+        self.assertEqual(dashboard_totals(self.user)['location_data'], [{'location__name': None, 'total': 3}])
+
+    def test_rebuild_command_repairs_drift(self):
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price=1, supplier=self.supplier)
+        InventorySummary.objects.filter(user=self.user).update(total_quantity=99)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_summaries', '--verify', stdout=StringIO())
+        call_command('rebuild_summaries', '--verify', '--repair', stdout=StringIO())
+        self.assertEqual(verify_user_summaries(self.user.id), [])
+
+    def test_verify_reports_drift_in_unassigned_groups(self):
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price=1, supplier=self.supplier)
+        InventoryItem.objects.create(user=self.user, name='Nut', quantity=2, price=1,
+                                     location=self.location, supplier=self.supplier)
+        InventorySummary.objects.filter(user=self.user).update(total_quantity=99)
+        drift = verify_user_summaries(self.user.id)
+        self.assertEqual([key for key, _, _ in drift],
+                         [(None, self.supplier.id), (self.location.id, self.supplier.id)])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_summaries', '--verify', stdout=StringIO())
+
+    def test_groups_without_location_are_unique(self):
+        InventorySummary.objects.create(user=self.user, supplier=self.supplier, item_count=1)
+        with self.assertRaises(IntegrityError):
+            InventorySummary.objects.create(user=self.user, supplier=self.supplier, item_count=1)
+
+    def test_concurrent_create_adds_to_existing_group(self):
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price=1, supplier=self.supplier)
+        real_update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # The first update runs before the other writer's row exists
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            apply_item_delta(self.user.id, None, self.supplier.id, 1, 4, Decimal('2'))
+        row = InventorySummary.objects.get(user=self.user)
+        self.assertEqual((row.item_count, row.total_quantity, row.total_value), (2, 7, Decimal('3')))
+
+class FigureCacheTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='etaguser', password='pass')
+        self.client.force_login(self.user)
+        caches['figures'].clear()
+
+    def test_unchanged_dashboard_returns_304(self):
+        response = self.client.get(reverse('get_dashboard_data'))
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        response = self.client.get(reverse('get_dashboard_data'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_writes_bump_version_and_etag(self):
+        etag = self.client.get(reverse('get_dashboard_data'))['ETag']
+        location = Location.objects.create(name='Main', user=self.user)
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price=1, location=location)
+        self.assertEqual(DataVersion.objects.get(user=self.user).version, 2)
+
+        response = self.client.get(reverse('get_dashboard_data'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Bolt', response.json()['stock_chart_data'])
+
+    def test_location_filter_has_its_own_etag(self):
+        plain = self.client.get(reverse('get_dashboard_data'))['ETag']
+        filtered = self.client.get(reverse('get_dashboard_data'), {'location': 'Main'})['ETag']
+        self.assertNotEqual(plain, filtered)
+
+
+class ChartSeriesTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='seriesuser', password='pass')
+        self.client.force_login(self.user)
+        caches['figures'].clear()
+        main = Location.objects.create(name='Main', user=self.user)
+        acme = Supplier.objects.create(name='ACME', user=self.user)
+        for i in range(20):
+            InventoryItem.objects.create(user=self.user, name=f'Item {i:02}', quantity=i + 1, price=1,
+                                         location=main, supplier=acme)
+
+    def test_series_match_plotly_figures(self):
+        full = self.client.get(reverse('get_dashboard_data')).json()
+        compact = self.client.get(reverse('get_dashboard_data'), {'format': 'series'}).json()
+        self.assertNotIn('stock_chart_data', compact)
+
+        stock = json.loads(full['stock_chart_data'])['data'][0]
+        self.assertEqual(compact['charts']['stock'], {'labels': stock['x'], 'values': stock['y']})
+        self.assertEqual(compact['charts']['location'], {'labels': ['Main'], 'values': [210]})
+        forecast = compact['charts']['forecast']
+        self.assertEqual(len(forecast['series']), 20)
+        self.assertTrue(all(len(line['values']) == len(forecast['labels']) for line in forecast['series']))
+
+    def test_series_payload_is_smaller_and_has_its_own_etag(self):
+        full = self.client.get(reverse('get_dashboard_data'))
+        compact = self.client.get(reverse('get_dashboard_data'), {'format': 'series'})
+        self.assertLess(len(compact.content) * 5, len(full.content))
+        self.assertNotEqual(full['ETag'], compact['ETag'])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('get_dashboard_data'), {'format': 'svg'})
+        self.assertEqual(response.status_code, 400)
+
+class ItemPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='pageuser', password='pass')
+        self.client.force_login(self.user)
+        main = Location.objects.create(name='Main', user=self.user)
+        annex = Location.objects.create(name='Annex', user=self.user)
+        supplier = Supplier.objects.create(name='ACME', user=self.user)
+        for i in range(7):
+            InventoryItem.objects.create(user=self.user, name=f"Item {i % 3}", quantity=i, price=i,
+                                         location=main if i % 2 else annex, supplier=supplier)
+
+    def test_cursor_walks_every_item_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = paginate_items(self.user, fields=['id', 'name'], cursor=cursor, limit=3)
+            seen.extend(page['items'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        expected = list(InventoryItem.objects.filter(user=self.user).order_by('name', 'id').values('id', 'name'))
+        self.assertEqual(seen, expected)
+
+    def test_projection_and_filters(self):
+        response = self.client.get(reverse('items_api'), {
+            'fields': 'name,location,supplier', 'location': 'Main', 'order': '-quantity', 'limit': 2
+        })
+        data = response.json()
+        self.assertEqual(data['items'], [
+            {'name': 'Item 2', 'location': 'Main', 'supplier': 'ACME'},
+            {'name': 'Item 0', 'location': 'Main', 'supplier': 'ACME'},
+        ])
+        self.assertIsNotNone(data['next_cursor'])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get(reverse('items_api'), {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('items_api'), {'fields': 'password'}).status_code, 400)
+        # Well-formed cursors whose values do not fit the ordering
+        for order, value, pk in [('quantity', 'abc', 'zz'), ('name', 3, 1), ('quantity', 3, 'zz'),
+                                 ('last_updated', 5, 1), ('last_updated', '2026-13-45T00:00:00', 1)]:
+            cursor = encode_cursor(value, pk)
+            response = self.client.get(reverse('items_api'), {'cursor': cursor, 'order': order})
+            self.assertEqual(response.status_code, 400, (order, value, pk))
+
+    def test_dashboard_returns_first_page_only(self):
+        data = self.client.get(reverse('get_dashboard_data')).json()
+        self.assertEqual(data['total_items'], 7)
+        self.assertEqual(len(data['items']), 7)
+        self.assertIsNone(data['next_cursor'])
+
+class ItemSearchTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='searchuser', password='pass')
+        self.client.force_login(self.user)
+        self.main = Location.objects.create(name='Main Depot', user=self.user)
+        annex = Location.objects.create(name='Annex', user=self.user)
+        self.acme = Supplier.objects.create(name='Acme Fasteners', user=self.user)
+        for name, location in [('Screw', self.main), ('Screwdriver', annex), ('Wood screw', self.main),
+                               ('Hex bolt', annex), ('Washer', self.main)]:
+            InventoryItem.objects.create(user=self.user, name=name, quantity=1, price=1, location=location,
+                                         supplier=self.acme if name == 'Hex bolt' else None)
+        other = get_user_model().objects.create_user(username='searchother', password='pass')
+        InventoryItem.objects.create(user=other, name='Screw', quantity=1, price=1)
+
+    def names(self, q, **params):
+        response = self.client.get(reverse('search_items_api'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['items']]
+
+    def test_ranks_exact_then_prefix_then_word_then_fuzzy(self):
+        self.assertEqual(self.names('screw'), ['Screw', 'Screwdriver', 'Wood screw'])
+        self.assertEqual(self.names('scrw')[0], 'Screw')
+        self.assertEqual(self.names('wa'), ['Washer'])
+        self.assertEqual(self.names('SCREWDRIVR')[0], 'Screwdriver')
+
+    def test_matches_supplier_and_location_and_filters(self):
+        self.assertEqual(self.names('acme'), ['Hex bolt'])
+        self.assertEqual(self.names('depot washer')[0], 'Washer')
+        self.assertEqual(self.names('screw', location='Main Depot'), ['Screw', 'Wood screw'])
+        self.assertEqual(self.names('bolt', supplier='Acme Fasteners', fields='name,supplier'), ['Hex bolt'])
+
+    def test_candidates_are_scoped_before_the_cap(self):
+        InventoryItem.objects.bulk_create([
+            InventoryItem(user=self.user, name=f'Screw {i}', quantity=1, price=1, location=self.main) for i in range(3)
+        ])
+        with mock.patch('core.search.MAX_SEARCH_CANDIDATES', 2):
+            self.assertEqual(self.names('screw', location='Annex'), ['Screwdriver'])
+
+    def test_index_matches_within_the_owner(self):
+        # Owner tokens are phrases: user 1 must not match user 11's or 21's items
+        get_user_model().objects.bulk_create([get_user_model()(username=f'u{i}') for i in range(25)])
+        for user in get_user_model().objects.exclude(pk=self.user.pk):
+            InventoryItem.objects.create(user=user, name='Screw', quantity=1, price=1)
+        for user in get_user_model().objects.all():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                               [f'owner : "{owner_token(user.pk)}"'])
+                self.assertEqual(cursor.fetchone()[0], InventoryItem.objects.filter(user=user).count())
+
+    def test_index_follows_writes(self):
+        item = InventoryItem.objects.get(user=self.user, name='Washer')
+        item.name = 'Spring washer'
+        item.save()
+        self.assertEqual(self.names('spring'), ['Spring washer'])
+        self.main.name = 'North yard'
+        self.main.save()
+        self.assertIn('Spring washer', self.names('north yard'))
+        item.delete()
+        self.assertEqual(self.names('spring'), [])
+        InventoryItem.objects.bulk_create([InventoryItem(user=self.user, name='Rivet', quantity=1, price=1)])
+        self.assertEqual(self.names('rivet'), ['Rivet'])
+
+    def test_missing_triggers_rebuild_the_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER core_itemsearch_insert')
+        InventoryItem.objects.create(user=self.user, name='Anchor', quantity=1, price=1)
+        ensure_search_index(connection)
+        self.assertEqual(self.names('anchor'), ['Anchor'])
+
+    def test_pages_and_bad_input(self):
+        first = self.client.get(reverse('search_items_api'), {'q': 'screw', 'limit': 2}).json()
+        self.assertEqual(len(first['items']), 2)
+        second = self.client.get(reverse('search_items_api'), {'q': 'screw', 'cursor': first['next_cursor']}).json()
+        self.assertEqual([i['name'] for i in second['items']], ['Wood screw'])
+        self.assertIsNone(second['next_cursor'])
+        for params in [{}, {'q': '  '}, {'q': 'x' * 101}, {'q': 'screw', 'cursor': 'garbage'}, {'q': 'a', 'fields': 'user'}]:
+            self.assertEqual(self.client.get(reverse('search_items_api'), params).status_code, 400, params)
+
+    def test_computed_fields(self):
+        for q in ('was', 'wa'):  # the trigram and the prefix paths
+            response = self.client.get(reverse('search_items_api'), {'q': q, 'fields': 'name,suggested_quantity'})
+            item = response.json()['items'][0]
+            self.assertEqual((item['name'], item['suggested_quantity']), ('Washer', 99))
+
+
+class StockLevelTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='leveluser', password='pass')
+        self.client.force_login(self.user)
+        self.main = Location.objects.create(name='Main', user=self.user)
+        for name, quantity, reorder_point, target_level in [
+            ('Bolt', 15, 20, 60), ('Nut', 3, 10, 100), ('Washer', 0, 5, 40), ('Screw', 9, 5, 100), ('Pin', 4, 4, 10),
+        ]:
+            InventoryItem.objects.create(user=self.user, name=name, quantity=quantity, price=1, location=self.main,
+                                         reorder_point=reorder_point, target_level=target_level)
+
+    def test_low_stock_uses_each_items_reorder_point(self):
+        page = self.client.get(reverse('items_api'), {
+            'low_stock': '1', 'order': 'quantity', 'fields': 'name,quantity,suggested_quantity',
+        }).json()
+        self.assertEqual(page['items'], [
+            {'name': 'Washer', 'quantity': 0, 'suggested_quantity': 40},
+            {'name': 'Nut', 'quantity': 3, 'suggested_quantity': 97},
+            {'name': 'Bolt', 'quantity': 15, 'suggested_quantity': 45},
+        ])
+        low_stock, restock, cursor = stock_alerts(self.user)
+        self.assertEqual([i['name'] for i in low_stock], ['Washer', 'Nut', 'Bolt'])
+        self.assertEqual(restock[0], {'name': 'Washer', 'suggested_quantity': 40})
+        self.assertIsNone(cursor)
+
+    def test_defaults_and_item_apis(self):
+        post = {'content_type': 'application/json'}
+        self.client.post(reverse('add_item'), json.dumps({
+            'name': 'Rivet', 'quantity': 1, 'price': 1, 'location': 'Main', 'supplier': 'Acme',
+        }), **post)
+        rivet = InventoryItem.objects.get(user=self.user, name='Rivet')
+        self.assertEqual((rivet.reorder_point, rivet.target_level), (10, 100))
+        self.client.post(reverse('edit_item_api'), json.dumps({
+            'id': rivet.id, 'name': 'Rivet', 'quantity': 1, 'price': 1, 'location': 'Main', 'supplier': 'Acme',
+            'reorder_point': 0, 'target_level': 50,
+        }), **post)
+        data = self.client.get(reverse('get_item_api', args=[rivet.id])).json()
+        self.assertEqual((data['reorder_point'], data['target_level']), (0, 50))
+
+        for levels in [{'reorder_point': -5}, {'target_level': 'lots'}, {'reorder_point': 2 ** 31}]:
+            for url, extra in [('add_item', {}), ('edit_item_api', {'id': rivet.id})]:
+                response = self.client.post(reverse(url), json.dumps({
+                    'name': 'Rivet', 'quantity': 1, 'price': 1, 'location': 'Main', 'supplier': 'Acme',
+                    **extra, **levels,
+                }), **post)
+                self.assertEqual(response.status_code, 400, (url, levels))
+        self.assertEqual(InventoryItem.objects.filter(user=self.user, name='Rivet').count(), 1)
+
+        result = self.client.post(reverse('batch_items_api'), json.dumps({'operations': [
+            {'op': 'create', 'name': 'Clip', 'quantity': 1, 'price': 1, 'supplier': '', 'location': '',
+             'reorder_point': 2},
+            {'op': 'update', 'id': rivet.id, 'target_level': -1},
+        ]}), **post).json()
+        self.assertEqual([r['status'] for r in result['results']], ['success', 'error'])
+        clip = InventoryItem.objects.get(user=self.user, name='Clip')
+        self.assertEqual((clip.reorder_point, clip.target_level), (2, 100))
+
+    def test_low_stock_reads_the_partial_index(self):
+        with CaptureQueriesContext(connection) as ctx:
+            stock_alerts(self.user)
+        [sql] = [q['sql'] for q in ctx.captured_queries]
+        plan = ' '.join(map(str, explain(sql)))
+        self.assertIn('item_user_low_stock_idx', plan)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='exportuser', password='pass')
+        self.client.force_login(self.user)
+        main = Location.objects.create(name='Main', user=self.user)
+        supplier = Supplier.objects.create(name='ACME', user=self.user)
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=3, price='1.50', location=main, supplier=supplier)
+        InventoryItem.objects.create(user=self.user, name='Nut', quantity=7, price=2)
+
+    def test_csv_export_streams_joined_rows(self):
+        with self.assertNumQueries(3):  # session, user, one joined item query
+            response = self.client.get(reverse('export_inventory'))
+            body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.splitlines(), [
+            'Name,Quantity,Price,Supplier,Location',
+            'Bolt,3,1.50,ACME,Main',
+            'Nut,7,2.00,,',
+        ])
+
+    def test_gzipped_ndjson_with_columns_and_filter(self):
+        response = self.client.get(reverse('export_inventory'), {
+            'format': 'ndjson', 'compress': 'gzip', 'columns': 'name,price', 'location': 'Main'
+        })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('inventory.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'name': 'Bolt', 'price': 1.5}])
+
+    def test_unknown_column_is_rejected(self):
+        response = self.client.get(reverse('export_inventory'), {'columns': 'user__password'})
+        self.assertEqual(response.status_code, 400)
+
+class BulkImportTests(TestCase):
+    CSV = (
+        "name,quantity,price,supplier,location\n"
+        "Maize Flour,100,120.50,AgriCorp,Nairobi\n"
+        "Sugar,50,80.00,SweetDeal,Mombasa\n"
+        "Broken,lots,1.00,AgriCorp,Nairobi\n"
+        "Rice,200,150.75,AgriCorp,\n"
+    )
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='importer', password='pass')
+        Supplier.objects.create(name='AgriCorp', user=self.user)
+
+    def test_import_reuses_and_creates_references_and_reports_rejects(self):
+        stats = import_inventory_csv(self.user, StringIO(self.CSV), chunk_size=2)
+        self.assertEqual((stats['rows'], stats['imported'], stats['rejected']), (4, 3, 1))
+        self.assertEqual(stats['rejects'], [{'line': 4, 'error': "invalid quantity 'lots'"}])
+        self.assertEqual(Supplier.objects.filter(user=self.user, name='AgriCorp').count(), 1)
+        self.assertEqual(set(Location.objects.filter(user=self.user).values_list('name', flat=True)),
+                         {'Nairobi', 'Mombasa'})
+        self.assertIsNone(InventoryItem.objects.get(name='Rice').location)
+        self.assertEqual(verify_user_summaries(self.user.id), [])
+
+    def test_command_and_upload_endpoint(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.CSV)
+        self.addCleanup(os.remove, f.name)
+        out = StringIO()
+        call_command('import_inventory', f.name, '--user', 'importer', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 3 of 4 row(s)', out.getvalue())
+
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('items.csv', self.CSV.encode(), content_type='text/csv')
+        response = self.client.post(reverse('import_inventory_api'), {'file': upload})
+        self.assertEqual(response.json()['imported'], 3)
+        self.assertEqual(InventoryItem.objects.filter(user=self.user).count(), 6)
+
+    def test_missing_columns_are_rejected(self):
+        with self.assertRaises(ImportFileError):
+            import_inventory_csv(self.user, StringIO("name,quantity\nBolt,1\n"))
+
+    def test_out_of_range_quantities_are_rejected(self):
+        rows = "name,quantity,price,supplier,location\nHuge,2147483648,1,,\nOwed,-3,1,,\nMax,2147483647,1,,\n"
+        stats = import_inventory_csv(self.user, StringIO(rows))
+        self.assertEqual((stats['imported'], stats['rejected']), (1, 2))
+        self.assertEqual([r['error'] for r in stats['rejects']],
+                         ["invalid quantity '2147483648'", 'quantity cannot be negative'])
+
+class BatchItemTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='batchuser', password='pass')
+        self.client.force_login(self.user)
+        self.keep = InventoryItem.objects.create(user=self.user, name='Keep', quantity=1, price=1)
+        self.gone = InventoryItem.objects.create(user=self.user, name='Gone', quantity=2, price=2)
+        other = get_user_model().objects.create_user(username='other', password='pass')
+        self.foreign = InventoryItem.objects.create(user=other, name='Foreign', quantity=1, price=1)
+
+    def post(self, operations):
+        return self.client.post(reverse('batch_items_api'), data=json.dumps({'operations': operations}),
+                                content_type='application/json').json()
+
+    def test_wrong_value_types_fail_only_their_operation(self):
+        data = self.post([
+            {'op': 'create', 'name': 123, 'quantity': 1, 'price': 1},
+            {'op': 'update', 'id': self.keep.id, 'location': ['Main']},
+            {'op': 'create', 'name': 'Fine', 'quantity': 1, 'price': 1},
+        ])
+        self.assertEqual((data['applied'], data['failed']), (1, 2))
+        self.assertEqual([r.get('message') for r in data['results'][:2]],
+                         ['name must be a string', 'location must be a string'])
+
+    def test_mixed_batch_applies_valid_operations_and_reports_failures(self):
+        data = self.post([
+            {'op': 'create', 'name': 'New', 'quantity': 4, 'price': 2.5, 'supplier': 'ACME', 'location': 'Main'},
+            {'op': 'create', 'name': 'Bad', 'quantity': 'x', 'price': 1},
+            {'op': 'update', 'id': self.keep.id, 'quantity': 9, 'location': 'Main'},
+            {'op': 'delete', 'id': self.gone.id},
+            {'op': 'delete', 'id': self.foreign.id},
+            {'op': 'explode'},
+        ])
+        self.assertEqual((data['status'], data['applied'], data['failed']), ('partial', 3, 3))
+        self.assertEqual([r['status'] for r in data['results']],
+                         ['success', 'error', 'success', 'success', 'error', 'error'])
+        self.assertEqual(data['results'][4]['message'], 'Item not found')
+
+        self.keep.refresh_from_db()
+        self.assertEqual((self.keep.quantity, self.keep.location.name), (9, 'Main'))
+        self.assertEqual(InventoryItem.objects.get(id=data['results'][0]['id']).location_id, self.keep.location_id)
+        self.assertFalse(InventoryItem.objects.filter(id=self.gone.id).exists())
+        self.assertTrue(InventoryItem.objects.filter(id=self.foreign.id).exists())
+        self.assertEqual(Location.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(verify_user_summaries(self.user.id), [])
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def creates(n):
+            return [{'op': 'create', 'name': f'Item {i}', 'quantity': i, 'price': 1, 'location': 'Main'}
+                    for i in range(n)]
+        self.post(creates(1))  # warm up references and data version
+        with CaptureQueriesContext(connection) as small:
+            self.post(creates(5))
+        with CaptureQueriesContext(connection) as large:
+            self.post(creates(40))  # stays under SQLite bulk insert batch limits
+        self.assertEqual(len(small), len(large))
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='ledgeruser', password='pass')
+        self.client.force_login(self.user)
+        caches['figures'].clear()
+
+    def test_quantity_changes_are_recorded_and_rolled_up(self):
+        item = InventoryItem.objects.create(user=self.user, name='Bolt', quantity=10, price=1)
+        item.quantity = 4
+        item.save()
+        item.price = 2
+        item.save()  # no quantity change, no movement
+        self.client.post(reverse('batch_items_api'), data=json.dumps({'operations': [
+            {'op': 'update', 'id': item.id, 'quantity': 6},
+        ]}), content_type='application/json')
+        item.refresh_from_db()
+        item.delete()
+
+        self.assertEqual(list(StockMovement.objects.order_by('id').values_list('change', 'quantity_after')),
+                         [(10, 10), (-6, 4), (2, 6), (-6, 0)])
+        for granularity in (StockRollup.HOUR, StockRollup.DAY):
+            rollup = StockRollup.objects.get(user=self.user, granularity=granularity)
+            self.assertEqual((rollup.inbound, rollup.outbound, rollup.movements, rollup.closing_quantity),
+                             (12, 12, 4, 0))
+
+    def test_rebuild_matches_incremental_rollups_and_compaction_honours_retention(self):
+        for i in range(3):
+            InventoryItem.objects.create(user=self.user, name=f'Item {i}', quantity=i + 1, price=1)
+        incremental = list(StockRollup.objects.order_by('granularity', 'item_id').values_list(
+            'granularity', 'item_id', 'inbound', 'closing_quantity'))
+        rebuild_rollups(timezone.now() - timedelta(days=1))
+        rebuilt = list(StockRollup.objects.order_by('granularity', 'item_id').values_list(
+            'granularity', 'item_id', 'inbound', 'closing_quantity'))
+        self.assertEqual(incremental, rebuilt)
+
+        old = timezone.now() - timedelta(days=365)
+        StockMovement.objects.update(created_at=old)
+        StockRollup.objects.filter(granularity=StockRollup.HOUR).update(bucket_start=old)
+        call_command('compact_stock_history', stdout=StringIO())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(StockRollup.objects.filter(granularity=StockRollup.HOUR).exists())
+        self.assertEqual(StockRollup.objects.filter(granularity=StockRollup.DAY).count(), 3)
+
+    def test_dashboard_forecast_reads_rollups(self):
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=10, price=1)
+        data = self.client.get(reverse('get_dashboard_data')).json()
+        forecast = json.loads(data['forecast_chart_data'])
+        self.assertEqual([trace['name'] for trace in forecast['data']], ['Bolt'])
+
+class BackgroundAnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='jobuser', password='pass')
+        self.client.force_login(self.user)
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=10, price=1)
+
+    def test_insights_queues_job_and_renders_its_result(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse('insights'))
+        self.assertEqual(response.status_code, 200)
+        job = AnalyticsResult.objects.get(user=self.user, kind='insights')
+        self.assertEqual(job.status, AnalyticsResult.DONE)
+        self.assertEqual(job.payload['series']['stock_trend'], {'labels': ['Bolt'], 'values': [10]})
+
+        response = self.client.get(reverse('insights'))
+        self.assertContains(response, 'Demand Forecast')
+        self.assertEqual(AnalyticsResult.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.client.get(reverse('insights'), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_status_reports_stale_result_until_new_version_finishes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('insights_status_api'))
+        InventoryItem.objects.create(user=self.user, name='Nut', quantity=1, price=1)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            status = self.client.get(reverse('insights_status_api')).json()
+        self.assertEqual((status['status'], status['fresh']), ('pending', False))
+        for callback in callbacks:
+            callback()
+        status = self.client.get(reverse('insights_status_api')).json()
+        self.assertEqual((status['status'], status['fresh']), ('done', True))
+
+    def test_post_forces_a_rerun(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('insights_status_api'))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            status = self.client.post(reverse('insights_status_api')).json()
+        self.assertEqual(status['status'], 'pending')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_failed_job_is_not_requeued_by_polling(self):
+        with mock.patch('core.analytics.compute_insights', side_effect=RuntimeError('boom')), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('insights_status_api'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            status = self.client.get(reverse('insights_status_api')).json()
+            self.client.get(reverse('insights'))
+        self.assertEqual((status['status'], status['error'], callbacks), ('failed', 'boom', []))
+
+        # After the backoff, or on an explicit refresh, it runs again
+        AnalyticsResult.objects.update(finished_at=timezone.now() - timedelta(seconds=3600))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.client.get(reverse('insights_status_api')).json()['status'], 'pending')
+        self.assertEqual(len(callbacks), 1)
+        AnalyticsResult.objects.update(status=AnalyticsResult.FAILED, finished_at=timezone.now())
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(self.client.post(reverse('insights_status_api')).json()['status'], 'pending')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_data_endpoint_serves_the_latest_result(self):
+        InventoryItem.objects.create(user=self.user, name='Nut', quantity=3, price=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            data = self.client.get(reverse('insights_data_api')).json()
+        self.assertEqual(data['series'], {})
+        self.assertEqual(data['low_stock'], [{'name': 'Nut', 'quantity': 3, 'location': 'N/A'}])
+        self.assertEqual(data['restock_suggestions'], [{'name': 'Nut', 'suggested_quantity': 97}])
+
+        response = self.client.get(reverse('insights_data_api'))
+        self.assertTrue(response.json()['analytics']['fresh'])
+        self.assertEqual(response.json()['series']['stock_trend']['labels'], ['Bolt', 'Nut'])
+        self.assertEqual(self.client.get(reverse('insights_data_api'), HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         304)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='feeduser', password='pass')
+        self.client.force_login(self.user)
+        self.main = Location.objects.create(name='Main', user=self.user)
+        self.bolt = InventoryItem.objects.create(user=self.user, name='Bolt', quantity=5, price=1, location=self.main)
+
+    def feed(self, cursor, **params):
+        return self.client.get(reverse('changes_api'), {'cursor': cursor, **params})
+
+    def test_head_then_only_later_changes(self):
+        head = self.client.get(reverse('changes_api')).json()
+        self.assertEqual(head['changes'], [])
+        self.assertEqual(self.feed(head['cursor']).json()['changes'], [])
+
+        self.bolt.quantity = 7
+        self.bolt.save()
+        data = self.feed(head['cursor']).json()
+        self.assertEqual(len(data['changes']), 1)
+        change = data['changes'][0]
+        self.assertEqual((change['type'], change['id'], change['action']), ('item', self.bolt.id, 'upsert'))
+        self.assertEqual((change['data']['quantity'], change['data']['location']), (7, 'Main'))
+        self.assertEqual(self.feed(data['cursor']).json()['changes'], [])
+
+    def test_deletes_are_tombstones_and_repeats_collapse(self):
+        cursor = self.client.get(reverse('changes_api')).json()['cursor']
+        location_id, item_id = self.main.id, self.bolt.id
+        self.bolt.quantity = 8
+        self.bolt.save()
+        self.main.delete()
+        self.bolt.refresh_from_db()
+        self.bolt.delete()
+        changes = self.feed(cursor).json()['changes']
+        self.assertEqual(changes, [
+            {'type': 'location', 'id': location_id, 'action': 'delete'},
+            {'type': 'item', 'id': item_id, 'action': 'delete'},
+        ])
+
+    def test_reference_rename_updates_its_items(self):
+        cursor = self.client.get(reverse('changes_api')).json()['cursor']
+        self.main.name = 'Warehouse'
+        self.main.save()
+        changes = self.feed(cursor).json()['changes']
+        self.assertEqual([(c['type'], c['id']) for c in changes], [('location', self.main.id), ('item', self.bolt.id)])
+        self.assertEqual(changes[1]['data']['location'], 'Warehouse')
+
+    def test_bulk_writes_are_paged_and_bounded(self):
+        cursor = self.client.get(reverse('changes_api')).json()['cursor']
+        ops = [{'op': 'create', 'name': f'N{i}', 'quantity': 1, 'price': 1, 'supplier': 'ACME', 'location': ''}
+               for i in range(5)] + [{'op': 'delete', 'id': self.bolt.id}]
+        self.client.post(reverse('batch_items_api'), data=json.dumps({'operations': ops}),
+                         content_type='application/json')
+        seen = []
+        while True:
+            data = self.feed(cursor, limit=3).json()
+            self.assertLessEqual(len(data['changes']), 3)
+            seen += [(c['type'], c['action']) for c in data['changes']]
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(seen.count(('item', 'upsert')), 5)
+        self.assertIn(('supplier', 'upsert'), seen)
+        self.assertIn(('item', 'delete'), seen)
+
+    def test_other_users_changes_are_invisible_and_pruned_cursors_expire(self):
+        other = get_user_model().objects.create_user(username='other', password='pass')
+        InventoryItem.objects.create(user=other, name='Nut', quantity=1, price=1)
+        names = [c['data']['name'] for c in self.feed(0).json()['changes']]
+        self.assertEqual(names, ['Main', 'Bolt'])
+
+        ChangeLog.objects.update(created_at=timezone.now() - timedelta(days=365))
+        call_command('prune_changes', stdout=StringIO())
+        self.assertEqual(ChangeLog.objects.count(), 1)
+        self.assertEqual(self.feed(0).status_code, 410)
+        self.assertEqual(self.feed('abc').status_code, 400)
+
+
+    def test_items_of_other_tenants_never_reach_the_feed(self):
+        # Rows from before 0014 could point at another tenant's location
+        other = get_user_model().objects.create_user(username='other', password='pass')
+        secret = InventoryItem.objects.create(user=other, name='B secret item', quantity=7, price=99,
+                                              location=self.main)
+        self.main.delete()
+        self.assertFalse(ChangeLog.objects.filter(user=self.user, kind='item', object_id=secret.id).exists())
+
+        # Even a logged id of theirs comes back as a bare tombstone
+        ChangeLog.objects.create(user=self.user, kind='item', object_id=secret.id)
+        changes = self.feed(0).json()['changes']
+        self.assertNotIn('B secret item', json.dumps(changes))
+        self.assertIn({'type': 'item', 'id': secret.id, 'action': 'delete'}, changes)
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='eventuser', password='pass')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    async def read_event(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), 5)
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    async def test_writes_notify_open_streams_once_per_burst(self):
+        response = await self.async_client.get(reverse('events_api'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertIn('retry:', await self.read_event(stream))
+
+        def write_burst():
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    InventoryItem.objects.create(user=self.user, name=f'Bolt {i}', quantity=1, price=1)
+        await sync_to_async(write_burst)()
+
+        event = await self.read_event(stream)
+        self.assertTrue(event.startswith('event: inventory\n'))
+        publish(self.user.id + 1, 'inventory')  # someone else's data
+        publish(self.user.id, 'analytics', kind='insights', status='done')
+        self.assertTrue((await self.read_event(stream)).startswith('event: analytics\n'))
+        await stream.aclose()
+
+    def test_stream_needs_asgi(self):
+        self.assertEqual(self.client.get(reverse('events_api')).status_code, 501)
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class QueryPlanTests(TestCase):
+    # Every tenant-scoped query a view issues must reach its rows through an index
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='planuser', password='pass')
+        other = get_user_model().objects.create_user(username='planother', password='pass')
+        for owner in (cls.user, other):
+            locations = [Location.objects.create(user=owner, name=f'Loc {i}') for i in range(5)]
+            suppliers = [Supplier.objects.create(user=owner, name=f'Sup {i}') for i in range(5)]
+            for i in range(60):
+                InventoryItem.objects.create(user=owner, name=f'Item {i:03}', quantity=i, price=1,
+                                             location=locations[i % 5], supplier=suppliers[i % 5])
+        cls.location = Location.objects.filter(user=cls.user).first()
+        cls.supplier = Supplier.objects.filter(user=cls.user).first()
+        cls.item = InventoryItem.objects.filter(user=cls.user).first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        caches['figures'].clear()
+        clear_reference_cache(self)
+
+    def assertIndexedQueries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.client, method)(url, **kwargs)
+                if response.streaming:
+                    # Streamed exports query while the body is consumed
+                    b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+        tenant_queries = [q['sql'] for q in ctx.captured_queries if is_tenant_scoped(q['sql'])]
+        self.assertTrue(tenant_queries, url)
+        problems = [(sql, found) for sql in tenant_queries if (found := plan_problems(sql))]
+        self.assertEqual(problems, [], f"{method.upper()} {url} has unindexed tenant queries")
+
+    def test_read_views(self):
+        cursor = paginate_items(self.user, limit=5)['next_cursor']
+        for url in [
+            reverse('dashboard'),
+            reverse('get_dashboard_data'),
+            reverse('get_dashboard_data') + '?format=series&location=Loc%200',
+            reverse('items_api') + '?limit=5',
+            reverse('items_api') + f'?limit=5&cursor={cursor}',
+            reverse('items_api') + '?order=-quantity&limit=5',
+            reverse('items_api') + '?low_stock=1&order=quantity&limit=5',
+            reverse('items_api') + '?order=last_updated&limit=5&location=Loc%201&supplier=Sup%201',
+            reverse('search_items_api') + '?q=item',
+            reverse('search_items_api') + '?q=it&location=Loc%201',
+            reverse('changes_api') + '?cursor=0',
+            reverse('get_item_api', args=[self.item.id]),
+            reverse('locations'),
+            reverse('suppliers'),
+            reverse('insights'),
+            reverse('insights_data_api'),
+            reverse('insights_status_api'),
+            reverse('export_inventory') + '?location=Loc%202',
+        ]:
+            with self.subTest(url=url):
+                self.assertIndexedQueries('get', url)
+
+    def test_write_views(self):
+        post = {'content_type': 'application/json'}
+        item = {'name': 'Bolt', 'quantity': 1, 'price': 1, 'supplier': 'Sup 1', 'location': 'Loc 1'}
+        self.assertIndexedQueries('post', reverse('add_item'), data=json.dumps(item), **post)
+        self.assertIndexedQueries('post', reverse('edit_item_api'),
+                                  data=json.dumps({**item, 'id': self.item.id, 'location': 'Loc 9'}), **post)
+        self.assertIndexedQueries('post', reverse('add_location_api'), data=json.dumps({'name': 'Loc 7'}), **post)
+        self.assertIndexedQueries('post', reverse('add_supplier_api'), data=json.dumps({'name': 'Sup 7'}), **post)
+        ops = [{'op': 'create', **item}, {'op': 'update', 'id': self.item.id, 'quantity': 3}]
+        self.assertIndexedQueries('post', reverse('batch_items_api'), data=json.dumps({'operations': ops}), **post)
+        self.assertIndexedQueries('post', reverse('delete_item_api'), data=json.dumps({'id': self.item.id}), **post)
+        self.assertIndexedQueries('post', reverse('delete_location', args=[self.location.id]))
+
+
+class AsyncDataEndpointTests(TransactionTestCase):
+    # Outside a test transaction, so the async views really fan their reads out over the pool
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='asyncuser', password='pass')
+        for i in range(4):
+            location = Location.objects.create(user=self.user, name=f'Loc {i}')
+            InventoryItem.objects.create(user=self.user, name=f'Item {i}', quantity=i * 5, price=2, location=location)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        caches['figures'].clear()
+
+    def dashboard(self, **params):
+        caches['figures'].clear()
+        return self.client.get(reverse('get_dashboard_data'), params).json()
+
+    def test_concurrent_reads_match_sequential(self):
+        for params in [{}, {'format': 'series'}, {'location': 'Loc 1'}]:
+            with self.subTest(**params):
+                concurrent = self.dashboard(**params)
+                with override_settings(ASYNC_QUERY_WORKERS=1):
+                    sequential = self.dashboard(**params)
+                self.assertEqual(concurrent, sequential)
+                self.assertEqual(concurrent['total_items'], 1 if params.get('location') else 4)
+
+    async def test_async_client(self):
+        response = await self.async_client.get(reverse('get_dashboard_data'), {'format': 'series'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['charts']['stock']['labels'], [f'Item {i}' for i in range(4)])
+        # The async client builds the middleware chain as the ASGI handler does
+        queries = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing'])
+        self.assertGreater(int(queries.group(1)), 0)
+        cached = await self.async_client.get(reverse('get_dashboard_data'), {'format': 'series'},
+                                             headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+        data = (await self.async_client.get(reverse('insights_data_api'))).json()
+        self.assertEqual([item['name'] for item in data['low_stock']], ['Item 0', 'Item 1'])
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class QueryBudgetTests(TestCase):
+    # Each view's declared query_budget must hold exactly, whatever the size of the catalogue
+    SIZES = [(2, 6), (12, 150)]
+
+    def seed(self, locations, items):
+        user = get_user_model().objects.create_user(username=f'budget{locations}x{items}', password='pass')
+        places = [Location.objects.create(user=user, name=f'Loc {i}') for i in range(locations)]
+        suppliers = [Supplier.objects.create(user=user, name=f'Sup {i}') for i in range(locations)]
+        for i in range(items):
+            InventoryItem.objects.create(user=user, name=f'Item {i:03}', quantity=i % 60, price=1,
+                                         location=places[i % locations], supplier=suppliers[i % locations])
+        # Budgets are for steady state, not the request that first creates the version row
+        DataVersion.objects.get_or_create(user=user)
+        self.client.force_login(user)
+        caches['figures'].clear()
+        clear_reference_cache(self)
+        return user, InventoryItem.objects.filter(user=user).first()
+
+    def assertWithinBudget(self, method, url, **kwargs):
+        budget = resolve(url.split('?')[0]).func.query_budget
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+
+    def test_read_views_keep_a_constant_query_count(self):
+        for locations, items in self.SIZES:
+            user, item = self.seed(locations, items)
+            with self.subTest(locations=locations, items=items):
+                for url in [
+                    reverse('dashboard'),
+                    reverse('get_dashboard_data'),
+                    reverse('get_dashboard_data') + '?format=series&location=Loc%201',
+                    reverse('items_api'),
+                    reverse('search_items_api') + '?q=item%2001',
+                    reverse('get_item_api', args=[item.id]),
+                    reverse('changes_api') + '?cursor=0',
+                    reverse('locations'),
+                    reverse('suppliers'),
+                    reverse('insights'),
+                    reverse('insights_data_api'),
+                    reverse('insights_status_api'),
+                    reverse('report_status_api', args=['valuation']),
+                    reverse('export_inventory'),
+                ]:
+                    self.assertWithinBudget('get', url)
+
+    def test_locations_page_lists_items_without_per_location_queries(self):
+        user, _ = self.seed(3, 9)
+        response = self.client.get(reverse('locations'))
+        by_name = {location.name: location for location in response.context['locations']}
+        self.assertEqual(by_name['Loc 0'].item_count, 3)
+        self.assertEqual([i.name for i in by_name['Loc 0'].items_list], ['Item 000', 'Item 003', 'Item 006'])
+
+
+class ReferenceNameMigrationTests(TransactionTestCase):
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('core', target)])
+        return executor.loader.project_state([('core', target)]).apps
+
+    def tearDown(self):
+        self.migrate(MigrationLoader(connection).graph.leaf_nodes('core')[0][1])
+
+    def test_duplicate_names_are_merged_into_the_oldest(self):
+        old_apps = self.migrate('0006_changelog')
+        User = old_apps.get_model('auth', 'User')
+        Location = old_apps.get_model('core', 'Location')
+        InventoryItem = old_apps.get_model('core', 'InventoryItem')
+        user = User.objects.create(username='dupes')
+        other = User.objects.create(username='dupes2')
+        keep = Location.objects.create(user=user, name='Main')
+        copy = Location.objects.create(user=user, name='Main')
+        theirs = Location.objects.create(user=other, name='Main')
+        InventoryItem.objects.create(user=user, name='Bolt', quantity=1, price=1, location=copy)
+
+        self.migrate('0008_reference_name_constraints_item_indexes')
+        self.assertEqual(sorted(Location.objects.values_list('id', flat=True)), [keep.id, theirs.id])
+        self.assertEqual(InventoryItem.objects.get(name='Bolt').location_id, keep.id)
+        self.assertTrue(ChangeLog.objects.filter(kind='location', object_id=copy.id, action='delete').exists())
+        with self.assertRaises(IntegrityError):
+            Location.objects.create(user=user, name='Main')
+
+    def test_items_pointing_at_another_tenants_reference_are_repointed(self):
+        old_apps = self.migrate('0013_inventorysummary_unique_group')
+        User = old_apps.get_model('auth', 'User')
+        Location = old_apps.get_model('core', 'Location')
+        Supplier = old_apps.get_model('core', 'Supplier')
+        InventoryItem = old_apps.get_model('core', 'InventoryItem')
+        owner = User.objects.create(username='owner')
+        borrower = User.objects.create(username='borrower')
+        theirs = Location.objects.create(user=owner, name='Main')
+        supplier = Supplier.objects.create(user=owner, name='ACME')
+        own_supplier = Supplier.objects.create(user=borrower, name='ACME')
+        item = InventoryItem.objects.create(user=borrower, name='Bolt', quantity=2, price=1, location=theirs,
+                                            supplier=supplier)
+
+        self.migrate('0014_repoint_cross_tenant_references')
+        item = InventoryItem.objects.select_related('location').get(pk=item.pk)
+        self.assertEqual((item.location.user_id, item.location.name), (borrower.id, 'Main'))
+        self.assertEqual(item.supplier_id, own_supplier.id)
+        self.assertTrue(ChangeLog.objects.filter(user_id=borrower.id, kind='item', object_id=item.pk).exists())
+        self.assertEqual(verify_user_summaries(borrower.id), [])
+        self.assertEqual(Location.objects.filter(user_id=owner.id).count(), 1)
+
+
+class DatasetBenchmarkTests(TestCase):
+    def snapshot(self, prefix):
+        return list(InventoryItem.objects.filter(user__username__startswith=prefix).order_by('user__username', 'name')
+                    .values_list('user__username', 'name', 'quantity', 'price', 'location__name', 'supplier__name'))
+
+    def test_generator_is_reproducible_and_consistent(self):
+        generate_dataset(users=2, items=40, suppliers=3, locations=12, seed=3, prefix='gen', chunk_size=15)
+        first = self.snapshot('gen')
+        self.assertEqual(len(first), 80)
+        self.assertEqual(Location.objects.filter(user__username='gen00000').count(), 12)
+
+        user = get_user_model().objects.get(username='gen00001')
+        self.assertEqual(verify_user_summaries(user.id), [])
+        # The ledger ends where each item stands today
+        for item in InventoryItem.objects.filter(user=user, quantity__gt=0):
+            last = StockMovement.objects.filter(item_id=item.id).latest('created_at')
+            self.assertEqual(last.quantity_after, item.quantity)
+        self.assertEqual(ChangeLog.objects.filter(user=user, kind=ChangeLog.ITEM).count(), 40)
+
+        with self.assertRaises(DatasetError):
+            generate_dataset(users=1, items=1, prefix='gen')
+        flush_dataset('gen')
+        generate_dataset(users=2, items=40, suppliers=3, locations=12, seed=3, prefix='gen', chunk_size=1000)
+        self.assertEqual(self.snapshot('gen'), first)
+
+    def test_benchmark_reports_each_endpoint_and_cleans_up(self):
+        generate_dataset(users=1, items=30, seed=1, prefix='bm')
+        user = get_user_model().objects.get(username='bm00000')
+        results = run_benchmarks(user, ['items_page', 'locations', 'add_item', 'delete_item'], requests=2, warmup=1)
+
+        self.assertEqual(results['meta']['dataset']['items'], 30)
+        page = results['endpoints']['items_page']
+        self.assertEqual(page['status'], [200])
+        self.assertEqual(page['queries'], 3)
+        self.assertGreater(page['payload_bytes'], 0)
+        self.assertLessEqual(page['p50_ms'], page['p95_ms'])
+        self.assertEqual(InventoryItem.objects.filter(user=user).count(), 30)
+        with self.assertRaises(BenchmarkError):
+            run_benchmarks(user, ['nope'])
+
+    def test_compare_flags_latency_and_query_regressions(self):
+        baseline = {'endpoints': {'a': {'p95_ms': 100, 'queries': 3}, 'b': {'p95_ms': 1, 'queries': 3}}}
+        current = {'endpoints': {'a': {'p95_ms': 150, 'queries': 3}, 'b': {'p95_ms': 2, 'queries': 4}}}
+        flagged = {(r['endpoint'], r['metric']) for r in regressions(compare_results(baseline, current), 25)}
+        self.assertEqual(flagged, {('a', 'p95_ms'), ('b', 'queries')})
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='timed', password='pass')
+        self.client.force_login(self.user)
+        InventoryItem.objects.create(user=self.user, name='Bolt', quantity=10, price=1)
+        histograms.reset()
+        caches['figures'].clear()
+
+    def test_server_timing_breaks_down_phases(self):
+        response = self.client.get(reverse('get_dashboard_data'))
+        metrics = {m.split(';')[0]: m for m in response['Server-Timing'].split(', ')}
+        self.assertIn('series', metrics)
+        self.assertIn('figures', metrics)
+        self.assertIn('serialize', metrics)
+        self.assertRegex(metrics['db'], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+        self.assertRegex(metrics['total'], r'^total;dur=[\d.]+$')
+
+    def test_metrics_require_staff_or_token(self):
+        self.client.get(reverse('items_api'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer nope').status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{view="items_api",method="GET",status="200",le="+Inf"} 1', body)
+        self.assertIn('http_request_db_queries_total{view="items_api",method="GET",status="200"}', body)
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for seconds in (0.003, 0.03, 30):
+            histograms.observe('v', 'GET', 200, seconds, 1, 0.001)
+        lines = histograms.render().splitlines()
+        self.assertIn('http_request_duration_seconds_bucket{view="v",method="GET",status="200",le="0.005"} 1', lines)
+        self.assertIn('http_request_duration_seconds_bucket{view="v",method="GET",status="200",le="0.05"} 2', lines)
+        self.assertIn('http_request_duration_seconds_bucket{view="v",method="GET",status="200",le="10.0"} 2', lines)
+        self.assertIn('http_request_duration_seconds_count{view="v",method="GET",status="200"} 3', lines)
+
+    def test_slow_requests_leave_a_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILE_SLOW_REQUESTS_MS=0, PROFILE_SAMPLE_INTERVAL_MS=0.5, PROFILE_DIR=directory):
+                with self.assertLogs('core.middleware', 'WARNING'):
+                    self.client.get(reverse('get_dashboard_data'))
+            [name] = os.listdir(directory)
+            self.assertTrue(name.endswith('-get_dashboard_data.folded'))
+
+
+@override_settings(REFERENCE_CACHE_ENABLED=True)
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='refs', password='pass')
+        self.client.force_login(self.user)
+        clear_reference_cache(self)
+
+    def add(self, name, location='Main', supplier='Acme'):
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('add_item'), json.dumps({
+                'name': name, 'quantity': 1, 'price': 1, 'location': location, 'supplier': supplier,
+            }), content_type='application/json')
+        self.assertEqual(response.json()['status'], 'success')
+        return [q['sql'] for q in ctx.captured_queries
+                if any(table in q['sql'] for table in ('"core_location"', '"core_supplier"'))]
+
+    def test_repeat_writes_resolve_names_without_queries(self):
+        self.assertTrue(self.add('Bolt'))
+        self.assertEqual(self.add('Nut'), [])
+        item = InventoryItem.objects.get(user=self.user, name='Nut')
+        self.assertEqual((item.location.name, item.supplier.name), ('Main', 'Acme'))
+        self.assertEqual(Location.objects.filter(user=self.user).count(), 1)
+
+        # A second process shares the cache tier, not the local one
+        local_references.clear()
+        self.assertEqual(self.add('Washer'), [])
+
+    def test_rename_and_delete_invalidate(self):
+        self.add('Bolt')
+        location = Location.objects.get(user=self.user, name='Main')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_location', args=[location.id]), json.dumps({'name': 'North'}),
+                             content_type='application/json')
+        self.assertTrue(self.add('Nut'))
+        self.assertNotEqual(InventoryItem.objects.get(name='Nut').location_id, location.id)
+
+        supplier = Supplier.objects.get(user=self.user, name='Acme')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_supplier', args=[supplier.id]))
+        self.add('Washer')
+        self.assertEqual(InventoryItem.objects.get(name='Washer').supplier.name, 'Acme')
+
+    def test_names_are_per_tenant_and_rolled_back_inserts_are_not_cached(self):
+        other = get_user_model().objects.create_user(username='refs2', password='pass')
+        theirs = Location.objects.create(user=other, name='Main')
+        self.add('Bolt')
+        self.assertNotEqual(InventoryItem.objects.get(name='Bolt').location_id, theirs.id)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            resolve_references(other, 'Ghost', 'Ghost')
+        self.assertEqual(cached_ids(Location, other.id, ['Ghost']), {})
+
+    @override_settings(REFERENCE_CACHE_ENABLED=False)
+    def test_disabled_without_a_shared_cache(self):
+        # Another process's delete would never reach this one's LocMemCache
+        self.add('Bolt')
+        self.assertTrue(self.add('Nut'))
+        Location.objects.filter(user=self.user).delete()
+        self.add('Washer')
+        self.assertEqual(InventoryItem.objects.get(name='Washer').location.name, 'Main')
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='models', password='pass')
+        self.items = [InventoryItem.objects.create(user=self.user, name=f'Part {i}', quantity=10 + i, price=5)
+                      for i in range(20)]
+        local_models.clear()
+
+    def test_fit_is_stored_and_reused_until_enough_items_change(self):
+        model, record = get_model(self.user, TrainedModel.DEMAND)
+        self.assertEqual((record.item_count, record.data_version), (20, 0))
+        self.assertIn('mae', record.metrics)
+
+        # Served from the process LRU: one row read and one change count, no artifact
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIs(get_model(self.user, TrainedModel.DEMAND)[0], model)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        # Another process loads the stored artifact instead of refitting
+        local_models.clear()
+        loaded, again = get_model(self.user, TrainedModel.DEMAND)
+        self.assertIsNot(loaded, model)
+        self.assertEqual(again.trained_at, record.trained_at)
+
+        # Two of twenty items changed: within the 10% threshold
+        for item in self.items[:2]:
+            item.quantity += 1
+            item.save()
+        self.assertEqual(get_model(self.user, TrainedModel.DEMAND)[1].trained_at, record.trained_at)
+        self.items[2].delete()
+        self.assertGreater(get_model(self.user, TrainedModel.DEMAND)[1].trained_at, record.trained_at)
+
+    def test_old_fits_are_retrained(self):
+        _, record = get_model(self.user, TrainedModel.DEMAND)
+        TrainedModel.objects.filter(pk=record.pk).update(trained_at=timezone.now() - timedelta(days=2))
+        self.assertGreater(get_model(self.user, TrainedModel.DEMAND)[1].trained_at, record.trained_at)
+
+    def test_artifacts_can_live_in_a_directory(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MODEL_REGISTRY_DIR=directory):
+            _, first = get_model(self.user, TrainedModel.DEMAND)
+            self.assertTrue(os.path.exists(first.artifact_path))
+            self.assertIsNone(TrainedModel.objects.get(pk=first.pk).artifact)
+            TrainedModel.objects.filter(pk=first.pk).update(trained_at=timezone.now() - timedelta(days=2))
+            with self.captureOnCommitCallbacks(execute=True):
+                model, second = get_model(self.user, TrainedModel.DEMAND)
+            self.assertFalse(os.path.exists(first.artifact_path))
+            local_models.clear()
+            self.assertEqual(type(get_model(self.user, TrainedModel.DEMAND)[0]), type(model))
+
+    def test_failed_fit_keeps_the_previous_artifact(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(MODEL_REGISTRY_DIR=directory):
+            _, first = get_model(self.user, TrainedModel.DEMAND)
+            with mock.patch.dict('core.ml_models.TRAINERS', {TrainedModel.DEMAND: mock.Mock(side_effect=MemoryError)}), \
+                    self.captureOnCommitCallbacks(execute=True), self.assertRaises(MemoryError):
+                train(self.user, TrainedModel.DEMAND)
+            self.assertTrue(os.path.exists(first.artifact_path))
+            local_models.clear()
+            self.assertEqual(get_model(self.user, TrainedModel.DEMAND)[1].trained_at, first.trained_at)
+
+    def test_demand_forecast_learns_from_daily_outbound(self):
+        from core.ml_models import HORIZON_DAYS, predict_demand
+        today = bucket_start(timezone.now(), StockRollup.DAY)
+        busy, quiet = self.items[:2]
+        StockRollup.objects.bulk_create([
+            StockRollup(user=self.user, granularity=StockRollup.DAY, bucket_start=today - timedelta(days=day),
+                        item_id=busy.id, item_name=busy.name, outbound=5, movements=1)
+            for day in range(1, 60)
+        ])
+        model, record = get_model(self.user, TrainedModel.DEMAND)
+        demand = predict_demand(model, self.user)
+        self.assertAlmostEqual(demand[busy.name], 5 * HORIZON_DAYS, delta=3)
+        self.assertLess(demand[quiet.name], 1)
+        self.assertLess(record.metrics['mae'], 1)
+
+    def test_users_without_items_have_no_model(self):
+        other = get_user_model().objects.create_user(username='empty', password='pass')
+        self.assertEqual(get_model(other, TrainedModel.DEMAND), (None, None))
+
+
+class ForecastingTests(TestCase):
+    def test_each_series_keeps_the_method_that_fits_it(self):
+        import numpy as np
+        from core.forecasting import fit_forecaster
+        days = np.arange(56)
+        weekly = np.where(days % 7 == 5, 30.0, 2.0)
+        steady = np.full(56, 4.0)
+        forecaster, metrics = fit_forecaster([1, 2], np.array([weekly, steady]), 7)
+        self.assertEqual(metrics['methods'], {'seasonal': 1, 'smoothing': 1})
+
+        forecast = forecaster.predict([1, 2, 3], np.array([weekly, steady, steady]))
+        self.assertEqual(forecast.shape, (3, 7))
+        self.assertEqual(list(forecast[0]), list(weekly[-7:]))
+        self.assertAlmostEqual(forecast[1].sum(), 28, delta=0.5)
+        with self.assertRaises(ValueError):
+            fit_forecaster([1], np.array([steady]), 7, backend='arima')
+
+    def test_prophet_is_opt_in_for_the_most_valuable_items(self):
+        user = get_user_model().objects.create_user(username='prophet', password='pass')
+        today = bucket_start(timezone.now(), StockRollup.DAY)
+        items = [InventoryItem.objects.create(user=user, name=name, quantity=10, price=price)
+                 for name, price in (('Cheap', 1), ('Dear', 500))]
+        StockRollup.objects.bulk_create([
+            StockRollup(user=user, granularity=StockRollup.DAY, bucket_start=today - timedelta(days=day),
+                        item_id=item.id, item_name=item.name, outbound=3 + day % 7)
+            for item in items for day in range(1, 57)
+        ])
+        _, record = get_model(user, TrainedModel.DEMAND)
+        self.assertEqual(record.metrics['prophet_items'], 0)
+        with override_settings(FORECAST_PROPHET_ITEMS=1):
+            model, record = train(user, TrainedModel.DEMAND)
+        self.assertEqual(record.metrics['prophet_items'], 1)
+        self.assertEqual(list(model.prophet), [items[1].id])
+
+    def test_benchmark_command_compares_backends(self):
+        out = StringIO()
+        call_command('benchmark_forecasts', '--items', '50', '--days', '42', '--prophet-items', '0', '--json', stdout=out)
+        summary = json.loads(out.getvalue())
+        self.assertEqual([r['backend'] for r in summary['results']], ['auto', 'smoothing', 'seasonal'])
+        self.assertNotIn('NaN', out.getvalue())
+        for result in summary['results']:
+            self.assertEqual(result['series'], 50)
+            self.assertGreater(result['mae'], 0)
+            self.assertIsNone(result['sample_mae'])
+        out = StringIO()
+        call_command('benchmark_forecasts', '--items', '20', '--days', '42', '--prophet-items', '0', stdout=out)
+        self.assertNotIn('sample MAE', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_forecasts', '--days', '10', stdout=StringIO())
+
+
+class PrecomputeForecastTests(TestCase):
+    def setUp(self):
+        self.users = [get_user_model().objects.create_user(username=f'nightly{i}', password='pass') for i in range(3)]
+        for user in self.users:
+            InventoryItem.objects.create(user=user, name='Bolt', quantity=10, price=1)
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def precompute(self, *args):
+        out = StringIO()
+        call_command('precompute_forecasts', '--workers', '1', '--chunk-size', '2', '--checkpoint', self.checkpoint,
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_results_are_stored_for_the_pages_to_read(self):
+        output = os.path.join(os.path.dirname(self.checkpoint), 'timings.json')
+        self.assertIn('Precomputed 3 tenant(s)', self.precompute('--output', output))
+        self.assertFalse(os.path.exists(self.checkpoint))
+        with open(output) as f:
+            timings = json.load(f)
+        self.assertEqual([row['username'] for row in timings['per_tenant']], ['nightly0', 'nightly1', 'nightly2'])
+        self.assertTrue(all(row['items'] == 1 and row['seconds'] >= 0 for row in timings['per_tenant']))
+
+        self.client.force_login(self.users[0])
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get(reverse('insights_status_api'))
+        self.assertEqual((response.json()['status'], response.json()['fresh']), ('done', True))
+        self.assertEqual(callbacks, [])
+        data = self.client.get(reverse('get_dashboard_data')).json()
+        self.assertEqual(data['demand_forecast'], {'Bolt': 0.0})
+
+        # A rerun at the same data version still changes the ETag
+        etag = self.client.get(reverse('get_dashboard_data'))['ETag']
+        AnalyticsResult.objects.update(finished_at=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.client.get(reverse('get_dashboard_data'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_interrupted_run_resumes_from_its_checkpoint(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'started_at': 'earlier', 'pending': [self.users[2].id],
+                       'tenants': [{'user_id': self.users[0].id, 'username': 'nightly0', 'items': 1, 'seconds': 1.0}]}, f)
+        self.assertIn('1 user(s) left', self.precompute())
+        self.assertEqual(list(AnalyticsResult.objects.values_list('user__username', flat=True)), ['nightly2'])
+
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'started_at': 'earlier', 'pending': [], 'tenants': []}, f)
+        self.assertIn('Precomputed 3 tenant(s)', self.precompute('--restart'))
+
+    def test_resume_needs_the_same_user_selection(self):
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'started_at': 'earlier', 'usernames': ['nightly0', 'nightly2'], 'pending': [self.users[2].id],
+                       'tenants': []}, f)
+        for args in [(), ('--user', 'nightly1')]:
+            with self.assertRaisesMessage(CommandError, 'was for nightly0, nightly2'):
+                self.precompute(*args)
+        self.assertIn('1 user(s) left', self.precompute('--user', 'nightly2', '--user', 'nightly0'))
+        self.assertIn('Precomputed 1 tenant(s)', self.precompute('--user', 'nightly1', '--restart'))
+
+    def test_failures_are_reported_per_tenant(self):
+        from unittest import mock
+        with mock.patch('core.analytics.compute_insights', side_effect=RuntimeError('boom')), \
+                self.assertLogs('core.precompute', 'ERROR') as logs, \
+                self.assertRaisesMessage(CommandError, '3 tenant(s) failed'):
+            self.precompute()
+        self.assertEqual(len(logs.records), 3)
+
+
+class InventoryReportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='reports', password='pass')
+        self.client.force_login(self.user)
+        main = Location.objects.create(user=self.user, name='Main')
+        north = Location.objects.create(user=self.user, name='North')
+        for i in range(120):
+            InventoryItem.objects.create(user=self.user, name=f'Part {i:03}', quantity=i % 20, price=2,
+                                         location=main if i % 2 else north)
+
+    def request(self, kind, method='get', **params):
+        # Queues the build, runs it as the worker would, then reads the outcome
+        url = reverse('report_status_api', args=[kind]) + ('?' + urlencode(params) if params else '')
+        with self.captureOnCommitCallbacks(execute=True):
+            getattr(self.client, method)(url)
+        return self.client.get(url).json()
+
+    def test_report_is_built_in_the_background_and_served_from_cache(self):
+        download = reverse('download_report', args=['valuation'])
+        self.assertEqual(self.client.get(download).status_code, 404)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            status = self.client.get(reverse('report_status_api', args=['valuation'])).json()
+        self.assertEqual((status['status'], 'download_url' in status), ('pending', False))
+        for callback in callbacks:
+            callback()
+
+        status = self.request('valuation')
+        self.assertEqual((status['status'], status['rows'], status['download_url']), ('done', 120, download))
+        response = self.client.get(download)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(len(pdf), status['size'])
+
+        # Cached: no second build until the data changes, then the old file goes
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse('report_status_api', args=['valuation']))
+        self.assertEqual(callbacks, [])
+        old = InventoryReport.objects.get(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_item'), json.dumps({
+                'name': 'Extra', 'quantity': 1, 'price': 1, 'location': 'Main', 'supplier': 'Acme',
+            }), content_type='application/json')
+        self.assertEqual(self.client.get(download).status_code, 404)
+        self.assertEqual(self.request('valuation')['rows'], 121)
+        self.assertFalse(InventoryReport.objects.filter(pk=old.pk).exists())
+        self.assertEqual(InventoryReport.objects.filter(user=self.user).count(), 1)
+
+    def test_reports_in_a_directory_are_not_rebuilt_when_unreadable(self):
+        with override_settings(REPORT_DIR=tempfile.mkdtemp()):
+            self.assertEqual(self.request('valuation')['status'], 'done')
+            report = InventoryReport.objects.get(user=self.user)
+            self.assertIsNone(report.content)
+            download = self.client.get(reverse('download_report', args=['valuation']))
+            self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+            # As on a web host that does not share the worker's directory: polling stops
+            os.remove(report.path)
+            with self.captureOnCommitCallbacks() as callbacks:
+                status = self.client.get(reverse('report_status_api', args=['valuation'])).json()
+            self.assertEqual((status['status'], callbacks), ('failed', []))
+            self.assertEqual(self.request('valuation', method='post')['status'], 'done')
+            self.assertTrue(os.path.exists(InventoryReport.objects.get(user=self.user).path))
+
+    def test_filters_and_kinds_are_cached_separately(self):
+        low = self.request('low_stock', location='Main')
+        # Odd quantities below the default reorder point of 10 at Main
+        self.assertEqual(low['rows'], 30)
+        self.assertEqual(low['download_url'], reverse('download_report', args=['low_stock']) + '?location=Main')
+        self.assertEqual(self.request('valuation', location='North')['rows'], 60)
+        self.assertEqual(InventoryReport.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.client.get(low['download_url'])['Content-Disposition'],
+                         'attachment; filename="low_stock-report-Main.pdf"')
+        self.assertEqual(self.client.get(reverse('report_status_api', args=['sales'])).status_code, 400)
+
+    def test_unknown_locations_are_rejected(self):
+        Location.objects.create(user=get_user_model().objects.create_user(username='reports2'), name='Elsewhere')
+        for location in ('Nowhere', 'x' * 101, 'Elsewhere'):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.get(reverse('report_status_api', args=['valuation']), {'location': location})
+            self.assertEqual((response.status_code, callbacks), (400, []), location)
+        self.assertFalse(InventoryReport.objects.exists())
+
+    def test_failed_builds_are_retried_only_on_request(self):
+        from unittest import mock
+        with mock.patch('core.reports.build_report', side_effect=OSError('disk full')), \
+                self.assertLogs('core.tasks', 'ERROR'):
+            self.assertEqual(self.request('valuation')['status'], 'failed')
+        with self.captureOnCommitCallbacks() as callbacks:
+            status = self.client.get(reverse('report_status_api', args=['valuation'])).json()
+        self.assertEqual((status['status'], status['error'], callbacks), ('failed', 'disk full', []))
+        self.assertEqual(self.request('valuation', method='post')['status'], 'done')
+
+    def test_download_keeps_its_query_budget(self):
+        DataVersion.objects.get_or_create(user=self.user)
+        self.request('valuation')
+        download = reverse('download_report', args=['valuation'])
+        with self.assertNumQueries(resolve(download).func.query_budget):
+            self.client.get(download)
+
+
+class StartupTests(TestCase):
+    def test_worker_boot_does_not_import_analytics_stack(self):
+        out = StringIO()
+        call_command('benchmark_startup', '--runs', '1', '--json', stdout=out)
+        summary = json.loads(out.getvalue())
+        self.assertEqual(summary['heavy_modules'], [])
+        self.assertGreater(summary['median_rss_mb'], 0)
+
+    def test_placeholder_figures_are_plotly_json(self):
+        from core.views import placeholder_figures
+        for figure in placeholder_figures().values():
+            figure = json.loads(figure)
+            self.assertIn('text', figure['layout']['title'])
+            self.assertEqual(len(figure['data']), 1)
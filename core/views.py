@@ -1,145 +1,247 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db.models import Count, Sum
-from django.utils.timezone import now, timedelta
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.utils.http import quote_etag
+from django.db import IntegrityError, transaction
+from functools import lru_cache
+import asyncio
+import hmac
+import io
 import json
-import pandas as pd
-import numpy as np
-import csv
-import plotly.express as px
-from prophet import Prophet
-import plotly.graph_objects as go
 from .models import InventoryItem, Supplier, Location
+from .batch import apply_batch
+from .caching import async_condition, data_etag, figure_cache_key
+from .changes import ChangeFeedError, CursorExpired, latest_cursor, parse_cursor, parse_feed_limit, read_changes
+from .events import event_stream
+from .exports import ExportError, parse_columns, stream_export
+from .importers import ImportFileError, import_inventory_csv, parse_level
+from .instrumentation import histograms, timed
+from .jobs import job_status, latest_result, request_job, result_tag
+from .pagination import PaginationError, paginate_items, parse_fields, parse_limit
+from .parallel import run_cpu_bound, run_queries
+from .references import resolve_references
+from .reports import ReportError, open_report, parse_kind, parse_location, ready_report, report_status, request_report
+from .search import SearchError, search_items
+from .selectors import (
+    location_overview, query_budget, stock_alerts, supplier_overview, user_item, user_items,
+    user_locations, user_suppliers,
+)
+from .summaries import dashboard_totals
 
 
 # -----------------------
 # Utility - Anomaly Detection
 # -----------------------
 def detect_anomalies(items):
-    if not items:
-        return []
+    from .anomalies import find_anomalies
+    flagged = find_anomalies(items, method='zscore')
+    return list(items.filter(pk__in=[a['id'] for a in flagged]))
 
-    quantities = np.array([item.quantity for item in items])
-    mean = np.mean(quantities)
-    std = np.std(quantities)
 
-    print("Quantities:", quantities)
-    print("Mean:", mean, "Std:", std)
+# -----------------------
+# Dashboard View & Data API
+# -----------------------
+# plotly: full figure JSON per chart; series: compact labels/values for static/js/charts.js
+CHART_FORMATS = ('plotly', 'series')
 
-    if std == 0:
-        return []
 
-    flagged = [item for item in items if abs((item.quantity - mean) / std) > 2]
-    print("Flagged:", [f"{item.name} → {item.quantity}" for item in flagged])
-    return flagged
+def placeholder_figure(trace_type, x, title):
+    # Plain Plotly JSON, so rendering the page never has to import plotly
+    return json.dumps({'data': [{'type': trace_type, 'x': x, 'y': [0]}], 'layout': {'title': {'text': title}}})
 
 
+@lru_cache(maxsize=1)
+def placeholder_figures():
+    # Identical for every user and request, so serialize once per process.
+    return {
+        'forecast_chart_data': placeholder_figure('scatter', [0], "Forecast Chart (Placeholder)"),
+        'anomalies_chart_data': placeholder_figure('bar', ['None'], "Anomalies Detected (Placeholder)"),
+        'stock_trend_data': placeholder_figure('bar', ['None'], "Stock Trends (Placeholder)"),
+    }
 
-# -----------------------
-# Dashboard View & Data API
-# -----------------------
+
+@query_budget(4)
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=data_etag('dashboard', 'location', html=True))
 def dashboard_view(request):
-    suppliers = Supplier.objects.filter(user=request.user)
-    locations = Location.objects.filter(user=request.user)
+    suppliers = user_suppliers(request.user)
+    locations = user_locations(request.user)
     location_filter = request.GET.get('location', '')
-    # Placeholder for forecast_fig, anomalies_fig, and stock_fig to avoid undefined variable errors
-    forecast_fig = px.line(x=[0], y=[0], title="Forecast Chart (Placeholder)")
-    anomalies_fig = px.bar(x=['None'], y=[0], title="Anomalies Detected (Placeholder)")
-    stock_fig = px.bar(x=['None'], y=[0], title="Stock Trends (Placeholder)")
-
-    return render(request, 'dashboard.html', {
-        'suppliers': suppliers,
-        'locations': locations,
-        'location_filter': location_filter,
-        'forecast_chart_data': forecast_fig.to_json(),
-        'anomalies_chart_data': anomalies_fig.to_json(),
-        'stock_trend_data': stock_fig.to_json()
-    })
+
+    with timed('render'):
+        return render(request, 'dashboard.html', {
+            'suppliers': suppliers,
+            'locations': locations,
+            'location_filter': location_filter,
+            **placeholder_figures(),
+        })
 
 
+def dashboard_data_etag(request):
+    # The demand forecast comes from the latest stored insights result
+    latest = latest_result(request, 'insights')
+    return f"{data_etag('dashboard-data', 'location', 'format')(request)}-r{result_tag(latest)}"
+
+
+@query_budget(9)
 @login_required
-def get_dashboard_data_api(request):
+@cache_control(private=True, no_cache=True)
+@async_condition(etag_func=dashboard_data_etag)
+async def get_dashboard_data_api(request):
+    # Async: the independent reads below run side by side, each on its own connection
     location_filter = request.GET.get('location', '')
-    items = InventoryItem.objects.filter(user=request.user)
-    if location_filter:
-        items = items.filter(location__name=location_filter)
-
-    total_items = items.count()
-    total_value = items.aggregate(Sum('price'))['price__sum'] or 0
-
-    # Stock trends
-    stock_data = items.values('name').annotate(total=Sum('quantity')).order_by('name')
-    stock_chart = px.line(pd.DataFrame(stock_data), x='name', y='total', title='Stock Levels Over Time', markers=True)
-
-    # Grouped location/supplier
-    location_data = items.values('location__name').annotate(total=Sum('quantity'))
-    supplier_data = items.values('supplier__name').annotate(total=Sum('quantity'))
-    location_chart = px.pie(location_data, names='location__name', values='total', title='Stock by Location')
-    supplier_chart = px.bar(supplier_data, x='supplier__name', y='total', title='Supplier Performance')
-
-    # Forecast: simulate demand over days per item
-    forecast_df = pd.DataFrame(list(items.values('created_at', 'quantity', 'name')))
-    forecast_fig = go.Figure()
-    if not forecast_df.empty:
-        forecast_df['created_at'] = pd.to_datetime(forecast_df['created_at']).dt.date
-        grouped = forecast_df.groupby(['created_at', 'name'])['quantity'].sum().reset_index()
-        for name in grouped['name'].unique():
-            item_data = grouped[grouped['name'] == name]
-            forecast_fig.add_trace(go.Scatter(x=item_data['created_at'], y=item_data['quantity'],
-                                              mode='lines+markers', name=name))
-        forecast_fig.update_layout(title='Demand Forecast')
-
-    # Anomalies: basic detection (quantity > 100)
-    items = InventoryItem.objects.filter(user=request.user)  # Ensure items is defined
-    items = InventoryItem.objects.filter(user=request.user)  # Ensure items is defined
-    anomalies = [item for item in items if item.quantity > 100]
-    anomalies_df = pd.DataFrame([{'name': item.name, 'quantity': item.quantity} for item in anomalies])
-    anomalies_fig = px.bar(anomalies_df, x='name', y='quantity', title='Anomalies Detected') \
-        if not anomalies_df.empty else px.bar(x=['None'], y=[0], title='No Anomalies Detected')
-
-    item_list = [{
-        'id': item.id,
-        'name': item.name,
-        'quantity': item.quantity,
-        'price': float(item.price),
-        'supplier': item.supplier.name if item.supplier else 'N/A',
-        'location': item.location.name if item.location else 'N/A'
-    } for item in items]
+    chart_format = request.GET.get('format', 'plotly')
+    if chart_format not in CHART_FORMATS:
+        return JsonResponse({'status': 'error', 'message': f"Unsupported format: {chart_format}"}, status=400)
+    user = await request.auser()
+    items = user_items(user, location_filter)
+    # The plotly stack loads on the first chart build, not at worker boot
+    from .analytics import assemble_dashboard_series, dashboard_series_queries, series_figures
+
+    cache_name = 'dashboard-series' if chart_format == 'series' else 'dashboard'
+    key = await sync_to_async(figure_cache_key)(request, cache_name, location=location_filter)
+    figures_cache = caches[settings.FIGURE_CACHE_ALIAS]
+    with timed('cache'):
+        charts = await figures_cache.aget(key)
+
+    queries = {
+        # Totals and location/supplier groupings come from the maintained summaries
+        'totals': lambda: dashboard_totals(user, location_filter),
+        # Only the first page of items; the rest comes from items_api
+        'page': lambda: paginate_items(user, location=location_filter),
+    }
+    if charts is None:
+        queries.update(dashboard_series_queries(user, location_filter, items))
+    with timed('series'):
+        results = await run_queries(queries)
+    totals, page = results.pop('totals'), results.pop('page')
+    latest = latest_result(request, 'insights')  # read by the ETag already
+
+    if charts is None:
+        series = assemble_dashboard_series(results, totals)
+        if chart_format == 'series':
+            charts = {'charts': series}
+        else:
+            with timed('figures'):
+                charts = await run_cpu_bound(series_figures, series)
+        with timed('cache'):
+            await figures_cache.aset(key, charts)
+
+    with timed('serialize'):
+        return await run_cpu_bound(JsonResponse, {
+            'total_items': totals['total_items'],
+            'total_value': totals['total_value'] or 0,
+            **charts,
+            # Precomputed nightly (precompute_forecasts) or by the insights job; never computed here
+            'demand_forecast': latest.payload.get('demand_predictions', {}) if latest else {},
+            'items': page['items'],
+            'next_cursor': page['next_cursor'],
+        })
+
+
+@query_budget(3)
+@login_required
+def items_api(request):
+    try:
+        page = paginate_items(
+            request.user,
+            fields=parse_fields(request.GET.get('fields', '')),
+            order=request.GET.get('order', 'name'),
+            cursor=request.GET.get('cursor'),
+            limit=parse_limit(request.GET.get('limit')),
+            location=request.GET.get('location', ''),
+            supplier=request.GET.get('supplier', ''),
+            low_stock=request.GET.get('low_stock') == '1',
+        )
+    except PaginationError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse(page)
 
-    return JsonResponse({
-        'total_items': total_items,
-        'total_value': total_value,
-        'stock_chart_data': stock_chart.to_json(),
-        'location_chart_data': location_chart.to_json(),
-        'supplier_chart_data': supplier_chart.to_json(),
-        'forecast_chart_data': forecast_fig.to_json(),
-        'anomalies_chart_data': anomalies_fig.to_json(),
-        'items': item_list
-    })
 
+@query_budget(3)
+@login_required
+def search_items_api(request):
+    try:
+        results = search_items(
+            request.user,
+            request.GET.get('q', ''),
+            fields=parse_fields(request.GET.get('fields', '')),
+            cursor=request.GET.get('cursor'),
+            limit=parse_limit(request.GET.get('limit'), default=20),
+            location=request.GET.get('location', ''),
+            supplier=request.GET.get('supplier', ''),
+        )
+    except (PaginationError, SearchError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse(results)
 
 
+@query_budget(7)
+@login_required
+def changes_api(request):
+    # Without a cursor, hand out the current head: load the catalogue, then follow the feed from here
+    if 'cursor' not in request.GET:
+        return JsonResponse({'changes': [], 'cursor': str(latest_cursor()), 'has_more': False})
+    try:
+        cursor = parse_cursor(request.GET['cursor'])
+        limit = parse_feed_limit(request.GET.get('limit'))
+    except CursorExpired as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=410)
+    except ChangeFeedError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse(read_changes(request.user, cursor, limit))
+
+
+@login_required
+async def events_api(request):
+    # A long-lived stream would pin a whole sync worker, so it is only served over ASGI
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'status': 'error', 'message': 'Event stream requires the ASGI server'}, status=501)
+    user = await request.auser()
+    response = StreamingHttpResponse(event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx would otherwise buffer the stream
+    return response
+
 
 # -----------------------
 # Inventory Item API
 # -----------------------
+def stock_levels(data):
+    # Optional on add and edit; items keep the model defaults until someone sets them.
+    # Validated as the importer does, raising ValueError.
+    return {
+        field: parse_level(data[field], field)
+        for field in ('reorder_point', 'target_level') if data.get(field) not in (None, '')
+    }
+
+
 @login_required
 def add_item_api(request):
     if request.method == 'POST':
         data = json.loads(request.body)
-        location, _ = Location.objects.get_or_create(name=data['location'], defaults={'user': request.user})
-        supplier, _ = Supplier.objects.get_or_create(name=data['supplier'], defaults={'user': request.user})
+        try:
+            levels = stock_levels(data)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        location_id, supplier_id = resolve_references(request.user, data['location'], data['supplier'])
         InventoryItem.objects.create(
             user=request.user,
             name=data['name'],
             quantity=data['quantity'],
             price=data['price'],
-            supplier=supplier,
-            location=location
+            supplier_id=supplier_id,
+            location_id=location_id,
+            **levels,
         )
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
@@ -155,15 +257,18 @@ def delete_item_api(request):
     return JsonResponse({'status': 'error'}, status=400)
 
 
+@query_budget(3)
 @login_required
 def get_item_api(request, id):
-    item = InventoryItem.objects.get(id=id, user=request.user)
+    item = user_item(request.user, id)
     return JsonResponse({
         'name': item.name,
         'quantity': item.quantity,
         'price': float(item.price),
         'supplier': item.supplier.name if item.supplier else '',
-        'location': item.location.name if item.location else ''
+        'location': item.location.name if item.location else '',
+        'reorder_point': item.reorder_point,
+        'target_level': item.target_level,
     })
 
 
@@ -171,32 +276,43 @@ def get_item_api(request, id):
 def edit_item_api(request):
     if request.method == 'POST':
         data = json.loads(request.body)
+        try:
+            levels = stock_levels(data)
+        except ValueError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         item = InventoryItem.objects.get(id=data['id'], user=request.user)
-        location, _ = Location.objects.get_or_create(name=data['location'], defaults={'user': request.user})
-        supplier, _ = Supplier.objects.get_or_create(name=data['supplier'], defaults={'user': request.user})
+        location_id, supplier_id = resolve_references(request.user, data['location'], data['supplier'])
         item.name = data['name']
         item.quantity = data['quantity']
         item.price = data['price']
-        item.location = location
-        item.supplier = supplier
+        item.location_id = location_id
+        item.supplier_id = supplier_id
+        for field, value in levels.items():
+            setattr(item, field, value)
         item.save()
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
 
 
+@login_required
+def batch_items_api(request):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=400)
+    try:
+        data = json.loads(request.body)
+        result = apply_batch(request.user, data.get('operations'))
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse(result)
+
+
 # -----------------------
 # Location Views
 # -----------------------
+@query_budget(4)
 @login_required
 def locations_view(request):
-    locations = Location.objects.filter(user=request.user).annotate(
-        item_count=Count('inventoryitem'),
-        total_stock=Sum('inventoryitem__quantity')
-    )
-    for location in locations:
-        items = InventoryItem.objects.filter(location=location)
-        location.items_list = [{'name': item.name, 'quantity': item.quantity} for item in items]
-    return render(request, 'locations.html', {'locations': locations})
+    return render(request, 'locations.html', {'locations': location_overview(request.user)})
 
 
 @login_required
@@ -206,7 +322,7 @@ def add_location_api(request):
         name = data.get('name')
         if not name:
             return JsonResponse({'status': 'error', 'message': 'Location name is required'}, status=400)
-        location, created = Location.objects.get_or_create(name=name, defaults={'user': request.user})
+        location, created = Location.objects.get_or_create(user=request.user, name=name)
         if not created:
             return JsonResponse({'status': 'error', 'message': 'Location already exists'}, status=400)
         return JsonResponse({'status': 'success', 'location': {'id': location.id, 'name': location.name}})
@@ -218,7 +334,11 @@ def edit_location(request, location_id):
     if request.method == 'POST':
         data = json.loads(request.body)
         location.name = data['name']
-        location.save()
+        try:
+            with transaction.atomic():
+                location.save()
+        except IntegrityError:
+            return JsonResponse({'status': 'error', 'message': 'Location already exists'}, status=400)
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
 
@@ -235,13 +355,10 @@ def delete_location(request, location_id):
 # -----------------------
 # Supplier Views
 # -----------------------
+@query_budget(3)
 @login_required
 def suppliers_view(request):
-    suppliers = Supplier.objects.filter(user=request.user).annotate(
-        item_count=Count('inventoryitem'),
-        total_stock=Sum('inventoryitem__quantity')
-    )
-    return render(request, 'suppliers.html', {'suppliers': suppliers})
+    return render(request, 'suppliers.html', {'suppliers': supplier_overview(request.user)})
 
 
 @login_required
@@ -251,7 +368,7 @@ def add_supplier_api(request):
         name = data.get('name')
         if not name:
             return JsonResponse({'status': 'error', 'message': 'Supplier name is required'}, status=400)
-        supplier, created = Supplier.objects.get_or_create(name=name, defaults={'user': request.user})
+        supplier, created = Supplier.objects.get_or_create(user=request.user, name=name)
         if not created:
             return JsonResponse({'status': 'error', 'message': 'Supplier already exists'}, status=400)
         return JsonResponse({'status': 'success', 'supplier': {'id': supplier.id, 'name': supplier.name}})
@@ -263,7 +380,11 @@ def edit_supplier(request, supplier_id):
     if request.method == 'POST':
         data = json.loads(request.body)
         supplier.name = data['name']
-        supplier.save()
+        try:
+            with transaction.atomic():
+                supplier.save()
+        except IntegrityError:
+            return JsonResponse({'status': 'error', 'message': 'Supplier already exists'}, status=400)
         return JsonResponse({'status': 'success'})
     return JsonResponse({'status': 'error'}, status=400)
 
@@ -280,82 +401,162 @@ def delete_supplier(request, supplier_id):
 # -----------------------
 # Insights Page
 # -----------------------
+def insights_etag(request):
+    # The page changes with the data version and with each finished analytics job
+    latest = latest_result(request, 'insights')
+    return f"{data_etag('insights', html=True)(request)}-r{result_tag(latest)}"
+
+
+@query_budget(10)
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=insights_etag)
 def insights_view(request):
-    items = InventoryItem.objects.filter(user=request.user)
-
-    df = pd.DataFrame(list(items.values('name', 'quantity', 'created_at')))
-    if not df.empty:
-        # Normalize time: remove timezone to avoid Prophet issues and ensure plot works
-        df['created_at'] = pd.to_datetime(df['created_at']).dt.tz_localize(None)
-        df = df.sort_values(by='created_at')
-
-        # Group data per item per date
-        df['created_at'] = df['created_at'].dt.floor('min')  # collapse to minute if needed
-        grouped = df.groupby(['created_at', 'name'])['quantity'].sum().reset_index()
-
-        # Plot as proper time-series lines
-        forecast_fig = px.line(
-            grouped,
-            x='created_at',
-            y='quantity',
-            color='name',
-            title='Demand Forecast',
-            markers=True,
-            line_shape='linear'
-        )
-        forecast_fig.update_layout(
-            xaxis_title='Date & Time',
-            yaxis_title='Quantity'
-        )
-    else:
-        forecast_fig = px.line(x=[], y=[], title='Demand Forecast (No Data)', markers=True)
-        forecast_fig.update_layout(xaxis_title='Date & Time', yaxis_title='Quantity')
-
-    # ----- Anomalies Chart -----
-    anomalies = [item for item in items if item.quantity > 100]
-    anomalies_df = pd.DataFrame([{'name': item.name, 'quantity': item.quantity} for item in anomalies])
-    if not anomalies_df.empty:
-        anomalies_fig = px.bar(anomalies_df, x='name', y='quantity', title='Anomalies Detected')
+    # Heavy analytics run as a background job; render the latest finished result
+    job = request_job(request, 'insights')
+    latest = latest_result(request, 'insights', refresh=True)
+    series = latest.payload.get('series', {}) if latest else {}
+
+    # Stock alerts are not rendered here: the page loads them from the low-stock items API
+    with timed('render'):
+        response = render(request, 'insights.html', {
+            'insights_series': series,
+            'analytics': job_status(request, 'insights', job),
+        })
+    response['ETag'] = quote_etag(insights_etag(request))
+    return response
+
+
+def insights_data_etag(request):
+    latest = latest_result(request, 'insights')
+    return f"{data_etag('insights-data')(request)}-r{result_tag(latest)}"
+
+
+@query_budget(7)
+@login_required
+@cache_control(private=True, no_cache=True)
+@async_condition(etag_func=insights_data_etag)
+async def insights_data_api(request):
+    # What refreshInsights needs, without rendering and re-parsing the whole page
+    user = await request.auser()
+
+    def analytics():
+        job = request_job(request, 'insights')
+        return job_status(request, 'insights', job), latest_result(request, 'insights')
+
+    (status, latest), reads = await asyncio.gather(
+        sync_to_async(analytics)(),
+        run_queries({'alerts': lambda: stock_alerts(user)}),
+    )
+    low_stock_list, restock_suggestions, more_alerts = reads['alerts']
+    payload = latest.payload if latest else {}
+    with timed('serialize'):
+        return await run_cpu_bound(JsonResponse, {
+            'analytics': status,
+            'series': payload.get('series', {}),
+            'demand_predictions': payload.get('demand_predictions', {}),
+            'low_stock': low_stock_list,
+            'restock_suggestions': restock_suggestions,
+            # For /api/items/?low_stock=1&order=quantity
+            'low_stock_cursor': more_alerts,
+        })
+
+
+@query_budget(5)
+@login_required
+def insights_status_api(request):
+    if request.method == 'POST':
+        job = request_job(request, 'insights', force=True)
     else:
-        anomalies_fig = px.bar(x=[], y=[], title='No Anomalies Detected')
-
-    # ----- Stock Trend -----
-    stock_data = items.values('name').annotate(total=Sum('quantity')).order_by('-total')
-    stock_fig = px.line(stock_data, x='name', y='total', title='Stock Trends', markers=True)
-
-    # ----- Insights -----
-    low_stock = [item for item in items if item.quantity < 10]
-    low_stock_list = [{'name': item.name, 'quantity': item.quantity, 'location': item.location.name if item.location else 'N/A'} for item in low_stock]
-    restock_suggestions = [{'name': item.name, 'suggested_quantity': max(100 - item.quantity, 0)} for item in items if item.quantity < 50]
-
-    return render(request, 'insights.html', {
-        'forecast_chart_data': forecast_fig.to_json(),
-        'anomalies_chart_data': anomalies_fig.to_json(),
-        'stock_trend_data': stock_fig.to_json(),
-        'low_stock': low_stock_list,
-        'restock_suggestions': restock_suggestions
-    })
+        job = request_job(request, 'insights')
+    return JsonResponse(job_status(request, 'insights', job))
+
+
 # -----------------------
 # Export CSV
 # -----------------------
+@query_budget(3)
 @login_required
 def export_inventory(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="inventory.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Name', 'Quantity', 'Price', 'Supplier', 'Location'])
-    for item in InventoryItem.objects.filter(user=request.user):
-        writer.writerow([
-            item.name,
-            item.quantity,
-            item.price,
-            item.supplier.name if item.supplier else '',
-            item.location.name if item.location else ''
-        ])
+    try:
+        chunks, content_type, filename = stream_export(
+            request.user,
+            fmt=request.GET.get('format', 'csv'),
+            columns=parse_columns(request.GET.get('columns', '')),
+            location=request.GET.get('location', ''),
+            supplier=request.GET.get('supplier', ''),
+            compress=request.GET.get('compress', ''),
+        )
+    except ExportError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
 
+# -----------------------
+# PDF Reports
+# -----------------------
+@query_budget(7)
+@login_required
+def report_status_api(request, kind):
+    # Queues the report for the current data version unless it is built or being built;
+    # POST also retries a failed build
+    try:
+        kind = parse_kind(kind)
+        location = parse_location(request.user, request.GET.get('location', ''))
+    except ReportError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    report = request_report(request, kind, location, retry=request.method == 'POST')
+    return JsonResponse(report_status(report))
+
+
+@query_budget(4)
+@login_required
+def download_report(request, kind):
+    # Repeat downloads are the cached file; nothing is generated here
+    try:
+        kind = parse_kind(kind)
+    except ReportError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    location = request.GET.get('location', '')
+    report = ready_report(request, kind, location)
+    if report is None:
+        return JsonResponse({'status': 'error', 'message': 'Report is not ready; request it first'}, status=404)
+    filename = f"{kind}-report{'-' + location if location else ''}.pdf"
+    return FileResponse(open_report(report), as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+# -----------------------
+# Bulk Import
+# -----------------------
+@login_required
+def import_inventory_api(request):
+    if request.method != 'POST' or 'file' not in request.FILES:
+        return JsonResponse({'status': 'error', 'message': 'POST a CSV as the "file" field'}, status=400)
+    upload = io.TextIOWrapper(request.FILES['file'].file, encoding='utf-8-sig', newline='')
+    try:
+        stats = import_inventory_csv(request.user, upload)
+    except (ImportFileError, UnicodeDecodeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({'status': 'success', **stats})
+
+
+# -----------------------
+# Metrics
+# -----------------------
+def metrics_view(request):
+    # Prometheus scrapers send the bearer token; staff can also look from a browser session
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    allowed = request.user.is_staff or (
+        token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+    )
+    if not allowed:
+        return JsonResponse({'status': 'error', 'message': 'Forbidden'}, status=403)
+    return HttpResponse(histograms.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # -----------------------
 # Registration View
 # -----------------------
@@ -0,0 +1,15 @@
+"""
+Celery app for inventory_system background jobs.
+
+Start a worker with ``celery -A inventory_system worker``. Without a broker
+configured, tasks run eagerly in-process (see CELERY_* in settings).
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_system.settings')
+
+app = Celery('inventory_system')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -48,10 +48,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # Trigram lookups for item search on PostgreSQL; inert on SQLite
+    'django.contrib.postgres',
     'core',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -131,6 +134,122 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Celery
+# With no broker configured, jobs run eagerly in-process on the memory transport,
+# so the whole flow works (and is testable) without Redis.
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=config('REDIS_URL', default='') or 'memory://')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=CELERY_BROKER_URL == 'memory://', cast=bool)
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+ANALYTICS_JOB_TIMEOUT = config('ANALYTICS_JOB_TIMEOUT', default=600, cast=int)
+# Seconds before a failed job is queued again without an explicit refresh
+ANALYTICS_RETRY_AFTER = config('ANALYTICS_RETRY_AFTER', default=900, cast=int)
+
+# Anomaly detection: group_by location|supplier|name (empty for none), method zscore|robust
+ANOMALY_GROUP_BY = config('ANOMALY_GROUP_BY', default='location')
+ANOMALY_METHOD = config('ANOMALY_METHOD', default='robust')
+ANOMALY_THRESHOLD = config('ANOMALY_THRESHOLD', default=None, cast=lambda v: float(v) if v else None)
+
+# Stock history retention (days), enforced by `manage.py compact_stock_history`
+STOCK_MOVEMENT_RETENTION_DAYS = config('STOCK_MOVEMENT_RETENTION_DAYS', default=90, cast=int)
+STOCK_HOURLY_ROLLUP_RETENTION_DAYS = config('STOCK_HOURLY_ROLLUP_RETENTION_DAYS', default=14, cast=int)
+STOCK_DAILY_ROLLUP_RETENTION_DAYS = config('STOCK_DAILY_ROLLUP_RETENTION_DAYS', default=730, cast=int)
+
+# Change feed: clients with a cursor older than the retention must resync.
+# Changes younger than the settle window are held back so a transaction that
+# commits after a higher id cannot be skipped by a cursor that moved past it.
+# Rows are timestamped when written, not at commit, so the window must exceed the
+# longest write transaction (an import chunk included), or its changes can be missed.
+CHANGE_FEED_RETENTION_DAYS = config('CHANGE_FEED_RETENTION_DAYS', default=30, cast=int)
+CHANGE_FEED_SETTLE_SECONDS = config('CHANGE_FEED_SETTLE_SECONDS', default=5, cast=float)
+
+# Server-sent events (/api/events/). Needs the ASGI server; without REDIS_URL the
+# pub/sub is in-process, so run a single web process or set REDIS_URL.
+EVENTS_HEARTBEAT_SECONDS = config('EVENTS_HEARTBEAT_SECONDS', default=20, cast=float)
+
+# Performance instrumentation (core.middleware.PerformanceMiddleware)
+# Server-Timing headers break each response down into db/phase durations for browser devtools.
+# /metrics/ serves latency histograms in Prometheus text format to staff users, or to scrapers
+# sending "Authorization: Bearer $METRICS_TOKEN". Histograms are per worker process.
+SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Opt-in sampling profiler: requests slower than this many ms leave folded stacks in PROFILE_DIR
+PROFILE_SLOW_REQUESTS_MS = config('PROFILE_SLOW_REQUESTS_MS', default=None, cast=lambda v: float(v) if v else None)
+PROFILE_SAMPLE_INTERVAL_MS = config('PROFILE_SAMPLE_INTERVAL_MS', default=5, cast=float)
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+
+# Location/supplier name -> id cache used by the write endpoints: a per-process LRU in
+# front of the default cache (Redis when REDIS_URL is set). Renames and deletes invalidate
+# through the default cache, so every process must share it: without REDIS_URL each
+# process has its own LocMemCache and would keep serving deleted ids, so the cache is off
+# unless REFERENCE_CACHE_ENABLED turns it on (safe with a single process, e.g. runserver).
+REFERENCE_CACHE_ENABLED = config('REFERENCE_CACHE_ENABLED', default=bool(config('REDIS_URL', default='')), cast=bool)
+REFERENCE_CACHE_TIMEOUT = config('REFERENCE_CACHE_TIMEOUT', default=3600, cast=int)
+REFERENCE_CACHE_LOCAL_ENTRIES = config('REFERENCE_CACHE_LOCAL_ENTRIES', default=10000, cast=int)
+
+# Async data endpoints (dashboard data, insights data): independent reads run on up to
+# ASYNC_QUERY_WORKERS pool threads, each holding its own database connection per process;
+# figure building and large JSON encodes share ASYNC_CPU_WORKERS threads. The middleware
+# chain is sync (WhiteNoise), so under ASGI and WSGI alike Django runs these views through
+# async_to_sync in the request's worker thread: the gain is the fan-out within a request.
+ASYNC_QUERY_WORKERS = config('ASYNC_QUERY_WORKERS', default=4, cast=int)
+ASYNC_CPU_WORKERS = config('ASYNC_CPU_WORKERS', default=2, cast=int)
+
+# Trained demand forecast models (core.model_registry): stored as joblib in the database, or
+# as files under MODEL_REGISTRY_DIR when set (a volume every web/worker process shares).
+# Retrained after MODEL_MAX_AGE seconds or once MODEL_RETRAIN_FRACTION of the items changed.
+MODEL_REGISTRY_DIR = config('MODEL_REGISTRY_DIR', default='')
+MODEL_CACHE_ENTRIES = config('MODEL_CACHE_ENTRIES', default=64, cast=int)
+MODEL_RETRAIN_FRACTION = config('MODEL_RETRAIN_FRACTION', default=0.1, cast=float)
+MODEL_MAX_AGE = config('MODEL_MAX_AGE', default=86400, cast=int)
+# Demand forecasts fit every item series at once (core.forecasting): FORECAST_BACKEND is
+# auto|smoothing|seasonal. Prophet is opt-in, at about a second per series: it takes over
+# the FORECAST_PROPHET_ITEMS highest stock-value items per user.
+FORECAST_BACKEND = config('FORECAST_BACKEND', default='auto')
+FORECAST_PROPHET_ITEMS = config('FORECAST_PROPHET_ITEMS', default=0, cast=int)
+# Nightly `manage.py precompute_forecasts`: tenants in chunks over a process pool; progress is
+# checkpointed to PRECOMPUTE_CHECKPOINT so an interrupted run resumes
+PRECOMPUTE_WORKERS = config('PRECOMPUTE_WORKERS', default=os.cpu_count() or 1, cast=int)
+PRECOMPUTE_CHUNK_SIZE = config('PRECOMPUTE_CHUNK_SIZE', default=25, cast=int)
+PRECOMPUTE_CHECKPOINT = config('PRECOMPUTE_CHECKPOINT', default=os.path.join(BASE_DIR, 'precompute-checkpoint.json'))
+# PDF reports (core.reports) are built by the Celery worker and kept per data version in the
+# database, or as files under REPORT_DIR when set (a volume web and worker processes share)
+REPORT_DIR = config('REPORT_DIR', default='')
+
+# Caches
+# Figures are keyed by (user, data version, filters), so eviction only costs a rebuild.
+REDIS_URL = config('REDIS_URL', default='')
+FIGURE_CACHE_ALIAS = 'figures'
+FIGURE_CACHE_TIMEOUT = config('FIGURE_CACHE_TIMEOUT', default=900, cast=int)
+FIGURE_CACHE_MAX_ENTRIES = config('FIGURE_CACHE_MAX_ENTRIES', default=2000, cast=int)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'figures': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'figures',
+            'TIMEOUT': FIGURE_CACHE_TIMEOUT,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'figures': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'figures',
+            'TIMEOUT': FIGURE_CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': FIGURE_CACHE_MAX_ENTRIES},
+        },
+    }
 # Authentication URLs
 LOGIN_URL = '/login/'           
 LOGIN_REDIRECT_URL = '/'        
@@ -154,13 +273,25 @@ WHITENOISE_USE_FINDERS = DEBUG
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
+            'formatter': 'timestamped',
         },
     },
     'root': {
         'handlers': ['console'],
         'level': 'WARNING',
     },
+    'loggers': {
+        # Slow-request profiles, query budget overruns and job failures
+        'core': {
+            'level': config('CORE_LOG_LEVEL', default='INFO'),
+        },
+    },
 }
\ No newline at end of file
@@ -7,6 +7,11 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.dashboard_view, name='dashboard'),
     path('api/get_dashboard_data/', views.get_dashboard_data_api, name='get_dashboard_data'),
+    path('api/items/', views.items_api, name='items_api'),
+    path('api/items/batch/', views.batch_items_api, name='batch_items_api'),
+    path('api/items/search/', views.search_items_api, name='search_items_api'),
+    path('api/changes/', views.changes_api, name='changes_api'),
+    path('api/events/', views.events_api, name='events_api'),
     path('api/add_item/', views.add_item_api, name='add_item'),
     path('locations/', views.locations_view, name='locations'),
     path('api/add_location/', views.add_location_api, name='add_location_api'),
@@ -17,11 +22,17 @@ urlpatterns = [
     path('edit_supplier/<int:supplier_id>/', views.edit_supplier, name='edit_supplier'),
     path('delete_supplier/<int:supplier_id>/', views.delete_supplier, name='delete_supplier'),
     path('insights/', views.insights_view, name='insights'),
+    path('api/insights/data/', views.insights_data_api, name='insights_data_api'),
+    path('api/insights/status/', views.insights_status_api, name='insights_status_api'),
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='/login/'), name='logout'),
     path('api/delete_item/', views.delete_item_api, name='delete_item_api'),
     path('api/get_item/<int:id>/', views.get_item_api, name='get_item_api'),
     path('api/edit_item/', views.edit_item_api, name='edit_item_api'),
     path('export/', views.export_inventory, name='export_inventory'),
-    path('register/', views.register_view, name='register')
+    path('api/reports/<str:kind>/', views.report_status_api, name='report_status_api'),
+    path('reports/<str:kind>/download/', views.download_report, name='download_report'),
+    path('api/import_inventory/', views.import_inventory_api, name='import_inventory_api'),
+    path('register/', views.register_view, name='register'),
+    path('metrics/', views.metrics_view, name='metrics')
 ]
\ No newline at end of file
@@ -1,10 +1,10 @@
 import os
 import django
-import pandas as pd
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_system.settings')
 django.setup()
 
+from core.importers import import_inventory_csv
 from core.models import Supplier, InventoryItem, Location
 from django.contrib.auth.models import User
 
@@ -19,25 +19,10 @@ def load_data():
     user.set_password('admin123')
     user.save()
 
-    # Create locations
-    locations = ['Nairobi', 'Mombasa', 'Kisumu', 'Eldoret', 'Nakuru']
-    for loc in locations:
-        Location.objects.get_or_create(name=loc)
-
-    # Load CSV
-    df = pd.read_csv('datasets/inventory_data.csv')
-    for _, row in df.iterrows():
-        supplier, _ = Supplier.objects.get_or_create(name=row['supplier'])
-        location = Location.objects.get(name=row['location'])
-        InventoryItem.objects.create(
-            name=row['name'],
-            quantity=row['quantity'],
-            price=row['price'],
-            supplier=supplier,
-            location=location,
-            user=user
-        )
-    print("Data loaded successfully!")
+    # Load CSV; suppliers and locations are created on the fly
+    with open('datasets/inventory_data.csv', newline='', encoding='utf-8-sig') as f:
+        stats = import_inventory_csv(user, f)
+    print(f"Data loaded successfully! {stats['imported']} items, {stats['rejected']} rejected.")
 
 if __name__ == "__main__":
-    load_data()
\ No newline at end of file
+    load_data()
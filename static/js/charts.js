@@ -0,0 +1,40 @@
+// Static chart specs for the compact series payloads (?format=series).
+// Mirrors CHART_SPECS in core/analytics.py, which builds the same figures server-side.
+var CHART_SPECS = {
+    stock: { type: 'scatter', title: 'Stock Levels Over Time' },
+    location: { type: 'pie', title: 'Stock by Location' },
+    supplier: { type: 'bar', title: 'Supplier Performance' },
+    forecast: { type: 'scatter', title: 'Demand Forecast', xaxis: 'Date & Time', yaxis: 'Quantity' },
+    anomalies: { type: 'bar', title: 'Anomalies Detected', empty: 'No Anomalies Detected' },
+    stock_trend: { type: 'scatter', title: 'Stock Trends' }
+};
+
+function seriesTraces(key, data) {
+    const spec = CHART_SPECS[key];
+    if (spec.type === 'pie') {
+        return [{ type: 'pie', labels: data.labels, values: data.values }];
+    }
+    if (data.series) {
+        return data.series.map(line => ({
+            type: 'scatter', mode: 'lines+markers', name: line.name, x: data.labels, y: line.values
+        }));
+    }
+    if (!data.labels.length) return [];
+    const trace = { type: spec.type, x: data.labels, y: data.values };
+    if (spec.type === 'scatter') trace.mode = 'lines+markers';
+    if (data.groups) {
+        trace.customdata = data.groups.map((group, i) => [group ?? 'N/A', data.scores[i]]);
+        trace.hovertemplate = '%{x}: %{y} units<br>Group: %{customdata[0]}<br>Score: %{customdata[1]}<extra></extra>';
+    }
+    return [trace];
+}
+
+function renderSeriesChart(elementId, key, data) {
+    if (!data || !document.getElementById(elementId)) return;
+    const spec = CHART_SPECS[key];
+    const title = data.labels.length ? spec.title : (spec.empty || `${spec.title} (No Data)`);
+    const layout = { title: { text: title } };
+    if (spec.xaxis) layout.xaxis = { title: { text: spec.xaxis } };
+    if (spec.yaxis) layout.yaxis = { title: { text: spec.yaxis } };
+    Plotly.newPlot(elementId, seriesTraces(key, data), layout);
+}
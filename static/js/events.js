@@ -0,0 +1,27 @@
+// Server-sent change notifications from /api/events/; pages refresh only when told to.
+// True while the stream is connected, so pages can fall back to polling otherwise.
+var liveEvents = false;
+
+function listenForChanges(handlers, fallback) {
+    if (!window.EventSource) {
+        setInterval(fallback, 30000);
+        return;
+    }
+    const source = new EventSource('/api/events/');
+    let connectedBefore = false;
+
+    source.addEventListener('open', () => {
+        liveEvents = true;
+        // Anything may have changed while we were disconnected
+        if (connectedBefore) fallback();
+        connectedBefore = true;
+    });
+    source.addEventListener('error', () => {
+        liveEvents = false;
+        // Closed for good, e.g. the app is served without ASGI: go back to polling
+        if (source.readyState === EventSource.CLOSED) setInterval(fallback, 30000);
+    });
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, event => handler(JSON.parse(event.data)));
+    });
+}
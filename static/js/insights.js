@@ -1,28 +1,33 @@
+// ETag of the last insights data we rendered
+var insightsEtag = null;
+
 function refreshInsights() {
-    console.log('Refreshing insights');
-    fetch('/insights/', { method: 'GET' })
-        .then(response => response.text())
-        .then(html => {
-            const parser = new DOMParser();
-            const doc = parser.parseFromString(html, 'text/html');
-            const forecastData = doc.querySelector('#forecast-chart-data')?.textContent;
-            const anomaliesData = doc.querySelector('#anomalies-chart-data')?.textContent;
-            const stockTrendData = doc.querySelector('#stock-trend-data')?.textContent;
-
-            if (forecastData) {
-                Plotly.newPlot('forecast-chart', JSON.parse(forecastData));
+    const headers = insightsEtag ? { 'If-None-Match': insightsEtag } : {};
+    fetch('/api/insights/data/', { method: 'GET', headers })
+        .then(response => {
+            // 304: nothing changed since the last render
+            if (response.status === 304) return null;
+            insightsEtag = response.headers.get('ETag');
+            return response.json();
+        })
+        .then(data => {
+            if (!data) return;
+            const series = data.series || {};
+
+            if (series.forecast?.labels.length) {
+                renderSeriesChart('forecast-chart', 'forecast', series.forecast);
             } else {
                 document.getElementById('forecast-chart').innerHTML = '<p class="text-muted text-center">No forecast data yet! Add more items. 🌟</p>';
             }
 
-            if (anomaliesData) {
-                Plotly.newPlot('anomalies-chart', JSON.parse(anomaliesData));
+            if (series.anomalies?.labels.length) {
+                renderSeriesChart('anomalies-chart', 'anomalies', series.anomalies);
             } else {
                 document.getElementById('anomalies-chart').innerHTML = '<p class="text-muted text-center">No anomalies! Looking good! 🌟</p>';
             }
 
-            if (stockTrendData) {
-                Plotly.newPlot('stock-trend-chart', JSON.parse(stockTrendData));
+            if (series.stock_trend?.labels.length) {
+                renderSeriesChart('stock-trend-chart', 'stock_trend', series.stock_trend);
             } else {
                 document.getElementById('stock-trend-chart').innerHTML = '<p class="text-muted text-center">No trend data yet! 🌟</p>';
             }
@@ -39,7 +44,54 @@ function refreshInsights() {
         .catch(error => console.error('Error refreshing insights:', error));
 }
 
+// Analytics run as background jobs. The 'analytics' event announces finished jobs;
+// polling is only a slow safety net, or the main path when the event stream is down.
+var analyticsTimer = null;
+
+function watchAnalyticsJob(status) {
+    clearTimeout(analyticsTimer);
+    const badge = document.getElementById('analytics-badge');
+    if (status.fresh) {
+        badge?.classList.add('d-none');
+        refreshInsights();
+        return;
+    }
+    badge?.classList.remove('d-none');
+    if (status.status === 'failed') {
+        badge.textContent = '⚠️ Analysis failed';
+        return;
+    }
+    analyticsTimer = setTimeout(checkAnalyticsJob, liveEvents ? 15000 : 2000);
+}
+
+function checkAnalyticsJob() {
+    // A GET also queues the job for the current data version
+    fetch('/api/insights/status/')
+        .then(response => response.json())
+        .then(watchAnalyticsJob)
+        .catch(error => console.error('Error checking analytics status:', error));
+}
+
+function requestAnalyticsRefresh() {
+    fetch('/api/insights/status/', {
+        method: 'POST',
+        headers: { 'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]')?.value || '' }
+    })
+        .then(response => response.json())
+        .then(watchAnalyticsJob)
+        .catch(error => console.error('Error requesting analysis:', error));
+}
+
 document.addEventListener('DOMContentLoaded', () => {
+    document.getElementById('refresh-insights')?.addEventListener('click', requestAnalyticsRefresh);
+    if (!document.getElementById('analytics-badge')?.classList.contains('d-none')) {
+        watchAnalyticsJob({ fresh: false });
+    }
     refreshInsights();
-    setInterval(refreshInsights, 30000);  // Update every 30 seconds
-});
\ No newline at end of file
+    listenForChanges({
+        inventory: checkAnalyticsJob,
+        analytics: event => {
+            if (event.kind === 'insights') checkAnalyticsJob();
+        }
+    }, checkAnalyticsJob);
+});
@@ -20,7 +20,10 @@ function addItem() {
         quantity: parseInt(form.querySelector('[name="quantity"]').value),
         price: parseFloat(form.querySelector('[name="price"]').value),
         supplier: form.querySelector('[name="supplier"]').value,
-        location: form.querySelector('[name="location"]').value
+        location: form.querySelector('[name="location"]').value,
+        // Blank keeps the defaults
+        reorder_point: form.querySelector('[name="reorder_point"]').value,
+        target_level: form.querySelector('[name="target_level"]').value
     };
 
     fetch('/api/add_item/', {
@@ -48,52 +51,42 @@ function addItem() {
     });
 }
 
+// ETag of the last dashboard payload we rendered, per URL
+var dashboardEtags = dashboardEtags || {};
+
 function refreshDashboard() {
+    // script.js is also loaded on pages without the dashboard charts
+    if (!document.getElementById('stock-chart')) return;
     const urlParams = new URLSearchParams(window.location.search);
     const locationFromUrl = urlParams.get('location') || '';
     const locationFilter = document.getElementById('locationFilter')?.value || locationFromUrl;
-    const url = locationFilter ? `/api/get_dashboard_data/?location=${encodeURIComponent(locationFilter)}` : '/api/get_dashboard_data/';
+    // Compact series; the chart specs in charts.js turn them into Plotly figures
+    const params = new URLSearchParams({ format: 'series' });
+    if (locationFilter) params.set('location', locationFilter);
+    const url = `/api/get_dashboard_data/?${params}`;
+    const headers = dashboardEtags[url] ? { 'If-None-Match': dashboardEtags[url] } : {};
 
-    fetch(url)
-        .then(response => response.json())
+    fetch(url, { headers })
+        .then(response => {
+            // 304: nothing changed since the last render
+            if (response.status === 304) return null;
+            dashboardEtags[url] = response.headers.get('ETag');
+            return response.json();
+        })
         .then(data => {
-            Plotly.newPlot('stock-chart', JSON.parse(data.stock_chart_data));
-            Plotly.newPlot('location-chart', JSON.parse(data.location_chart_data));
-            Plotly.newPlot('supplier-chart', JSON.parse(data.supplier_chart_data || '[]'));
-
-            // ✅ Demand Forecast Chart
-            if (data.forecast_chart_data) {
-                Plotly.newPlot('forecast-chart',
-                    JSON.parse(data.forecast_chart_data).data,
-                    JSON.parse(data.forecast_chart_data).layout
-                );
-            }
-
-            // ✅ Anomalies Detected Chart
-            if (data.anomalies_chart_data) {
-                Plotly.newPlot('anomalies-chart',
-                    JSON.parse(data.anomalies_chart_data).data,
-                    JSON.parse(data.anomalies_chart_data).layout
-                );
-            }
+            if (!data) return;
+            renderSeriesChart('stock-chart', 'stock', data.charts.stock);
+            renderSeriesChart('location-chart', 'location', data.charts.location);
+            renderSeriesChart('supplier-chart', 'supplier', data.charts.supplier);
+            renderSeriesChart('forecast-chart', 'forecast', data.charts.forecast);
+            renderSeriesChart('anomalies-chart', 'anomalies', data.charts.anomalies);
 
             const tableBody = document.querySelector('#inventory-table tbody');
-            if (tableBody) {
+            // While a search is showing, its results own the table
+            if (tableBody && !searchQuery()) {
                 tableBody.innerHTML = '';
-                data.items.forEach(item => {
-                    const row = `<tr data-id="${item.id}">
-                        <td>${item.name}</td>
-                        <td>${item.quantity}</td>
-                        <td>${item.price}</td>
-                        <td>${item.supplier}</td>
-                        <td>${item.location}</td>
-                        <td>
-                            <button onclick="editItem(${item.id})" class="btn btn-sm btn-warning">Edit</button>
-                            <button onclick="deleteItem(${item.id})" class="btn btn-sm btn-danger">Delete</button>
-                        </td>
-                    </tr>`;
-                    tableBody.insertAdjacentHTML('beforeend', row);
-                });
+                appendItemRows(data.items);
+                setNextItemsCursor(data.next_cursor, locationFilter);
                 document.getElementById('inventory-table').classList.remove('d-none');
             }
 
@@ -103,21 +96,150 @@ function refreshDashboard() {
             document.querySelectorAll('#export-csv-button').forEach(btn => btn.remove());
             const exportLink = document.createElement('a');
             exportLink.id = 'export-csv-button';
-            exportLink.href = '/export/';
+            exportLink.href = locationFilter ? `/export/?location=${encodeURIComponent(locationFilter)}` : '/export/';
             exportLink.className = 'btn btn-secondary mt-3';
             exportLink.textContent = 'Export CSV';
             document.querySelector('.container.my-4')?.prepend(exportLink);
+
+            document.querySelectorAll('.report-button').forEach(btn => btn.remove());
+            [['low_stock', 'Low Stock PDF'], ['valuation', 'Valuation PDF']].forEach(([kind, label]) => {
+                const button = document.createElement('button');
+                button.className = 'btn btn-outline-secondary mt-3 ms-2 report-button';
+                button.textContent = label;
+                button.onclick = () => downloadReport(kind, locationFilter, button);
+                exportLink.after(button);
+            });
         })
         .catch(error => console.error('Error refreshing dashboard:', error));
 }
 
+// PDF reports are built in the background; poll until the file for this data version exists
+function downloadReport(kind, locationFilter, button) {
+    const label = button.textContent;
+    const url = `/api/reports/${kind}/` + (locationFilter ? `?location=${encodeURIComponent(locationFilter)}` : '');
+    button.disabled = true;
+    button.textContent = 'Preparing…';
+    // The first request may retry a failed build; polling only reads
+    const poll = (method = 'GET') => fetch(url, {method, headers: {'X-CSRFToken': getCsrfToken()}})
+        .then(response => response.json())
+        .then(report => {
+            if (report.download_url) {
+                window.location = report.download_url;
+            } else if (report.status === 'failed' || report.status === 'error') {
+                throw new Error(report.error || report.message);
+            } else {
+                return new Promise(resolve => setTimeout(resolve, 2000)).then(() => poll());
+            }
+        });
+    poll('POST')
+        .catch(error => alert('Report failed: ' + error.message))
+        .finally(() => {
+            button.disabled = false;
+            button.textContent = label;
+        });
+}
+
+function appendItemRows(items) {
+    const tableBody = document.querySelector('#inventory-table tbody');
+    items.forEach(item => {
+        const row = `<tr data-id="${item.id}">
+            <td>${item.name}</td>
+            <td>${item.quantity}</td>
+            <td>${item.price}</td>
+            <td>${item.supplier ?? 'N/A'}</td>
+            <td>${item.location ?? 'N/A'}</td>
+            <td>
+                <button onclick="editItem(${item.id})" class="btn btn-sm btn-warning">Edit</button>
+                <button onclick="deleteItem(${item.id})" class="btn btn-sm btn-danger">Delete</button>
+            </td>
+        </tr>`;
+        tableBody.insertAdjacentHTML('beforeend', row);
+    });
+}
+
+// Keyset pagination: the dashboard payload carries the first page only
+function setNextItemsCursor(cursor, locationFilter) {
+    document.querySelectorAll('#load-more-items').forEach(btn => btn.remove());
+    if (!cursor) return;
+    const button = document.createElement('button');
+    button.id = 'load-more-items';
+    button.className = 'btn btn-outline-primary btn-sm';
+    button.textContent = 'Load more';
+    button.onclick = () => loadMoreItems(cursor, locationFilter);
+    document.getElementById('inventory-table-container')?.appendChild(button);
+}
+
+function loadMoreItems(cursor, locationFilter) {
+    const params = new URLSearchParams({ cursor });
+    if (locationFilter) params.set('location', locationFilter);
+    fetch(`/api/items/?${params}`)
+        .then(response => response.json())
+        .then(page => {
+            appendItemRows(page.items);
+            setNextItemsCursor(page.next_cursor, locationFilter);
+        })
+        .catch(error => console.error('Error loading items:', error));
+}
+
 function filterInventory() {
     refreshDashboard();
+    searchInventory();
 }
 
+function searchQuery() {
+    return document.getElementById('itemSearch')?.value.trim() || '';
+}
+
+// Server-side ranked search; typing quickly only sends the last query
+var searchTimer = null;
+
+function searchInventory() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        const query = searchQuery();
+        if (!query) {
+            // The table still shows search results, so a 304 would not do
+            dashboardEtags = {};
+            refreshDashboard();
+            return;
+        }
+        const params = new URLSearchParams({ q: query });
+        const locationFilter = document.getElementById('locationFilter')?.value;
+        if (locationFilter) params.set('location', locationFilter);
+        loadSearchResults(params, true);
+    }, 250);
+}
+
+function loadSearchResults(params, replace) {
+    fetch(`/api/items/search/?${params}`)
+        .then(response => response.json())
+        .then(page => {
+            if (!page.items || params.get('q') !== searchQuery()) return;
+            if (replace) document.querySelector('#inventory-table tbody').innerHTML = '';
+            appendItemRows(page.items);
+            document.querySelectorAll('#load-more-items').forEach(btn => btn.remove());
+            if (!page.next_cursor) return;
+            const button = document.createElement('button');
+            button.id = 'load-more-items';
+            button.className = 'btn btn-outline-primary btn-sm';
+            button.textContent = 'Load more';
+            button.onclick = () => {
+                params.set('cursor', page.next_cursor);
+                loadSearchResults(params, false);
+            };
+            document.getElementById('inventory-table-container')?.appendChild(button);
+        })
+        .catch(error => console.error('Error searching items:', error));
+}
+
+// script.js is included twice on the dashboard; start one refresh loop only
+var dashboardListening = dashboardListening || false;
+
 document.addEventListener('DOMContentLoaded', () => {
+    if (dashboardListening || !document.getElementById('stock-chart')) return;
+    dashboardListening = true;
     refreshDashboard();
-    setInterval(refreshDashboard, 30000);
+    listenForChanges({ inventory: refreshDashboard }, refreshDashboard);
 });
 
 function editItem(id) {
@@ -130,6 +252,8 @@ function editItem(id) {
             form.querySelector('[name="price"]').value = item.price;
             form.querySelector('[name="supplier"]').value = item.supplier;
             form.querySelector('[name="location"]').value = item.location;
+            form.querySelector('[name="reorder_point"]').value = item.reorder_point;
+            form.querySelector('[name="target_level"]').value = item.target_level;
             form.dataset.id = id;
             new bootstrap.Modal(document.getElementById('editItemModal')).show();
         })
@@ -144,7 +268,9 @@ document.getElementById('edit-item-form').addEventListener('submit', function(e)
         quantity: parseInt(this.querySelector('[name="quantity"]').value),
         price: parseFloat(this.querySelector('[name="price"]').value),
         supplier: this.querySelector('[name="supplier"]').value,
-        location: this.querySelector('[name="location"]').value
+        location: this.querySelector('[name="location"]').value,
+        reorder_point: this.querySelector('[name="reorder_point"]').value,
+        target_level: this.querySelector('[name="target_level"]').value
     };
     fetch('/api/edit_item/', {
         method: 'POST',